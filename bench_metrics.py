@@ -0,0 +1,92 @@
+# bench_metrics.py
+# Benchmark der MetricsMiddleware aus mock_runtime.py: Kosten der Messung pro Anfrage.
+#
+# Die Anfragen gehen direkt an die ASGI-App (ohne Netzwerk und HTTP-Parser), damit die
+# Middleware nicht im Rauschen verschwindet. Gemessen wird einmal gegen eine leere App
+# (reine Middleware-Kosten) und einmal gegen die Mock-Engine-App aus der Spec (GET auf einen
+# Datensatz), jeweils mit und ohne Metriken, dazu die Dauer eines /metrics-Abrufs.
+# Start: python bench_metrics.py [--requests 200000] [--spec openapi_definition.json]
+
+import json
+import time
+import asyncio
+import argparse
+from termcolor import colored
+from mock_runtime import Metrics, MetricsMiddleware
+from mock_engine import build_app
+from mock_server_builder import collect_resources
+from data_generator import SchemaGenerator
+
+
+async def _empty_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+def _scope(method: str, path: str) -> dict:
+    return {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+            "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+            "headers": [(b"x-api-key", b"MOCK_TOKEN_123")], "client": ("127.0.0.1", 1), "server": ("127.0.0.1", 8000)}
+
+
+async def _run(app, method: str, path: str, requests: int) -> float:
+    """Sekunden pro Anfrage."""
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(_scope(method, path), receive, send)
+    return (time.perf_counter() - start) / requests
+
+
+def bench(name: str, plain, measured, method: str, path: str, requests: int, rounds: int = 3) -> dict:
+    """Abwechselnd ohne und mit Metriken, jeweils der beste Lauf (weniger Rauschen durch GC und CPU-Takt)."""
+    asyncio.run(_run(plain, method, path, requests // 10))  # Aufwärmen
+    without = with_metrics = float("inf")
+    for _ in range(rounds):
+        without = min(without, asyncio.run(_run(plain, method, path, requests)))
+        with_metrics = min(with_metrics, asyncio.run(_run(measured, method, path, requests)))
+    return {"app": name, "without_us": without * 1e6, "with_us": with_metrics * 1e6,
+            "overhead_us": (with_metrics - without) * 1e6, "overhead_pct": (with_metrics / without - 1) * 100}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark der Metrik-Middleware")
+    parser.add_argument("--spec", default="openapi_definition.json")
+    parser.add_argument("--requests", type=int, default=200_000)
+    args = parser.parse_args()
+
+    with open(args.spec, 'r', encoding='utf-8') as f:
+        spec = json.load(f)
+    resource = next(r for r in collect_resources(spec) if not r['parent_name'])
+    path = resource['item_path'].split('{')[0] + "1"
+
+    print(f"--- METRICS BENCHMARK: {args.requests:,} Anfragen pro Lauf ---")
+    results = [bench("leere App", _empty_app, MetricsMiddleware(_empty_app, Metrics({})), "GET", "/", args.requests)]
+
+    stores = {}
+    engine_app = build_app(spec, stores)
+    schema = spec['components']['schemas'][resource['schema_name']]
+    store = stores[resource['name']]
+    item_id, data = next(SchemaGenerator(spec, schema).records(1))
+    store.seed((), item_id, store.model.model_validate(data))
+    metrics = Metrics(stores)
+    results.append(bench(f"Mock Engine GET {path}", engine_app, build_app(spec, stores, metrics=metrics),
+                         "GET", path, args.requests // 10))
+
+    print(f"Statuscodes Mock Engine: {sorted({status for _, _, status in metrics.requests})}")
+    print(f"{'App':<34}{'ohne µs':>10}{'mit µs':>10}{'Overhead µs':>14}{'Overhead':>10}")
+    for r in results:
+        print(f"{r['app']:<34}{r['without_us']:>10.2f}{r['with_us']:>10.2f}{r['overhead_us']:>14.2f}{r['overhead_pct']:>9.1f}%")
+
+    start = time.perf_counter()
+    body = metrics.render()
+    render_ms = (time.perf_counter() - start) * 1000
+    print(f"/metrics-Abruf: {render_ms:.2f} ms für {len(body):,} Bytes")
+    empty, engine = results
+    print(colored(f"Messung pro Anfrage: {empty['overhead_us']:.2f} µs gegen die leere App, "
+                  f"{engine['overhead_us']:.2f} µs ({engine['overhead_pct']:.1f}%) bei einer Mock-Engine-Anfrage.", 'green'))
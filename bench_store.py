@@ -0,0 +1,96 @@
+# bench_store.py
+# Benchmark der Store-Varianten aus mock_runtime.py: ResourceStore (dict of Pydantic-Models)
+# gegen CompactStore (Tupel mit internierten Strings).
+#
+# Gemessen werden Bytes pro Datensatz (tracemalloc), Schreib- und Lese-Operationen pro Sekunde;
+# gelesen wird einmal als Model (get) und einmal wie vom Server als gecachtes JSON (item_json).
+# Start: python bench_store.py [--records 1000000] [--schema Project]
+
+import gc
+import json
+import time
+import random
+import argparse
+import tracemalloc
+from termcolor import colored
+import spec_utils
+from mock_runtime import ResourceStore, CompactStore
+from mock_engine import build_model
+from data_generator import SchemaGenerator
+
+
+def _fill(store, model, records: list) -> float:
+    """Wie ein POST: Body validieren, dann speichern."""
+    start = time.perf_counter()
+    for _, data in records:
+        store.create((), model.model_validate(data))
+    return time.perf_counter() - start
+
+
+def bench(store_class, model, records: list, reads: int) -> dict:
+    # 1. Speicher: nur der Store selbst (die Eingabe-Dicts existieren bereits)
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    store = store_class("bench", model)
+    _fill(store, model, records)
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    del store
+    gc.collect()
+
+    # 2. Durchsatz ohne tracemalloc
+    store = store_class("bench", model)
+    write_time = _fill(store, model, records)
+
+    ids = random.Random(0).choices(range(1, len(records) + 1), k=reads)
+    start = time.perf_counter()
+    for item_id in ids:
+        store.get((), item_id)
+    read_time = time.perf_counter() - start
+
+    # Wie ein GET des Servers: serialisierte Bytes, beim zweiten Lesen aus dem Cache
+    for item_id in ids:
+        store.item_json((), item_id)
+    start = time.perf_counter()
+    for item_id in ids:
+        store.item_json((), item_id)
+    json_time = time.perf_counter() - start
+
+    return {
+        "store": store_class.__name__,
+        "bytes_per_record": used / len(records),
+        "writes_per_sec": len(records) / write_time,
+        "reads_per_sec": reads / read_time,
+        "json_reads_per_sec": reads / json_time,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark der Mock-Server-Stores")
+    parser.add_argument("--spec", default="openapi_definition.json")
+    parser.add_argument("--schema", default=None, help="Schema-Name (Standard: erstes POST-Schema).")
+    parser.add_argument("--records", type=int, default=1_000_000)
+    parser.add_argument("--reads", type=int, default=200_000)
+    args = parser.parse_args()
+
+    with open(args.spec, 'r', encoding='utf-8') as f:
+        spec = json.load(f)
+    schema_name = args.schema or spec_utils.first_post_schema(spec)
+    schema = spec['components']['schemas'][schema_name]
+    model = build_model(spec, schema_name, schema, {}, with_id=True)
+
+    print(f"--- STORE BENCHMARK: {args.records:,} x {schema_name} ---")
+    # Request-Bodies ohne ID (vergibt der Store)
+    records = [(i, {k: v for k, v in data.items() if k != 'id'})
+               for i, data in SchemaGenerator(spec, schema, seed=0).records(args.records)]
+
+    results = [bench(store_class, model, records, args.reads) for store_class in (ResourceStore, CompactStore)]
+    print(f"{'Store':<15}{'Bytes/Datensatz':>18}{'Writes/s':>14}{'Reads/s':>14}{'JSON-Reads/s':>16}")
+    for r in results:
+        print(f"{r['store']:<15}{r['bytes_per_record']:>18,.0f}{r['writes_per_sec']:>14,.0f}{r['reads_per_sec']:>14,.0f}"
+              f"{r['json_reads_per_sec']:>16,.0f}")
+
+    ratio = results[0]['bytes_per_record'] / max(results[1]['bytes_per_record'], 1)
+    print(colored(f"CompactStore braucht {ratio:.1f}x weniger Speicher pro Datensatz.", 'green'))
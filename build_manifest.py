@@ -0,0 +1,68 @@
+# build_manifest.py
+# Inkrementelle Builds für die Code-Generatoren (mock_server_builder.py, generate_tests.py).
+#
+# Pro Stufe werden die SHA-256-Hashes der Eingabedateien, des Generator-Quelltexts
+# (= Generator-Version, inkl. genutzter Hilfsmodule) und der erzeugten Dateien im
+# Manifest abgelegt. Stimmen alle Hashes beim nächsten Lauf überein, ist die Stufe
+# ein No-op.
+
+import os
+import json
+import hashlib
+import threading
+
+MANIFEST_FILE = ".build_manifest.json"
+
+# Generator-Stufen können parallel laufen (pipeline.py) und teilen sich das Manifest
+_LOCK = threading.Lock()
+
+
+def file_hash(path: str) -> str | None:
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def _fingerprint(inputs: list[str], outputs: list[str], generators: list[str]) -> dict:
+    return {
+        "generators": {os.path.basename(path): file_hash(path) for path in generators},
+        "inputs": {path: file_hash(path) for path in inputs},
+        "outputs": {path: file_hash(path) for path in outputs},
+    }
+
+
+def _load(manifest_file: str) -> dict:
+    try:
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def is_up_to_date(stage: str, inputs: list[str], outputs: list[str], generators: list[str],
+                  manifest_file: str = MANIFEST_FILE) -> bool:
+    """True, wenn sich weder Eingaben, Generator noch erzeugte Dateien seit dem letzten Build geändert haben."""
+    with _LOCK:
+        previous = _load(manifest_file).get(stage)
+    if previous is None:
+        return False
+
+    current = _fingerprint(inputs, outputs, generators)
+    if any(h is None for h in current["outputs"].values()):
+        return False
+    return current == previous
+
+
+def record(stage: str, inputs: list[str], outputs: list[str], generators: list[str],
+           manifest_file: str = MANIFEST_FILE):
+    """Speichert den Fingerabdruck einer erfolgreich gebauten Stufe."""
+    with _LOCK:
+        manifest = _load(manifest_file)
+        manifest[stage] = _fingerprint(inputs, outputs, generators)
+
+        tmp_file = f"{manifest_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_file, manifest_file)
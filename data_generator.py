@@ -0,0 +1,233 @@
+# data_generator.py
+# Lokaler, schema-getriebener Generator für große synthetische Datensätze (ohne KI-Aufrufe).
+#
+# Liest components.schemas aus openapi_definition.json und erzeugt für jede
+# Top-Level-Ressource des Mock-Servers schema-gültige Datensätze. Die Werte werden
+# spaltenweise pro Batch erzeugt (random.choices & Co. statt einer Python-Schleife
+# pro Feld und Datensatz) und sind bei gleichem --seed reproduzierbar.
+# Die Ausgabe ist eine eigene Seed-Datei im Format von mock_runtime.SeedFile (Standard:
+# mock_server_loadtest.jsonl), die der Server mit --seed-file lädt. Die Seed-Datei des Builds
+# bleibt unberührt, ein erneuter Build überschreibt die Lasttest-Daten also nicht.
+#
+# Start: python data_generator.py --count 1000000 --seed 42 --cardinality fields.status=5
+#        python mock_server.py --seed-file mock_server_loadtest.jsonl
+
+import os
+import sys
+import json
+import time
+import uuid
+import string
+import random
+import argparse
+from datetime import datetime, timedelta, timezone
+from termcolor import colored
+import spec_utils
+import mock_runtime
+from mock_server_builder import collect_resources, seed_index_pair
+
+DEFAULT_BATCH_SIZE = 10000
+DEFAULT_STRING_LENGTH = (8, 16)
+DEFAULT_INTEGER_RANGE = (0, 1_000_000)
+DEFAULT_ARRAY_LENGTH = (0, 3)
+EPOCH = datetime(2020, 1, 1, tzinfo=timezone.utc)
+DATE_SPAN_SECONDS = 5 * 365 * 24 * 3600
+ALPHABET = string.ascii_letters + string.digits
+
+
+class SchemaGenerator:
+    """
+    Erzeugt Datensätze für ein Schema in Batches.
+    `cardinality` begrenzt die Anzahl verschiedener Werte pro Feldpfad (z.B. {"fields.status": 5});
+    die Wertevorräte dafür werden einmal vorab erzeugt und dann pro Batch gezogen.
+    """
+
+    def __init__(self, spec: dict, schema: dict, seed: int = 0, cardinality: dict | None = None):
+        self.spec = spec
+        self.schema = spec_utils.resolve_ref(spec, schema)
+        self.rng = random.Random(seed)
+        self.cardinality = cardinality or {}
+        self.pools = {}
+
+    # --- Spalten pro Typ ---
+
+    def _strings(self, schema: dict, n: int, path: str) -> list:
+        fmt = schema.get('format')
+        if fmt == 'date-time':
+            return [(EPOCH + timedelta(seconds=s)).isoformat() for s in self.rng.choices(range(DATE_SPAN_SECONDS), k=n)]
+        if fmt == 'date':
+            return [(EPOCH + timedelta(days=d)).date().isoformat() for d in self.rng.choices(range(DATE_SPAN_SECONDS // 86400), k=n)]
+        if fmt == 'uuid':
+            return [str(uuid.UUID(int=self.rng.getrandbits(128), version=4)) for _ in range(n)]
+        if fmt == 'email':
+            return [f"user{x}@example.com" for x in self.rng.choices(range(10 ** 9), k=n)]
+        if fmt in ('uri', 'url'):
+            return [f"https://example.com/{path.replace('.', '/')}/{x}" for x in self.rng.choices(range(10 ** 9), k=n)]
+
+        # Freitext: alle Zeichen eines Batches auf einmal ziehen und in Stücke schneiden
+        low = schema.get('minLength', DEFAULT_STRING_LENGTH[0])
+        high = max(low, schema.get('maxLength', max(low, DEFAULT_STRING_LENGTH[1])))
+        lengths = self.rng.choices(range(low, high + 1), k=n)
+        chars = "".join(self.rng.choices(ALPHABET, k=sum(lengths)))
+        result, pos = [], 0
+        for length in lengths:
+            result.append(chars[pos:pos + length])
+            pos += length
+        return result
+
+    @staticmethod
+    def _bounds(schema: dict) -> tuple:
+        """
+        minimum/maximum mit DEFAULT_INTEGER_RANGE als Standard. Liegt die angegebene Grenze außerhalb
+        des Standardbereichs (z.B. nur ein negatives maximum), wird die andere im Abstand des
+        Standardbereichs davon abgeleitet, damit der Bereich nie leer ist.
+        """
+        low, high = DEFAULT_INTEGER_RANGE
+        width = high - low
+        if 'minimum' in schema:
+            low = schema['minimum']
+            high = schema.get('maximum', high if low <= high else low + width)
+        elif 'maximum' in schema:
+            high = schema['maximum']
+            low = low if high >= low else high - width
+        return low, high
+
+    def _integers(self, schema: dict, n: int) -> list:
+        low, high = self._bounds(schema)
+        return self.rng.choices(range(int(low), int(high) + 1), k=n)
+
+    def _numbers(self, schema: dict, n: int) -> list:
+        low, high = self._bounds(schema)
+        span = high - low
+        rand = self.rng.random
+        return [round(low + span * rand(), 2) for _ in range(n)]
+
+    def _objects(self, schema: dict, n: int, path: str) -> list:
+        properties = schema.get('properties', {})
+        if not properties:
+            return [{} for _ in range(n)]
+        names = list(properties)
+        columns = [self.column(properties[name], n, f"{path}.{name}" if path else name) for name in names]
+        return [dict(zip(names, row)) for row in zip(*columns)]
+
+    def _arrays(self, schema: dict, n: int, path: str) -> list:
+        low = schema.get('minItems', DEFAULT_ARRAY_LENGTH[0])
+        high = schema.get('maxItems', max(low, DEFAULT_ARRAY_LENGTH[1]))
+        lengths = self.rng.choices(range(low, high + 1), k=n)
+        flat = self.column(schema.get('items') or {}, sum(lengths), f"{path}[]")
+        result, pos = [], 0
+        for length in lengths:
+            result.append(flat[pos:pos + length])
+            pos += length
+        return result
+
+    def column(self, schema: dict, n: int, path: str = "") -> list:
+        """n Werte für ein (Teil-)Schema; `path` ist der Feldpfad für die Kardinalitäts-Vorgaben."""
+        schema = spec_utils.resolve_ref(self.spec, schema)
+        if path not in self.cardinality:
+            return self._values(schema, n, path)
+        if path not in self.pools:
+            self.pools[path] = self._values(schema, self.cardinality[path], path)
+        return self.rng.choices(self.pools[path], k=n)
+
+    def _values(self, schema: dict, n: int, path: str) -> list:
+        if 'enum' in schema:
+            return self.rng.choices(schema['enum'], k=n)
+
+        schema_type = schema.get('type', 'object' if 'properties' in schema else 'string')
+        if schema_type == 'object':
+            return self._objects(schema, n, path)
+        if schema_type == 'array':
+            return self._arrays(schema, n, path)
+        if schema_type == 'integer':
+            return self._integers(schema, n)
+        if schema_type == 'number':
+            return self._numbers(schema, n)
+        if schema_type == 'boolean':
+            return self.rng.choices((True, False), k=n)
+        return self._strings(schema, n, path)
+
+    def records(self, count: int, start_id: int = 1, batch_size: int = DEFAULT_BATCH_SIZE):
+        """(id, datensatz)-Paare mit fortlaufender ID, batchweise erzeugt."""
+        properties = {k: v for k, v in self.schema.get('properties', {}).items() if k != 'id'}
+        body_schema = {**self.schema, 'properties': properties}
+        for batch_start in range(0, count, batch_size):
+            n = min(batch_size, count - batch_start)
+            first_id = start_id + batch_start
+            for offset, record in enumerate(self._objects(body_schema, n, "")):
+                yield first_id + offset, {'id': first_id + offset, **record}
+
+
+def parse_cardinality(values: list[str]) -> dict:
+    """['fields.status=5', 'key=1000'] -> {'fields.status': 5, 'key': 1000}"""
+    result = {}
+    for value in values:
+        path, _, limit = value.partition('=')
+        if not limit.isdigit() or int(limit) < 1:
+            raise ValueError(f"Ungültige Kardinalität '{value}' (erwartet: feld.pfad=ANZAHL)")
+        result[path] = int(limit)
+    return result
+
+
+def loadtest_filename(server_filename: str) -> str:
+    """Standardausgabe: eigene Seed-Datei neben dem Server, nicht die des Builds (die gehört dem Build-Manifest)."""
+    return f"{os.path.splitext(server_filename)[0]}_loadtest.jsonl"
+
+
+def generate_seed_data(spec_filename: str = "openapi_definition.json", output_filename: str = "mock_server_loadtest.jsonl",
+                       count: int = 1000, seed: int = 0, cardinality: dict | None = None,
+                       schema_names: list[str] | None = None, batch_size: int = DEFAULT_BATCH_SIZE):
+    """Schreibt `count` Datensätze pro Top-Level-Ressource in eine Seed-Datei, die der Server mit --seed-file lädt."""
+    print("\n--- SYNTHETISCHE TESTDATEN ---")
+    try:
+        with open(spec_filename, 'r', encoding='utf-8') as f:
+            spec = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        print(colored(f"❌ FEHLER: Spec '{spec_filename}' nicht lesbar: {e}", 'red'))
+        sys.exit(1)
+
+    resources = [r for r in collect_resources(spec) if not r['parent_name']]
+    if schema_names:
+        resources = [r for r in resources if r['schema_name'] in schema_names]
+    if not resources:
+        print(colored("❌ FEHLER: Keine passenden Top-Level-Ressourcen in der Spec gefunden.", 'red'))
+        sys.exit(1)
+
+    schemas = spec.get('components', {}).get('schemas', {})
+    records = {}
+    for index, resource in enumerate(resources):
+        generator = SchemaGenerator(spec, schemas[resource['schema_name']], seed=seed + index,
+                                    cardinality=dict(cardinality or {}))
+        records[resource['name']] = generator.records(count, batch_size=batch_size)
+
+    start = time.perf_counter()
+    data_filename, index_filename = seed_index_pair(output_filename)
+    mock_runtime.write_seed_file(data_filename, index_filename, records)
+    duration = time.perf_counter() - start
+
+    total = count * len(resources)
+    print(colored(f"✅ {total} Datensätze ({', '.join(r['name'] for r in resources)}) in {duration:.1f}s "
+                  f"({total / max(duration, 1e-9):,.0f}/s) nach '{data_filename}' geschrieben.", 'green'))
+    print(colored(f"Server damit starten: python mock_server.py --seed-file {data_filename}", 'cyan'))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Schema-getriebene synthetische Testdaten für den Mock-Server")
+    parser.add_argument("--spec", default="openapi_definition.json")
+    parser.add_argument("--server", default="mock_server.py", help="Generierter Server (bestimmt den Standard für --output).")
+    parser.add_argument("--output", help="Ziel-Seed-Datei (Standard: <server>_loadtest.jsonl; Index daneben mit Endung .idx).")
+    parser.add_argument("--count", type=int, default=1000, help="Datensätze pro Ressource.")
+    parser.add_argument("--seed", type=int, default=0, help="Zufalls-Seed (gleicher Seed = gleiche Daten).")
+    parser.add_argument("--schema", action="append", help="Nur diese Schemas erzeugen (mehrfach möglich).")
+    parser.add_argument("--cardinality", action="append", default=[], metavar="FELD=ANZAHL",
+                        help="Anzahl verschiedener Werte pro Feldpfad, z.B. fields.status=5 (mehrfach möglich).")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    try:
+        cardinality = parse_cardinality(args.cardinality)
+    except ValueError as e:
+        print(colored(f"❌ FEHLER: {e}", 'red'))
+        sys.exit(1)
+
+    generate_seed_data(args.spec, args.output or loadtest_filename(args.server), args.count, args.seed, cardinality, args.schema, args.batch_size)
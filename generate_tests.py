@@ -5,22 +5,31 @@ import json
 import sys
 import os
 from termcolor import colored
-import io
+import spec_utils
+import build_manifest
 from collections import defaultdict
 
 # Ensuring console output is correctly encoded (though file content is now ASCII)
 # NOTE: The file content is now guaranteed to be pure ASCII for maximum compatibility.
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
-sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+sys.stdout.reconfigure(encoding='utf-8')
+sys.stderr.reconfigure(encoding='utf-8')
 
 # --- Configuration ---
 OPENAPI_FILE = "openapi_definition.json"
 TESTDATA_FILE = "testdata.json"
 
-def create_api_tests(spec_filename: str = OPENAPI_FILE, data_filename: str = TESTDATA_FILE):
+def create_api_tests(spec_filename: str = OPENAPI_FILE, data_filename: str = TESTDATA_FILE,
+                     test_filename: str = "test_mock_api.py", force: bool = False):
     # Generates a Pytest file (test_mock_api.py) for the CRUD operations.
+    # Without `force` this is a no-op when the inputs and the generator are unchanged since the last build.
     
     print("\n--- 5. PYTEST GENERATOR STARTED (Addressing Step 5) ---")
+
+    inputs = [spec_filename, data_filename]
+    generators = [__file__, spec_utils.__file__]
+    if not force and build_manifest.is_up_to_date("api_tests", inputs, [test_filename], generators):
+        print(colored(f"Up to date: '{test_filename}' (inputs unchanged) - skipped. Use --force to regenerate.", 'cyan'))
+        return
     
     try:
         # 1. Read input data
@@ -45,6 +54,11 @@ def create_api_tests(spec_filename: str = OPENAPI_FILE, data_filename: str = TES
              
         # API Base URL for tests
         api_base = "http://127.0.0.1:8000" + resource_path_plural 
+
+        # Test data may be grouped per schema ({schema_name: [cases]})
+        post_ref = spec_utils.request_schema_ref(spec['paths'].get(resource_path_plural, {}).get('post') or {})
+        if post_ref:
+            test_data_raw = spec_utils.testdata_for_schema(test_data_raw, spec_utils.ref_name(post_ref))
         
     except Exception as e:
         print(colored(f"❌ ERROR parsing OpenAPI Spec: {e}", 'red'))
@@ -74,6 +88,35 @@ def create_api_tests(spec_filename: str = OPENAPI_FILE, data_filename: str = TES
         sys.exit(1)
 
 
+    # Rate limit test only when GET on the collection is limited (x-mock-rate-limit on the operation or spec-wide "*")
+    rate_limits = spec_utils.rate_limits(spec)
+    rate_limit = rate_limits.get(f"GET {resource_path_plural}", rate_limits.get("*"))
+    rate_limit_test = ""
+    if isinstance(rate_limit, dict) and 'get' in spec['paths'].get(resource_path_plural, {}):
+        attempts = int(rate_limit.get('burst', rate_limit.get('requests', 1))) * 2 + 10
+        rate_limit_test = f"""
+
+# --- 6. Rate Limit Test ---
+def test_rate_limit_is_counted_per_route():
+    # Exhausts the x-mock-rate-limit bucket of GET with a dedicated API key, then checks that
+    # /metrics counts the 429 under the route template (it never reaches the router).
+    headers = {{"X-API-KEY": "rate-limit-test"}}
+    response = None
+    for _ in range({attempts}):
+        response = requests.get(BASE_URL, headers=headers, timeout=5)
+        if "RateLimit-Limit" not in response.headers:
+            pytest.skip("Rate limiting disabled (--no-rate-limit).")
+        if response.status_code == 429:
+            break
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
+
+    metrics = requests.get(METRICS_URL, timeout=5)
+    if metrics.status_code == 404:
+        pytest.skip("Metrics disabled (--no-metrics).")
+    assert 'mock_http_requests_total{{method="GET",route="{resource_path_plural}",status="429"}}' in metrics.text
+"""
+
     # 4. Generate Pytest Code (Removed Docstrings)
     test_code = f"""
 # test_mock_api.py
@@ -85,6 +128,7 @@ import pytest
 
 # --- Configuration ---
 BASE_URL = "{api_base}"
+METRICS_URL = "http://127.0.0.1:8000/metrics"
 AUTH_HEADERS = {{"X-API-KEY": "MOCK_TOKEN_123"}}
 
 # Test data from the generated 'testdata.json'
@@ -205,17 +249,17 @@ def test_delete_success():
     assert response_check.status_code == 404
     
     # The global ID for the fixture remains untouched.
-"""
+{rate_limit_test}"""
 
     # 5. Write file
-    test_filename = "test_mock_api.py"
     # Write as 'ascii' to guarantee no Unicode characters sneak in
     with open(test_filename, 'w', encoding='ascii') as f:
         f.write(test_code)
+    build_manifest.record("api_tests", inputs, [test_filename], generators)
         
     print(colored(f"✅ Pytest file successfully generated in '{test_filename}'.", 'green'))
     print(colored("\nTo run the tests, start: 'python mock_server.py' (in Tab 1) and then 'pytest' (in Tab 2).", 'cyan'))
 
 
 if __name__ == "__main__":
-    create_api_tests()
\ No newline at end of file
+    create_api_tests(force="--force" in sys.argv)
\ No newline at end of file
@@ -0,0 +1,136 @@
+# llm_cache.py
+# Persistenter, inhaltsadressierter Cache für LLM-Antworten.
+#
+# Da alle Anfragen mit temperature=0.0 laufen, liefert dieselbe Kombination aus
+# (Modell, System-Prompt, User-Prompt, max_tokens) dieselbe Antwort. Jede Antwort
+# wird unter dem SHA-256 der Anfrage als eigene Datei abgelegt. Wird das
+# Größenlimit überschritten, fliegen die am längsten nicht genutzten Einträge
+# (LRU über die mtime der Datei) raus.
+#
+# Mehrere Prozesse (main.py --batch) teilen sich ein Cache-Verzeichnis: Einträge können
+# jederzeit von einem anderen Prozess verdrängt werden, daher gilt eine verschwundene
+# Datei nie als Fehler.
+
+import os
+import json
+import hashlib
+import tempfile
+
+DEFAULT_CACHE_DIR = ".llm_cache"
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024  # 50 MB
+
+
+class CacheMiss(Exception):
+    """Wird im Replay-Modus geworfen, wenn eine Anfrage nicht im Cache liegt."""
+
+
+class ResponseCache:
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES, replay: bool = False):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.replay = replay
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Laufende Schätzung der Cache-Größe; None = noch nicht gezählt. Einträge anderer Prozesse
+        # fehlen darin, deshalb zählt _evict das Verzeichnis neu, bevor es etwas löscht.
+        self._total_bytes = None
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(payload: dict) -> str:
+        """Stabiler Hash über die komplette Anfrage (sortierte Keys, kompakte Form)."""
+        canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> dict | None:
+        """Liefert den gespeicherten Eintrag oder None. Im Replay-Modus ist ein Miss ein Fehler."""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.misses += 1
+            if self.replay:
+                raise CacheMiss(f"Keine gecachte Antwort für Anfrage {key[:12]}… (Replay-Modus)")
+            return None
+
+        # Zugriff vermerken, damit der Eintrag bei der LRU-Verdrängung als "frisch" gilt
+        try:
+            os.utime(path, None)
+        except FileNotFoundError:
+            pass  # inzwischen von einem anderen Prozess verdrängt, der Inhalt ist trotzdem gültig
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, entry: dict):
+        """Speichert einen Eintrag atomar und verdrängt bei Bedarf alte Einträge."""
+        path = self._path(key)
+        # Eindeutiger Temp-Name: schreiben zwei Prozesse denselben Key, ersetzt jeder nur seine eigene Datei
+        fd, tmp_path = tempfile.mkstemp(prefix=f"{key}.", suffix=".tmp", dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            size = os.path.getsize(tmp_path)
+            previous = self._size(path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+        if self._total_bytes is None:
+            self._total_bytes = self._scan()[1]
+        else:
+            self._total_bytes += size - previous
+        if self._total_bytes > self.max_bytes:
+            self._evict()
+
+    @staticmethod
+    def _size(path: str) -> int:
+        try:
+            return os.stat(path).st_size
+        except FileNotFoundError:
+            return 0
+
+    def _scan(self) -> tuple[list, int]:
+        """(mtime, Größe, Name) aller Einträge und ihre Gesamtgröße."""
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+            total += stat.st_size
+        return entries, total
+
+    def _evict(self):
+        entries, total = self._scan()
+
+        # Älteste Zugriffe zuerst löschen, bis das Limit wieder eingehalten ist
+        if total > self.max_bytes:
+            for _, size, name in sorted(entries):
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                    self.evictions += 1
+                except FileNotFoundError:
+                    pass  # schon von einem anderen Prozess verdrängt
+                total -= size
+                if total <= self.max_bytes:
+                    break
+        self._total_bytes = total
+
+    def stats_line(self) -> str:
+        lookups = self.hits + self.misses
+        rate = (self.hits / lookups * 100) if lookups else 0.0
+        return f"Cache: {self.hits} Treffer, {self.misses} Fehlschläge ({rate:.0f}% Trefferquote), {self.evictions} verdrängt"
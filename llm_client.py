@@ -0,0 +1,206 @@
+# llm_client.py
+# Gemeinsamer LLM-Client für main.py, topic.py und testdata_validator.py.
+#
+# Hält EINE Keep-Alive-Session (Connection Pool) für den gesamten Lauf offen,
+# damit nicht jede Anfrage einen neuen TLS-Handshake zum IONOS-Endpunkt macht,
+# und protokolliert Latenz und Token-Verbrauch pro Aufruf. Optional werden
+# Antworten über llm_cache.ResponseCache auf der Platte zwischengespeichert.
+# Mit `on_chunk` wird die Antwort per Server-Sent Events (stream=true) gestreamt.
+
+import os
+import sys
+import json
+import time
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from termcolor import colored
+from llm_cache import ResponseCache, CacheMiss
+
+# --- Konfiguration ---
+API_URL = "https://openai.inference.de-txl.ionos.com/v1/chat/completions"
+MODEL = "meta-llama/Llama-3.3-70B-Instruct"
+DEFAULT_MAX_TOKENS = 4096
+DEFAULT_TIMEOUT = 180
+POOL_SIZE = 8
+
+
+class TokenBucket:
+    """
+    Clientseitiges Rate-Limit (Token-Bucket, threadsicher): `rate` Anfragen pro Sekunde
+    im Mittel, Bursts bis `capacity`. acquire() blockiert, bis ein Token frei ist.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        if not 0 < rate < float("inf"):
+            raise ValueError(f"Rate-Limit muss eine endliche Zahl größer als 0 sein (ist {rate})")
+        if capacity < 1:
+            raise ValueError(f"Burst-Kapazität muss mindestens 1 sein (ist {capacity})")
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class LLMClient:
+    """
+    Wiederverwendbarer Client für die Chat-Completions-API.
+    Die Instanz ist aufrufbar und kann direkt als `query_llm_func` übergeben werden.
+    """
+
+    def __init__(self, token: str | None = None, api_url: str = API_URL, model: str = MODEL,
+                 max_tokens: int = DEFAULT_MAX_TOKENS, timeout: int = DEFAULT_TIMEOUT,
+                 cache: ResponseCache | None = None, rate_limiter: TokenBucket | None = None):
+        self.token = token if token is not None else os.getenv("IONOS_API_TOKEN")
+        self.api_url = api_url
+        self.model = model
+        self.max_tokens = max_tokens
+        self.timeout = timeout
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.calls = []  # Ein Eintrag pro Anfrage: label, Latenz, Tokens
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Authorization": f"Bearer {self.token}"})
+
+    def query(self, system_prompt: str, user_prompt: str, label: str = "LLM", on_chunk=None) -> str:
+        """
+        Sendet eine Anfrage an die KI und gibt den Antworttext zurück.
+        Ist `on_chunk` gesetzt, wird gestreamt und jedes Textstück sofort an den Callback übergeben.
+        """
+        payload = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            "max_tokens": self.max_tokens,
+            "temperature": 0.0
+        }
+
+        # Der Cache-Key hängt nicht vom Streaming ab: beide Modi teilen sich die Einträge
+        cache_key = None
+        if self.cache is not None:
+            cache_key = ResponseCache.make_key(payload)
+            try:
+                cached = self.cache.get(cache_key)
+            except CacheMiss as e:
+                print(colored(f"❌ FEHLER ({label}): {e}", 'red'))
+                sys.exit(1)
+            if cached is not None:
+                self._record(f"{label} (Cache)", 0.0, cached['prompt_tokens'], cached['completion_tokens'])
+                if on_chunk is not None:
+                    on_chunk(cached['content'])
+                return cached['content']
+
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+
+        print(f"--- Sende Anfrage an KI ({self.model}) ---")
+        start = time.perf_counter()
+        try:
+            if on_chunk is None:
+                response = self.session.post(self.api_url, json=payload, timeout=self.timeout)
+                response.raise_for_status()
+                body = response.json()
+                content = body['choices'][0]['message']['content']
+                usage = body.get('usage') or {}
+            else:
+                content, usage = self._stream(payload, on_chunk)
+        except Exception as e:
+            print(colored(f"❌ API Request Failed ({label}): {e}", 'red'))
+            sys.exit(1)
+
+        prompt_tokens = usage.get('prompt_tokens', 0)
+        completion_tokens = usage.get('completion_tokens', 0)
+        self._record(label, time.perf_counter() - start, prompt_tokens, completion_tokens)
+
+        if cache_key is not None:
+            self.cache.put(cache_key, {
+                "content": content,
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+            })
+        return content
+
+    def _stream(self, payload: dict, on_chunk) -> tuple[str, dict]:
+        """Liest eine SSE-Antwort ("data: {...}" Zeilen bis "data: [DONE]") und reicht die Deltas weiter."""
+        stream_payload = dict(payload, stream=True, stream_options={"include_usage": True})
+        parts = []
+        usage = {}
+
+        with self.session.post(self.api_url, json=stream_payload, timeout=self.timeout, stream=True) as response:
+            response.raise_for_status()
+            response.encoding = "utf-8"
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+
+                event = json.loads(data)
+                if event.get('usage'):
+                    usage = event['usage']
+                for choice in event.get('choices') or []:
+                    delta = (choice.get('delta') or {}).get('content')
+                    if delta:
+                        parts.append(delta)
+                        on_chunk(delta)
+
+        return "".join(parts), usage
+
+    __call__ = query
+
+    def _record(self, label: str, latency: float, prompt_tokens: int, completion_tokens: int):
+        self.calls.append({
+            "label": label,
+            "latency": latency,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+        })
+        print(colored(f"    ⏱️  {label}: {latency:.2f}s | in={prompt_tokens} out={completion_tokens} Tokens", 'blue'))
+
+    def print_stats(self):
+        """Gibt eine Zusammenfassung aller Aufrufe dieses Laufs aus."""
+        if not self.calls:
+            return
+        total_latency = sum(c['latency'] for c in self.calls)
+        total_in = sum(c['prompt_tokens'] for c in self.calls)
+        total_out = sum(c['completion_tokens'] for c in self.calls)
+        print("\n--- LLM STATISTIK ---")
+        for c in self.calls:
+            print(f"  {c['label']:<28} {c['latency']:>7.2f}s  in={c['prompt_tokens']:<6} out={c['completion_tokens']}")
+        print(f"  {'GESAMT (' + str(len(self.calls)) + ' Aufrufe)':<28} {total_latency:>7.2f}s  in={total_in:<6} out={total_out}")
+        if self.cache is not None:
+            print(f"  {self.cache.stats_line()}")
+
+    def close(self):
+        self.session.close()
+
+
+_DEFAULT_CLIENT = None
+
+
+def get_client(cache: ResponseCache | None = None, rate_limiter: TokenBucket | None = None) -> LLMClient:
+    """Liefert den prozessweiten Standard-Client (wird beim ersten Aufruf erzeugt)."""
+    global _DEFAULT_CLIENT
+    if _DEFAULT_CLIENT is None:
+        _DEFAULT_CLIENT = LLMClient(cache=cache, rate_limiter=rate_limiter)
+    return _DEFAULT_CLIENT
@@ -1,49 +1,226 @@
 # main.py
 
 import os
+import re
 import json
-import requests
 import sys
+import time
+import argparse
+import asyncio
+import threading
+import contextlib
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 import prompts
 import topic
+import spec_stream
+import pipeline
+import llm_client
+import spec_utils
+import prompt_builder
+from llm_cache import ResponseCache, DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES
 import testdata_validator # <--- WICHTIG: Import des Validators
+import mock_server_builder
+import generate_tests
 from termcolor import colored
 
 # --- Konfiguration ---
 IONOS_TOKEN = os.getenv("IONOS_API_TOKEN")
 
-if not IONOS_TOKEN:
-    print(colored("❌ FEHLER: IONOS_API_TOKEN fehlt! Bitte setzen Sie die Umgebungsvariable.", 'red'))
-    sys.exit(1)
+# Ein gemeinsamer Client (Keep-Alive-Session) für Interview, Generierung und Validierung.
+# Wird in init_llm() anhand der Kommandozeilen-Optionen erzeugt.
+LLM = None
 
-API_URL = "https://openai.inference.de-txl.ionos.com/v1/chat/completions"
-MODEL = "meta-llama/Llama-3.3-70B-Instruct"
+def positive_float(value: str) -> float:
+    """argparse-Typ für Werte > 0 (z.B. --rate-limit; 0 würde acquire() nie freigeben)."""
+    try:
+        number = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{value}' ist keine Zahl") from None
+    if not 0 < number < float("inf"):
+        raise argparse.ArgumentTypeError(f"muss eine endliche Zahl größer als 0 sein (ist {value})")
+    return number
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="API Mock Server Generator (KI-gestützt)")
+    parser.add_argument("--replay", action="store_true",
+                        help="Nur gecachte KI-Antworten verwenden, bei Cache-Miss sofort abbrechen (offline/CI).")
+    parser.add_argument("--no-cache", action="store_true", help="Antwort-Cache deaktivieren.")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Verzeichnis des Antwort-Caches.")
+    parser.add_argument("--cache-max-mb", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help="Maximale Cache-Größe in MB (LRU-Verdrängung).")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="Maximale Anzahl paralleler KI-Anfragen bei der Testdaten-Generierung.")
+    parser.add_argument("--rate-limit", type=positive_float, default=1.0,
+                        help="Clientseitiges Rate-Limit in KI-Anfragen pro Sekunde (Token-Bucket); gilt insgesamt, "
+                             "im Batch-Modus wird es auf die parallelen Prozesse aufgeteilt.")
+    parser.add_argument("--max-prompt-tokens", type=int, default=prompt_builder.MAX_PROMPT_TOKENS,
+                        help="Obergrenze für die geschätzte Prompt-Größe; größere Prompts brechen ab.")
+    parser.add_argument("--force", action="store_true",
+                        help="Mock-Server und Tests neu generieren, auch wenn sich die Eingaben nicht geändert haben.")
+    parser.add_argument("--batch", metavar="TOPICS_JSONL",
+                        help="Headless: alle Themen aus der Datei ohne Interview generieren (eine Zeile pro Thema).")
+    parser.add_argument("--jobs", type=int, default=4, help="Anzahl paralleler Prozesse im Batch-Modus.")
+    parser.add_argument("--output-dir", default="batch_output", help="Zielverzeichnis im Batch-Modus (ein Unterordner pro Thema).")
+    return parser.parse_args(argv)
+
+def init_llm(args, processes: int = 1):
+    """
+    Erzeugt den gemeinsamen LLM-Client (inkl. Antwort-Cache).
+    Laufen `processes` Prozesse parallel (Batch-Modus), bekommt jeder seinen Anteil am Rate-Limit,
+    sodass --rate-limit insgesamt eingehalten wird.
+    """
+    global LLM
+
+    if args.replay and args.no_cache:
+        print(colored("❌ FEHLER: --replay benötigt den Cache und kann nicht mit --no-cache kombiniert werden.", 'red'))
+        sys.exit(1)
+
+    if not IONOS_TOKEN and not args.replay:
+        print(colored("❌ FEHLER: IONOS_API_TOKEN fehlt! Bitte setzen Sie die Umgebungsvariable.", 'red'))
+        sys.exit(1)
+
+    prompt_builder.MAX_PROMPT_TOKENS = args.max_prompt_tokens
+
+    cache = None
+    if not args.no_cache:
+        cache = ResponseCache(args.cache_dir, args.cache_max_mb * 1024 * 1024, replay=args.replay)
+    rate_limiter = llm_client.TokenBucket(args.rate_limit / processes, capacity=max(1, args.concurrency // processes))
+    LLM = llm_client.get_client(cache=cache, rate_limiter=rate_limiter)
+
+def query_llm(system_prompt: str, user_prompt: str, label: str = "LLM", on_chunk=None) -> str:
+    """Hilfsfunktion: Sendet Anfragen an die KI (mit `on_chunk` gestreamt)."""
+    return LLM.query(system_prompt, user_prompt, label=label, on_chunk=on_chunk)
+
+def generate_spec(final_scope: str, on_spec_ready=None) -> str:
+    """
+    A) OpenAPI und GAP-Analyse erstellen (gestreamt).
+    Die OpenAPI-Datei wird geschrieben, sobald das JSON-Dokument im Stream vollständig ist;
+    `on_spec_ready(spec_content)` wird dann sofort aufgerufen, während die GAP-Analyse noch läuft.
+    """
+    print("\n1️⃣ Erstelle OpenAPI Definition & GAP-Analyse...")
+    
+    formatted_spec_prompt = prompts.SPEC_GENERATION["user"].format(topic=final_scope)
+
+    def on_spec(spec, spec_content_raw):
+        with open("openapi_definition.json", "w", encoding="utf-8") as f:
+            json.dump(spec, f, indent=2)
+        print(colored("    ✅ 'openapi_definition.json' gespeichert (GAP-Analyse wird noch empfangen).", 'green'))
+        if on_spec_ready is not None:
+            on_spec_ready(spec_content_raw)
+
+    parser = spec_stream.SpecStreamParser(on_spec)
+    query_llm(
+        prompts.SPEC_GENERATION["system"], 
+        formatted_spec_prompt,
+        label="SPEC_GENERATION",
+        on_chunk=parser.feed
+    )
 
-def query_llm(system_prompt: str, user_prompt: str) -> str:
-    """Hilfsfunktion: Sendet Anfragen an die KI."""
-    print(f"--- Sende Anfrage an KI ({MODEL}) ---")
     try:
-        response = requests.post(
-            API_URL,
-            headers={"Authorization": f"Bearer {IONOS_TOKEN}"},
-            json={
-                "model": MODEL,
-                "messages": [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                "max_tokens": 4096,
-                "temperature": 0.0
-            },
-            timeout=180
-        )
-        response.raise_for_status()
-        return response.json()['choices'][0]['message']['content']
-    except Exception as e:
-        print(colored(f"API Request Failed: {e}", 'red'))
+        spec_content, gap_analysis = parser.finish()
+    except ValueError:
+        print(colored("❌ FEHLER: Die KI hat die Struktur nicht eingehalten oder JSON ist ungültig.", 'red'))
         sys.exit(1)
 
-def main():
+    with open("gap_analysis.txt", "w", encoding="utf-8") as f:
+        f.write(gap_analysis)
+    print(colored("    ✅ 'gap_analysis.txt' gespeichert.", 'green'))
+
+    return spec_content
+
+def _parse_test_cases(json_output: str, label: str) -> list:
+    clean_json = json_output.replace("```json", "").replace("```", "").strip()
+    try:
+        return json.loads(clean_json)
+    except json.JSONDecodeError:
+        print(colored(f"❌ FEHLER: Konnte Testdaten ({label}) nicht als JSON parsen.", 'red'))
+        sys.exit(1)
+
+def _generate_schema_test_data(spec: dict, path: str, schema_name: str) -> list:
+    # Nur die POST-Operation mit aufgelöstem Schema statt der ganzen Spezifikation
+    label = f"TEST_DATA_GENERATION:{schema_name}"
+    system_prompt, user_prompt = prompt_builder.format_prompt(
+        prompts.TEST_DATA_GENERATION_PER_SCHEMA, label,
+        path=path, schema_name=schema_name,
+        operation_context=prompt_builder.operation_context(spec, path, "post")
+    )
+    json_output = query_llm(system_prompt, user_prompt, label=label)
+    return _parse_test_cases(json_output, schema_name)
+
+def generate_test_data(spec_content: str, concurrency: int = 4):
+    """
+    B) Testdaten erstellen.
+    Pro POST-Operation (Schema) wird eine eigene Anfrage gestellt; die Anfragen laufen
+    parallel (max. `concurrency`) und werden zu {Schema-Name: [Testfälle]} zusammengeführt.
+    """
+    print("\n2️⃣ Erstelle Testdaten basierend auf der API...")
+
+    spec = json.loads(spec_content)
+    operations = spec_utils.post_operations(spec)
+
+    if not operations:
+        # Fallback: keine POST-Operation mit $ref-Schema -> eine Anfrage für die ganze (kompakte) Spec
+        system_prompt, user_prompt = prompt_builder.format_prompt(
+            prompts.TEST_DATA_GENERATION, "TEST_DATA_GENERATION",
+            spec_content=prompt_builder.spec_context(spec_content)
+        )
+        json_output = query_llm(system_prompt, user_prompt, label="TEST_DATA_GENERATION")
+        test_data = _parse_test_cases(json_output, "TEST_DATA_GENERATION")
+        case_count = len(test_data)
+    else:
+        print(f"    -> {len(operations)} Schemas: {', '.join(name for _, name in operations)} (max. {concurrency} parallel)")
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            futures = {
+                schema_name: executor.submit(_generate_schema_test_data, spec, path, schema_name)
+                for path, schema_name in operations
+            }
+            test_data = {schema_name: future.result() for schema_name, future in futures.items()}
+        case_count = sum(len(cases) for cases in test_data.values())
+
+    with open("testdata.json", "w", encoding="utf-8") as f:
+        json.dump(test_data, f, indent=2)
+        
+    print(colored(f"    ✅ {case_count} Testfälle in 'testdata.json' gespeichert.", 'green'))
+
+def build_stages(final_scope: str, concurrency: int = 4, force: bool = False) -> list[pipeline.Stage]:
+    """
+    Deklariert die Generierungs-Stufen als Abhängigkeitsgraph:
+
+        spec ──┬── gap_analysis
+               └── testdata ──┬── validate
+                              ├── mock_server
+                              └── api_tests
+
+    'spec' ist fertig, sobald das OpenAPI-JSON vollständig gestreamt ist; der Rest
+    des Streams (GAP-Analyse) läuft als eigene Stufe parallel zur Testdaten-Generierung.
+    """
+    state = {}
+    spec_json_ready = Future()
+    spec_stream_done = Future()
+
+    def stream_spec():
+        try:
+            generate_spec(final_scope, on_spec_ready=spec_json_ready.set_result)
+            spec_stream_done.set_result(None)
+        except BaseException as e:
+            for f in (spec_json_ready, spec_stream_done):
+                if not f.done():
+                    f.set_exception(e)
+
+    def spec_stage():
+        threading.Thread(target=stream_spec, daemon=True).start()
+        state['spec_content'] = spec_json_ready.result()
+
+    return [
+        pipeline.Stage("spec", spec_stage),
+        pipeline.Stage("gap_analysis", spec_stream_done.result, deps=["spec"]),
+        pipeline.Stage("testdata", lambda: generate_test_data(state['spec_content'], concurrency), deps=["spec"]),
+        pipeline.Stage("validate", lambda: testdata_validator.validate_test_data(client=LLM), deps=["testdata"]),
+        pipeline.Stage("mock_server", lambda: mock_server_builder.create_mock_server(force=force), deps=["testdata"]),
+        pipeline.Stage("api_tests", lambda: generate_tests.create_api_tests(force=force), deps=["testdata"]),
+    ]
+
+def main(concurrency: int = 4, force: bool = False):
     
     # =========================================================
     # SCHRITT 1: Das Interview (Interaktiver Teil)
@@ -58,74 +235,146 @@ def main():
     print("🚀 STARTE AUTOMATISCHE GENERIERUNG...")
     print("="*50)
 
-    # A) OpenAPI und GAP-Analyse erstellen
-    print("\n1️⃣ Erstelle OpenAPI Definition & GAP-Analyse...")
-    
-    formatted_spec_prompt = prompts.SPEC_GENERATION["user"].format(topic=final_scope)
-    
-    raw_output = query_llm(
-        prompts.SPEC_GENERATION["system"], 
-        formatted_spec_prompt
-    )
+    # Spec → Testdaten → (Validierung | Mock-Server | Pytest-Datei) als DAG
+    stages = build_stages(final_scope, concurrency, force)
+    timings = asyncio.run(pipeline.run_pipeline(stages))
 
-    spec_content = "" 
+    print("\n" + "="*50)
+    print("🎉 FERTIG! Generierung abgeschlossen.")
+    print("=====================================")
+    pipeline.print_report(stages, timings)
 
-    try:
-        # Parsen der Ausgabe (JSON und GAP-Analyse)
-        parts = raw_output.split("<<<SPLIT_MARKER>>>")
-        
-        # JSON säubern und speichern
-        spec_content_raw = parts[0].replace("<<<JSON_START>>>", "").replace("```json", "").replace("```", "").strip()
-        gap_analysis = parts[1].strip()
+# =========================================================
+# BATCH-MODUS (Headless, viele Themen parallel)
+# =========================================================
 
-        # Dateien speichern
-        with open("openapi_definition.json", "w", encoding="utf-8") as f:
-            json.dump(json.loads(spec_content_raw), f, indent=2) 
-            
-        with open("gap_analysis.txt", "w", encoding="utf-8") as f:
-            f.write(gap_analysis)
-        
-        print(colored("    ✅ 'openapi_definition.json' gespeichert.", 'green'))
-        print(colored("    ✅ 'gap_analysis.txt' gespeichert.", 'green'))
-        
-        spec_content = spec_content_raw 
-        
-    except (IndexError, json.JSONDecodeError):
-        print(colored("❌ FEHLER: Die KI hat die Struktur nicht eingehalten oder JSON ist ungültig.", 'red'))
-        sys.exit(1)
+def load_batch_topics(batch_filename: str) -> list[dict]:
+    """
+    Liest die Themen-Datei (JSONL). Jede Zeile ist entweder ein JSON-String mit dem Thema
+    oder ein Objekt {"topic": "...", "name": "..."}; "name" bestimmt den Ausgabeordner.
+    """
+    jobs = []
+    with open(batch_filename, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if isinstance(entry, str):
+                entry = {"topic": entry}
+            if not entry.get("topic"):
+                raise ValueError(f"Zeile {line_no}: Feld 'topic' fehlt.")
 
-    # B) Testdaten erstellen
-    print("\n2️⃣ Erstelle Testdaten basierend auf der API...")
-    
-    formatted_test_prompt = prompts.TEST_DATA_GENERATION["user"].format(spec_content=spec_content)
-    
-    json_output = query_llm(
-        prompts.TEST_DATA_GENERATION["system"], 
-        formatted_test_prompt
-    )
-    
+            slug = re.sub(r"\W+", "_", (entry.get("name") or entry["topic"]).lower()).strip("_")[:40]
+            jobs.append({"topic": entry["topic"], "name": f"{len(jobs) + 1:03d}_{slug or 'topic'}"})
+    return jobs
+
+def _run_batch_job(job: dict, args: argparse.Namespace, output_root: str, processes: int = 1) -> dict:
+    """
+    Führt die komplette Pipeline für ein Thema in einem Worker-Prozess aus.
+    Jeder Prozess arbeitet in seinem eigenen Ausgabeordner (os.chdir ist prozesslokal),
+    die Konsolenausgabe landet in run.log.
+    """
+    job_dir = os.path.join(output_root, job["name"])
+    os.makedirs(job_dir, exist_ok=True)
+    os.chdir(job_dir)
+
+    start = time.perf_counter()
+    result = {"name": job["name"], "topic": job["topic"], "dir": job_dir, "status": "ok", "error": None}
+
+    with open("run.log", "w", encoding="utf-8") as log, contextlib.redirect_stdout(log):
+        calls_before = 0
+        try:
+            init_llm(args, processes)
+            calls_before = len(LLM.calls)
+            # Kein Interview: der von der KI verfeinerte Scope wird automatisch übernommen
+            final_scope = topic.refine_topic(query_llm, job["topic"])
+            stages = build_stages(final_scope, args.concurrency, args.force)
+            timings = asyncio.run(pipeline.run_pipeline(stages))
+            pipeline.print_report(stages, timings)
+        except (Exception, SystemExit) as e:
+            result["status"] = "failed"
+            result["error"] = f"{type(e).__name__}: {e}"
+            print(colored(f"❌ Batch-Job fehlgeschlagen: {result['error']}", 'red'))
+
+        calls = LLM.calls[calls_before:] if LLM is not None else []
+
+    result["duration"] = time.perf_counter() - start
+    result["llm_calls"] = len(calls)
+    result["prompt_tokens"] = sum(c['prompt_tokens'] for c in calls)
+    result["completion_tokens"] = sum(c['completion_tokens'] for c in calls)
+    return result
+
+def run_batch(args: argparse.Namespace):
+    """Generiert für jedes Thema der Batch-Datei einen eigenen Mock-Server in einem Prozess-Pool."""
     try:
-        clean_json = json_output.replace("```json", "").replace("```", "").strip()
-        test_data = json.loads(clean_json)
-        
-        with open("testdata.json", "w", encoding="utf-8") as f:
-            json.dump(test_data, f, indent=2)
-            
-        print(colored(f"    ✅ {len(test_data)} Testfälle in 'testdata.json' gespeichert.", 'green'))
-        
-    except json.JSONDecodeError:
-        print(colored("❌ FEHLER: Konnte Testdaten nicht als JSON parsen.", 'red'))
+        jobs = load_batch_topics(args.batch)
+    except (OSError, ValueError) as e:
+        print(colored(f"❌ FEHLER: Batch-Datei '{args.batch}' nicht lesbar: {e}", 'red'))
         sys.exit(1)
 
+    if not IONOS_TOKEN and not args.replay:
+        print(colored("❌ FEHLER: IONOS_API_TOKEN fehlt! Bitte setzen Sie die Umgebungsvariable.", 'red'))
+        sys.exit(1)
+
+    # Worker wechseln ihr Arbeitsverzeichnis -> alle Pfade vorher absolut machen
+    output_root = os.path.abspath(args.output_dir)
+    args.cache_dir = os.path.abspath(args.cache_dir)
+    os.makedirs(output_root, exist_ok=True)
+
+    # Jeder Prozess hat einen eigenen Token-Bucket: das Rate-Limit wird auf die Prozesse aufgeteilt
+    processes = max(1, min(args.jobs, len(jobs)))
+
     print("\n" + "="*50)
-    print("🎉 FERTIG! Generierung abgeschlossen.")
-    print("=====================================")
+    print(f"📦 BATCH-MODUS: {len(jobs)} Themen, {processes} parallele Prozesse "
+          f"(je {args.rate_limit / processes:.2f} KI-Anfragen/s)")
+    print("="*50)
+
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [executor.submit(_run_batch_job, job, args, output_root, processes) for job in jobs]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if result["status"] == "ok":
+                print(colored(f"    ✅ {result['name']} ({result['duration']:.1f}s, {result['llm_calls']} KI-Aufrufe)", 'green'))
+            else:
+                print(colored(f"    ❌ {result['name']}: {result['error']} (siehe {result['dir']}/run.log)", 'red'))
+    wall_time = time.perf_counter() - start
+
+    failed = [r for r in results if r["status"] != "ok"]
+    summary = {
+        "topics": len(jobs),
+        "succeeded": len(jobs) - len(failed),
+        "failed": len(failed),
+        "wall_time": wall_time,
+        "topics_per_minute": len(jobs) / wall_time * 60 if wall_time else 0.0,
+        "prompt_tokens": sum(r["prompt_tokens"] for r in results),
+        "completion_tokens": sum(r["completion_tokens"] for r in results),
+        "jobs": sorted(results, key=lambda r: r["name"]),
+    }
+    with open(os.path.join(output_root, "batch_summary.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+
+    print("\n--- BATCH ZUSAMMENFASSUNG ---")
+    print(f"  Themen:      {summary['succeeded']}/{summary['topics']} erfolgreich, {summary['failed']} fehlgeschlagen")
+    print(f"  Laufzeit:    {wall_time:.1f}s ({summary['topics_per_minute']:.1f} Themen/Minute)")
+    print(f"  Tokens:      in={summary['prompt_tokens']} out={summary['completion_tokens']}")
+    print(f"  Ausgabe:     {output_root} (batch_summary.json)")
+
+    if failed:
+        sys.exit(1)
 
 if __name__ == "__main__":
-    main()
-    # =========================================================
-    # SCHRITT 3: Testfall-Validierung (Automatischer Aufruf)
-    # =========================================================
-    testdata_validator.validate_test_data() 
+    args = parse_args()
+
+    if args.batch:
+        run_batch(args)
+        sys.exit(0)
+
+    init_llm(args)
+    main(args.concurrency, args.force)
+    LLM.print_stats()
     
-    print(colored("\nNächster Schritt: Führen Sie 'python mock_server_builder.py' aus.", 'cyan'))
\ No newline at end of file
+    print(colored("\nNächster Schritt: Starten Sie 'python mock_server.py' und führen Sie anschließend 'pytest test_mock_api.py' aus.", 'cyan'))
\ No newline at end of file
@@ -0,0 +1,414 @@
+# mock_engine.py
+# Spec-getriebener Mock-Server OHNE Code-Generierung.
+#
+# Lädt openapi_definition.json beim Start, baut die Pydantic-Models (inkl.
+# verschachtelter Objekte, Arrays und $refs) und die Routen im Prozess und
+# beobachtet die Spec-Datei. Bei einer Änderung wird eine neue FastAPI-App
+# gebaut und atomar gegen die alte getauscht:
+#   - laufende Requests werden von der alten App zu Ende bearbeitet,
+#   - die In-Memory-Daten (ResourceStores) bleiben erhalten und werden auf die
+#     neuen Models migriert.
+# Latenz-/Fehlerprofile kommen aus den x-mock-* Erweiterungen der Spec und optional
+# aus einer Sidecar-Datei (--profiles), die ebenfalls beobachtet wird; Rate-Limits aus
+# x-mock-rate-limit (die Buckets beginnen nach einem Reload wieder voll).
+# Unter /metrics stehen Prometheus-Metriken; die Zähler überleben einen Reload.
+#
+# Start: python mock_engine.py [--spec openapi_definition.json] [--data testdata.json] [--port 8000]
+
+import os
+import sys
+import json
+import asyncio
+import inspect
+import argparse
+from typing import Any, Dict, List, Optional
+from fastapi import FastAPI, HTTPException, Depends, Header, Body, Query, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ConfigDict, Field, create_model
+import uvicorn
+from termcolor import colored
+import spec_utils
+from mock_runtime import (ResourceStore, CompressionMiddleware, FaultInjectionMiddleware, FaultProfiles,
+                          RateLimitMiddleware, RateLimits, Metrics, MetricsMiddleware, PreconditionFailed, NDJSON, batch_delete, batch_upsert, etag_matches, list_page,
+                          load_profiles, merge_profiles, wants_ndjson)
+from mock_server_builder import collect_resources, route_keys, filter_fields, _identifier, _route_path, _success_status, PY_TYPES
+
+RELOAD_INTERVAL = 0.25  # Sekunden zwischen zwei Prüfungen der Spec-Datei
+_PY_TYPE_MAP = {'int': int, 'float': float, 'bool': bool, 'str': str}
+
+
+# --- 1. Pydantic-Models zur Laufzeit ---
+
+def _runtime_type(spec: dict, prop_def: dict, hint: str, models: dict):
+    if '$ref' in prop_def:
+        name = spec_utils.ref_name(prop_def['$ref'])
+        return build_model(spec, name, spec_utils.resolve_ref(spec, prop_def), models)
+
+    prop_type = prop_def.get('type')
+    if prop_type == 'array':
+        return List[_runtime_type(spec, prop_def.get('items') or {}, hint + 'Item', models)]
+    if prop_type == 'object':
+        if prop_def.get('properties'):
+            return build_model(spec, hint, prop_def, models)
+        return Dict[str, Any]
+    return _PY_TYPE_MAP[PY_TYPES.get(prop_type, 'str')]
+
+
+def build_model(spec: dict, model_name: str, schema: dict, models: dict, with_id: bool = False):
+    """Pydantic-Model für ein Schema – gleiche Regeln wie mock_server_builder._model_code."""
+    if model_name in models:
+        # None = Model ist gerade im Aufbau (zyklische $ref) -> als freies Objekt behandeln
+        return models[model_name] or Dict[str, Any]
+    models[model_name] = None
+
+    properties = dict(schema.get('properties', {}))
+    if with_id and 'id' not in properties:
+        properties = {'id': {'type': 'integer'}, **properties}
+    required = schema.get('required', [])
+
+    fields = {}
+    for prop_name, prop_def in properties.items():
+        field_name = _identifier(prop_name)
+        py_type = _runtime_type(spec, prop_def, f"{model_name}{field_name[:1].upper()}{field_name[1:]}", models)
+        alias = prop_name if field_name != prop_name else None
+
+        if prop_name == 'id':
+            fields[field_name] = (Optional[int], None)
+        elif prop_name not in required:
+            fields[field_name] = (Optional[py_type], Field(None, alias=alias))
+        else:
+            fields[field_name] = (py_type, Field(..., alias=alias))
+
+    model = create_model(model_name, __config__=ConfigDict(populate_by_name=True), **fields)
+    models.pop(model_name)
+    models[model_name] = model
+    return model
+
+
+# --- 2. Routen zur Laufzeit ---
+
+def verify_api_key(x_api_key: str = Header(None)):
+    if x_api_key != "MOCK_TOKEN_123":
+        raise HTTPException(status_code=401, detail="Invalid API Key. Authorization required.")
+    return True
+
+
+def _endpoint(func, params: list[inspect.Parameter]):
+    """Gibt einer **kwargs-Funktion die Signatur, aus der FastAPI Pfad-Parameter und Body ableitet."""
+    func.__signature__ = inspect.Signature(params)
+    return func
+
+
+def _add_resource_routes(app: FastAPI, spec: dict, resource: dict, model, stores: Dict[str, ResourceStore]):
+    name = resource['name']
+    parent_params = resource['parent_params']
+    item_param = resource['item_param']
+    schema_name = resource['schema_name']
+    store = stores[name]
+    parent_store = stores.get(resource['parent_name']) if resource['parent_name'] else None
+    children = [stores[c] for c in resource['children'] if c in stores]
+    cpath = _route_path(resource['collection_path'])
+    ipath = _route_path(resource['item_path']) if resource['item_path'] else None
+    cops, iops = resource['collection_ops'], resource['item_ops']
+    secured = [Depends(verify_api_key)]
+
+    def param(n, annotation=int, default=inspect.Parameter.empty):
+        return inspect.Parameter(n, inspect.Parameter.KEYWORD_ONLY, annotation=annotation, default=default)
+
+    path_params = [param(p) for p in parent_params]
+    id_param = param(item_param)
+    body_param = param("item", model, Body(...))
+    response_param = param("response", Response)
+    if_none_match_param = param("if_none_match", Optional[str], Header(None))
+
+    def scope_of(kwargs):
+        return tuple(kwargs[p] for p in parent_params)
+
+    def check_parent(kwargs):
+        if parent_store is not None and parent_store.get(scope_of(kwargs)[:-1], kwargs[parent_params[-1]]) is None:
+            raise HTTPException(status_code=404, detail=f"{resource['parent_schema']} not found")
+
+    if 'post' in cops:
+        async def create(**kwargs):
+            check_parent(kwargs)
+            item = kwargs["item"]
+            if item.id is not None:
+                raise HTTPException(status_code=400, detail="ID must not be provided on creation.")
+            item = store.create(scope_of(kwargs), item)
+            kwargs["response"].headers["ETag"] = store.last_etag
+            return item
+        app.post(cpath, status_code=_success_status(cops['post'], 201), response_model=model, dependencies=secured,
+                 name=f"create_{resource['singular']}")(_endpoint(create, path_params + [body_param, response_param]))
+
+        allow_update = bool(ipath and 'put' in iops)
+
+        async def create_batch(**kwargs):
+            check_parent(kwargs)
+            status_code, body = batch_upsert(store, scope_of(kwargs), kwargs["items"], allow_update)
+            return Response(content=body, status_code=status_code, media_type="application/json")
+        app.post(f"{cpath}:batch", dependencies=secured, name=f"batch_upsert_{name}")(
+            _endpoint(create_batch, path_params + [param("items", List[model], Body(...))]))
+
+    if 'get' in cops:
+        fields = filter_fields(spec, schema_name, parent_params + ['limit', 'cursor', 'if_none_match', 'accept'])
+        query_params = [param("limit", Optional[int], Query(None, ge=1)), param("cursor", Optional[str], None)]
+        for field, prop, py_type in fields:
+            query_params.append(param(field, Optional[_PY_TYPE_MAP[py_type]], Query(None, alias=prop)))
+            if py_type == 'str':
+                query_params.append(param(f"{field}__prefix", Optional[str], Query(None, alias=f"{prop}__prefix")))
+
+        async def get_all(**kwargs):
+            check_parent(kwargs)
+            ndjson = wants_ndjson(kwargs["accept"])
+            try:
+                body, headers = list_page(store, scope_of(kwargs), kwargs["limit"], kwargs["cursor"],
+                                          {f: kwargs[f] for f, _, _ in fields},
+                                          {f: kwargs[f"{f}__prefix"] for f, _, t in fields if t == 'str'},
+                                          kwargs["if_none_match"], ndjson)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            if body is None:
+                return Response(status_code=304, headers=headers)
+            if ndjson:
+                return StreamingResponse(body, media_type=NDJSON, headers=headers)
+            return Response(content=body, media_type="application/json", headers=headers)
+        app.get(cpath, response_model=List[model],
+                name=f"get_all_{name}")(_endpoint(get_all, path_params + query_params + [if_none_match_param,
+                                                                               param("accept", Optional[str], Header(None))]))
+
+    if ipath and 'get' in iops:
+        async def get_one(**kwargs):
+            scope, item_id = scope_of(kwargs), kwargs[item_param]
+            etag = store.etag(scope, item_id)
+            if etag_matches(kwargs["if_none_match"], etag):
+                return Response(status_code=304, headers={"ETag": etag})
+            body = store.item_json(scope, item_id)
+            if body is None or etag is None:
+                raise HTTPException(status_code=404, detail=f"{schema_name} not found")
+            return Response(content=body, media_type="application/json", headers={"ETag": etag})
+        app.get(ipath, response_model=model,
+                name=f"get_one_{resource['singular']}")(_endpoint(get_one, path_params + [id_param, if_none_match_param]))
+
+    if ipath and 'put' in iops:
+        async def update(**kwargs):
+            scope, item_id, item = scope_of(kwargs), kwargs[item_param], kwargs["item"]
+            if store.get(scope, item_id) is None:
+                raise HTTPException(status_code=404, detail=f"{schema_name} not found")
+            if item.id is not None and item.id != item_id:
+                raise HTTPException(status_code=400, detail="ID in body must match ID in path")
+            try:
+                item = store.replace(scope, item_id, item, kwargs["if_match"])
+            except PreconditionFailed as e:
+                raise HTTPException(status_code=412, detail=str(e), headers={"ETag": e.etag} if e.etag else None)
+            kwargs["response"].headers["ETag"] = store.last_etag
+            return item
+        app.put(ipath, response_model=model, dependencies=secured,
+                name=f"update_{resource['singular']}")(_endpoint(update, path_params + [id_param, body_param, response_param,
+                                                                                        param("if_match", Optional[str], Header(None))]))
+
+    if ipath and 'delete' in iops:
+        async def delete(**kwargs):
+            scope, item_id = scope_of(kwargs), kwargs[item_param]
+            if not store.delete(scope, item_id):
+                raise HTTPException(status_code=404, detail=f"{schema_name} not found")
+            for child in children:
+                child.drop_children(scope + (item_id,))
+        app.delete(ipath, status_code=204, dependencies=secured,
+                   name=f"delete_{resource['singular']}")(_endpoint(delete, path_params + [id_param]))
+
+        async def delete_batch(**kwargs):
+            check_parent(kwargs)
+            status_code, body = batch_delete(store, scope_of(kwargs), kwargs["ids"], children)
+            return Response(content=body, status_code=status_code, media_type="application/json")
+        app.delete(f"{cpath}:batch", dependencies=secured, name=f"batch_delete_{name}")(
+            _endpoint(delete_batch, path_params + [param("ids", List[int], Body(...))]))
+
+
+def build_app(spec: dict, stores: Dict[str, ResourceStore], profiles: Optional[dict] = None,
+              metrics: Optional[Metrics] = None) -> FastAPI:
+    """
+    Baut eine komplette FastAPI-App aus der Spec. Vorhandene Stores werden weiterverwendet
+    (Daten bleiben erhalten) und auf die neuen Models migriert; neue Ressourcen bekommen neue Stores.
+    `stores` wird erst verändert, wenn die App vollständig gebaut ist: scheitert der Bau, arbeitet
+    die alte App unverändert auf ihren Stores weiter.
+    `profiles` (Sidecar) überschreibt die x-mock-* Profile der Spec pro Route; `metrics` wird
+    über Reloads hinweg weitergereicht, damit die Zähler nicht zurückgesetzt werden.
+    """
+    resources = collect_resources(spec)
+    routes = route_keys(resources)
+    faults = FaultProfiles(merge_profiles(spec_utils.mock_profiles(spec), profiles or {}), routes)
+    limits = RateLimits(spec_utils.rate_limits(spec), routes)
+    models = {}
+    for resource in resources:
+        schema_name = resource['schema_name']
+        build_model(spec, schema_name, spec['components']['schemas'][schema_name], models, with_id=True)
+
+    app_stores = dict(stores)
+    migrations = []
+    for resource in resources:
+        model = models[resource['schema_name']]
+        store = app_stores.get(resource['name'])
+        if store is None:
+            app_stores[resource['name']] = ResourceStore(resource['name'], model)
+        elif store.model is not model:
+            migrations.append((store, model))
+
+    app = FastAPI(
+        title=spec.get('info', {}).get('title', "Mock API"),
+        description="Mock Engine: Routen und Models werden zur Laufzeit aus der OpenAPI Spec erzeugt (Hot Reload).",
+        version=str(spec.get('info', {}).get('version', "1.0.0")),
+    )
+    app.add_middleware(CompressionMiddleware)
+    if faults:
+        app.add_middleware(FaultInjectionMiddleware, faults=faults)
+    if limits:
+        app.add_middleware(RateLimitMiddleware, limits=limits)
+    if metrics is not None:
+        app.add_middleware(MetricsMiddleware, metrics=metrics)
+    for resource in resources:
+        _add_resource_routes(app, spec, resource, models[resource['schema_name']], app_stores)
+
+    # Ab hier kann nichts mehr scheitern: Daten migrieren und neue Stores übernehmen
+    for store, model in migrations:
+        _migrate(store, model)
+    stores.update(app_stores)
+    return app
+
+
+def _migrate(store: ResourceStore, model):
+    """Bestehende Datensätze auf das neue Model übertragen; inkompatible bleiben unverändert erhalten."""
+    failed = 0
+    for bucket in store.scopes.values():
+        for item_id, item in bucket.items():
+            try:
+                bucket[item_id] = model.model_validate(item.model_dump(by_alias=True))
+            except Exception:
+                failed += 1
+    store.model = model
+    store.invalidate_all()
+    if failed:
+        print(colored(f"⚠️ {store.name}: {failed} Datensätze passen nicht zum neuen Schema und wurden unverändert behalten.", 'yellow'))
+
+
+# --- 3. Hot-Reload-Dispatcher ---
+
+class MockEngine:
+    """
+    ASGI-App, die jeden Request an die aktuell gültige FastAPI-App weiterreicht.
+    Der Tausch ist eine einzelne Referenzzuweisung; ein laufender Request behält
+    die App, mit der er begonnen hat.
+    """
+
+    def __init__(self, spec_filename: str, data_filename: str | None = None, reload: bool = True,
+                 profiles_filename: str | None = None):
+        self.spec_filename = spec_filename
+        self.profiles_filename = profiles_filename
+        self.reload_enabled = reload
+        self.stores: Dict[str, ResourceStore] = {}
+        self.metrics = Metrics(self.stores)
+        self.app = build_app(self._read_spec(), self.stores, load_profiles(profiles_filename, required=True), self.metrics)
+        self._mtime = self._mtimes()
+        self._watcher = None
+
+        if data_filename:
+            self._seed(data_filename)
+
+    def _mtimes(self) -> tuple:
+        files = [self.spec_filename] + ([self.profiles_filename] if self.profiles_filename else [])
+        return tuple(os.stat(f).st_mtime_ns if os.path.exists(f) else None for f in files)
+
+    def _read_spec(self) -> dict:
+        with open(self.spec_filename, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _seed(self, data_filename: str):
+        """Startdaten wie im generierten Server laden (nur Top-Level-Ressourcen mit gültiger Integer-ID)."""
+        try:
+            with open(data_filename, 'r', encoding='utf-8') as f:
+                test_data_raw = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            print(colored(f"⚠️ Testdaten '{data_filename}' nicht lesbar – Start ohne Daten.", 'yellow'))
+            return
+
+        spec = self._read_spec()
+        first_schema = spec_utils.first_post_schema(spec)
+        for resource in collect_resources(spec):
+            if resource['parent_name']:
+                continue
+            if not isinstance(test_data_raw, dict) and resource['schema_name'] != first_schema:
+                continue
+            store = self.stores[resource['name']]
+            for item_data in spec_utils.testdata_for_schema(test_data_raw, resource['schema_name']):
+                if not (isinstance(item_data, dict) and isinstance(item_data.get('id'), int)):
+                    continue
+                try:
+                    store.seed((), item_data['id'], store.model(**item_data))
+                except Exception as e:
+                    print(f"WARNUNG: Testdaten {store.name} ID {item_data['id']} konnte nicht geladen werden ({e})")
+
+    def reload(self):
+        """Spec neu laden und die App atomar tauschen. Bei Fehlern bleibt die alte App aktiv."""
+        try:
+            new_app = build_app(self._read_spec(), self.stores, load_profiles(self.profiles_filename), self.metrics)
+        except Exception as e:
+            print(colored(f"⚠️ Spec-Reload fehlgeschlagen, alte Version bleibt aktiv: {e}", 'yellow'))
+            return
+        self.app = new_app
+        print(colored(f"🔄 Spec neu geladen: {len(new_app.routes)} Routen aktiv.", 'green'))
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(RELOAD_INTERVAL)
+            mtime = self._mtimes()
+            if mtime[0] is None:
+                continue
+            if mtime != self._mtime:
+                # Nur einmal pro Änderung versuchen; ein halb geschriebenes JSON wird beim nächsten Schreiben erneut geladen
+                self._mtime = mtime
+                self.reload()
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                if self.reload_enabled:
+                    self._watcher = asyncio.create_task(self._watch())
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self._watcher is not None:
+                    self._watcher.cancel()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        app = self.app
+        await app(scope, receive, send)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Spec-getriebener Mock-Server mit Hot Reload")
+    parser.add_argument("--spec", default="openapi_definition.json", help="OpenAPI-Spezifikation (wird beobachtet).")
+    parser.add_argument("--data", default="testdata.json", help="Testdaten für den Start (leer lassen für keine).")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--no-reload", action="store_true", help="Spec-Datei nicht beobachten.")
+    parser.add_argument("--profiles", default=None, help="Sidecar-Datei mit Latenz-/Fehlerprofilen (wird beobachtet).")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    try:
+        engine = MockEngine(args.spec, args.data or None, reload=not args.no_reload, profiles_filename=args.profiles)
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        print(colored(f"❌ FEHLER: Spec oder Profil-Datei nicht lesbar: {e}", 'red'))
+        sys.exit(1)
+    except ValueError as e:
+        print(colored(f"❌ FEHLER: Ungültiges Latenz-/Fehlerprofil oder Rate-Limit: {e}", 'red'))
+        sys.exit(1)
+
+    print(f"🚀 Mock Engine gestartet auf http://127.0.0.1:{args.port} (Spec: {args.spec})")
+    print(f"🔗 Dokumentation (Swagger UI) verfügbar unter http://127.0.0.1:{args.port}/docs")
+    uvicorn.run(engine, host="0.0.0.0", port=args.port)
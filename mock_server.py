@@ -4,31 +4,1754 @@
 # DIESER CODE WURDE AUTOMATISCH VON mock_server_builder.py GENERIERT
 # BASIEREND AUF openapi_definition.json
 #
-from fastapi import FastAPI, HTTPException, Depends, Header
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Response, Body
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ConfigDict, Field
 import uvicorn
 from typing import List, Dict, Any, Optional
+from contextlib import asynccontextmanager
+import argparse
 import sys
 import os
 
-# --- 1. Pydantic Model (Schema: Project) ---
+# --- 0. Runtime (aus mock_runtime.py) ---
+# --- BEGIN RUNTIME ---
+import os
+import re
+import sys
+import json
+import math
+import mmap
+import time
+import heapq
+import base64
+import random
+import asyncio
+import struct
+import zlib
+import sqlite3
+import threading
+from contextlib import contextmanager
+from bisect import bisect_left, bisect_right, insort
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Optional: brotli-Kompression, sonst nur gzip
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+NDJSON = "application/x-ndjson"
+STREAM_CHUNK = 1000
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class SeedFile:
+    """
+    Startdaten als JSONL-Datei plus binärem Offset-Index, beide memory-mapped.
+    Index: eine JSON-Kopfzeile {"stores": {name: [erster Eintrag, Anzahl]}, "meta": {...}} und danach
+    pro Store nach ID sortierte Einträge (id, offset, länge). Ein Datensatz wird erst
+    gelesen, wenn er gebraucht wird – die Startzeit hängt nicht von der Datenmenge ab.
+    """
+
+    ENTRY = struct.Struct("<qQI")
+
+    def __init__(self, data_path: str, index_path: str):
+        self._files = [open(data_path, 'rb'), open(index_path, 'rb')]
+        self.data, self.index = (
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+            for f in self._files
+        )
+        header_end = self.index.find(b"\n") + 1
+        header = json.loads(self.index[:header_end])
+        self.stores: Dict[str, List[int]] = header["stores"]
+        self.meta: dict = header.get("meta", {})
+        self._entries_start = header_end
+
+    def _entry(self, store: str, position: int) -> Tuple[int, int, int]:
+        first = self.stores[store][0]
+        return self.ENTRY.unpack_from(self.index, self._entries_start + (first + position) * self.ENTRY.size)
+
+    def count(self, store: str) -> int:
+        return self.stores.get(store, [0, 0])[1]
+
+    def max_id(self, store: str) -> int:
+        return self._entry(store, self.count(store) - 1)[0] if self.count(store) else 0
+
+    def _read(self, offset: int, length: int) -> dict:
+        return json.loads(self.data[offset:offset + length])
+
+    def lookup(self, store: str, item_id: int) -> Optional[dict]:
+        """Binäre Suche im Index: O(log n), ohne die übrigen Datensätze anzufassen."""
+        low, high = 0, self.count(store) - 1
+        while low <= high:
+            mid = (low + high) // 2
+            entry_id, offset, length = self._entry(store, mid)
+            if entry_id == item_id:
+                return self._read(offset, length)
+            if entry_id < item_id:
+                low = mid + 1
+            else:
+                high = mid - 1
+        return None
+
+    def items(self, store: str, raw: bool = False):
+        """(id, datensatz) in ID-Reihenfolge; mit raw=True die JSON-Bytes statt eines Dicts."""
+        for position in range(self.count(store)):
+            entry_id, offset, length = self._entry(store, position)
+            yield entry_id, (self.data[offset:offset + length] if raw else self._read(offset, length))
+
+
+def write_seed_file(data_path: str, index_path: str, records: Dict[str, Iterable[Tuple[int, dict]]],
+                    meta: Optional[dict] = None):
+    """
+    Schreibt Startdaten im SeedFile-Format (JSONL + sortierter Offset-Index).
+    Pro Store ein Iterable von (id, datensatz) in aufsteigender ID-Reihenfolge –
+    so können auch Millionen generierter Datensätze gestreamt werden. Ein Datensatz
+    darf auch bereits serialisiertes JSON (bytes) sein.
+    """
+    stores = {}
+    entries = []
+    offset = 0
+    with open(data_path, 'wb') as data_file:
+        for store, items in records.items():
+            first = len(entries)
+            for item_id, item in items:
+                line = item if isinstance(item, bytes) else json.dumps(item, ensure_ascii=False, separators=(",", ":")).encode('utf-8')
+                data_file.write(line + b"\n")
+                entries.append(SeedFile.ENTRY.pack(item_id, offset, len(line)))
+                offset += len(line) + 1
+            stores[store] = [first, len(entries) - first]
+
+    with open(index_path, 'wb') as index_file:
+        index_file.write(json.dumps({"stores": stores, "meta": meta or {}}).encode('utf-8') + b"\n")
+        index_file.writelines(entries)
+
+
+class ResourceStore:
+    """
+    In-Memory Speicher einer Ressource mit eigener ID-Sequenz.
+    Unter-Ressourcen (z.B. /issues/{issueId}/comments) werden pro Eltern-Scope
+    abgelegt: scope = Tuple der Eltern-IDs, () für Top-Level-Ressourcen.
+    Lesende Endpunkte bekommen fertig serialisierte JSON-Bytes (pro Datensatz und
+    pro Collection), die bei jedem Schreibzugriff auf den Scope verworfen werden.
+    Für Filter werden pro Scope und Feld Hash-Indizes (Wert -> IDs) beim ersten
+    Zugriff aufgebaut und danach bei jedem Schreibzugriff mitgeführt.
+    Jeder Schreibzugriff erhöht die Version des Stores (Collection-ETag) und vergibt sie
+    dem geschriebenen Datensatz (Datensatz-ETag); `epoch` unterscheidet Server-Läufe,
+    `last_etag` ist der ETag des zuletzt geschriebenen Datensatzes (für die Antwort auf POST/PUT).
+    """
+
+    def __init__(self, name: str, model):
+        self.name = name
+        self.model = model
+        self.scopes: Dict[Tuple[int, ...], Dict[int, object]] = {}
+        self.next_id = 1
+        self.seed_file: Optional[SeedFile] = None
+        self._seed_consumed: set = set()
+        self._seed_complete = True
+        self._item_json: Dict[Tuple[int, ...], Dict[int, bytes]] = {}
+        self._list_json: Dict[Tuple[int, ...], bytes] = {}
+        self._ids: Dict[Tuple[int, ...], List[int]] = {}
+        self._indexes: Dict[Tuple[int, ...], Dict[str, Dict[object, set]]] = {}
+        self._index_keys: Dict[Tuple[int, ...], Dict[str, List[str]]] = {}
+        self.version = 0
+        self.epoch = format(time.time_ns(), 'x')
+        self._versions: Dict[Tuple[int, ...], Dict[int, int]] = {}
+        self.last_etag: Optional[str] = None
+        self.journal: Optional["Journal"] = None
+
+    def attach_seed(self, seed_file: SeedFile):
+        """Startdaten (nur Top-Level-Scope) anhängen; sie werden beim ersten Zugriff validiert."""
+        self.seed_file = seed_file
+        self._seed_complete = seed_file.count(self.name) == 0
+        self.next_id = max(self.next_id, seed_file.max_id(self.name) + 1)
+
+    def _take_seed(self, bucket: dict, item_id: int, data: dict) -> Optional[object]:
+        """Startdatensatz validieren und in den Bucket übernehmen."""
+        try:
+            item = self.model(**data)
+        except Exception as e:
+            print(f"WARNUNG: Testdaten {self.name} ID {item_id} konnte nicht geladen werden ({e})")
+            item = None
+        if item is not None:
+            bucket[item_id] = self._pack(item)
+        # Erst nach dem Bucket als verbraucht markieren: der Snapshot-Thread kopiert in umgekehrter
+        # Reihenfolge und sieht den Datensatz so in mindestens einer der beiden Kopien
+        self._seed_consumed.add(item_id)
+        return item
+
+    def _load_seed(self, item_id: int) -> Optional[object]:
+        if self._seed_complete or item_id in self._seed_consumed:
+            return None
+        data = self.seed_file.lookup(self.name, item_id)
+        if data is None:
+            return None
+        return self._take_seed(self.bucket(()), item_id, data)
+
+    def _load_all_seeds(self):
+        """Vor einem Voll-Scan: alle noch nicht geladenen Startdaten übernehmen, Reihenfolge nach ID."""
+        if self._seed_complete:
+            return
+        bucket = self.bucket(())
+        for item_id, data in self.seed_file.items(self.name):
+            if item_id not in self._seed_consumed and item_id not in bucket:
+                self._take_seed(bucket, item_id, data)
+        self.scopes[()] = dict(sorted(bucket.items()))
+        self._seed_complete = True
+
+    # Speicherformat eines Datensatzes: hier die Model-Instanz selbst (siehe CompactStore)
+    def _pack(self, item):
+        return item
+
+    def _unpack(self, stored):
+        return stored
+
+    def bucket(self, scope: Tuple[int, ...]) -> Dict[int, object]:
+        return self.scopes.setdefault(scope, {})
+
+    def list(self, scope: Tuple[int, ...] = ()) -> List[object]:
+        if scope == ():
+            self._load_all_seeds()
+        return [self._unpack(stored) for stored in self.scopes.get(scope, {}).values()]
+
+    def get(self, scope: Tuple[int, ...], item_id: int) -> Optional[object]:
+        stored = self.scopes.get(scope, {}).get(item_id)
+        if stored is None:
+            return self._load_seed(item_id) if scope == () else None
+        return self._unpack(stored)
+
+    def item_json(self, scope: Tuple[int, ...], item_id: int) -> Optional[bytes]:
+        """Serialisierter Datensatz (wie response_model ihn ausgeben würde) oder None."""
+        cache = self._item_json.setdefault(scope, {})
+        body = cache.get(item_id)
+        if body is None:
+            item = self.get(scope, item_id)
+            if item is None:
+                return None
+            body = cache[item_id] = item.model_dump_json(by_alias=True).encode('utf-8')
+        return body
+
+    def list_json(self, scope: Tuple[int, ...] = ()) -> bytes:
+        """Serialisierte Collection; wird aus den gecachten Datensätzen zusammengesetzt."""
+        body = self._list_json.get(scope)
+        if body is None:
+            # IDs direkt aus den Bucket-Keys, ohne jeden Datensatz zu entpacken
+            if scope == ():
+                self._load_all_seeds()
+            ids = list(self.scopes.get(scope, {}))
+            body = self._list_json[scope] = b"[" + b",".join(self.item_json(scope, i) for i in ids) + b"]"
+        return body
+
+    def _invalidate(self, scope: Tuple[int, ...], item_id: Optional[int] = None):
+        self._list_json.pop(scope, None)
+        if item_id is None:
+            self._item_json.pop(scope, None)
+        else:
+            self._item_json.get(scope, {}).pop(item_id, None)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Mehrere Schreibzugriffe als Einheit (Batch-Endpunkte). Im Speicher läuft alles in einem Thread
+        ohne await dazwischen; die Aufrufer prüfen vorab, sodass kein Schreibzugriff halb scheitert.
+        """
+        yield self
+
+    def invalidate_all(self):
+        """Alle serialisierten Antworten verwerfen (z.B. wenn sich das Model geändert hat); alle ETags ändern sich."""
+        self._item_json.clear()
+        self._list_json.clear()
+        self.epoch = format(time.time_ns(), 'x')
+
+    # --- Versionen / ETags ---
+
+    def etag(self, scope: Tuple[int, ...], item_id: int) -> Optional[str]:
+        """ETag eines Datensatzes oder None, wenn es ihn nicht gibt. Unveränderte Startdaten haben Version 0."""
+        version = self._versions.get(scope, {}).get(item_id)
+        if version is None:
+            if self.get(scope, item_id) is None:
+                return None
+            version = 0
+        return f'"{self.epoch}-{version}"'
+
+    def collection_etag(self, key: str) -> str:
+        """ETag einer Collection-Antwort; `key` beschreibt die Abfrage (Scope, Seite, Filter)."""
+        return f'"{self.epoch}-{self.version}-{zlib.crc32(key.encode()):x}"'
+
+    def _put(self, scope: Tuple[int, ...], item_id: int, item):
+        # get() lädt einen noch nicht gelesenen Startdatensatz, damit er nicht doppelt gezählt wird
+        old = self.get(scope, item_id)
+        self.bucket(scope)[item_id] = self._pack(item)
+        self.version += 1
+        self._versions.setdefault(scope, {})[item_id] = self.version
+        self.last_etag = f'"{self.epoch}-{self.version}"'
+        if self.journal is not None:
+            self.journal.put(self, scope, item_id, item)
+        self._invalidate(scope, item_id)
+        if old is not None:
+            self._unindex(scope, item_id, old)
+        elif scope in self._ids:
+            insort(self._ids[scope], item_id)
+        self._index(scope, item_id, item)
+
+    def create(self, scope: Tuple[int, ...], item) -> object:
+        item.id = self.next_id
+        self.next_id += 1
+        self._put(scope, item.id, item)
+        return item
+
+    def seed(self, scope: Tuple[int, ...], item_id: int, item):
+        self._put(scope, item_id, item)
+        self.next_id = max(self.next_id, item_id + 1)
+
+    def replace(self, scope: Tuple[int, ...], item_id: int, item, if_match: Optional[str] = None) -> object:
+        """Datensatz ersetzen; mit `if_match` nur, wenn der aktuelle ETag passt (sonst PreconditionFailed)."""
+        if if_match is not None and not etag_matches(if_match, self.etag(scope, item_id)):
+            raise PreconditionFailed(self.etag(scope, item_id))
+        item.id = item_id
+        self._put(scope, item_id, item)
+        return item
+
+    def delete(self, scope: Tuple[int, ...], item_id: int) -> bool:
+        item = self.get(scope, item_id)
+        if item is None:
+            return False
+        del self.scopes[scope][item_id]
+        self.version += 1
+        self._versions.get(scope, {}).pop(item_id, None)
+        if self.journal is not None:
+            self.journal.delete(self, scope, item_id)
+        self._invalidate(scope, item_id)
+        self._unindex(scope, item_id, item)
+        ids = self._ids.get(scope)
+        if ids is not None:
+            del ids[bisect_left(ids, item_id)]
+        return True
+
+    def drop_children(self, parent_scope: Tuple[int, ...]):
+        """Kaskadierendes Löschen: entfernt alle Scopes unterhalb eines gelöschten Eltern-Objekts."""
+        depth = len(parent_scope)
+        self.version += 1
+        for scope in [s for s in self.scopes if s[:depth] == parent_scope]:
+            del self.scopes[scope]
+            self._versions.pop(scope, None)
+            self._invalidate(scope)
+            self._ids.pop(scope, None)
+            self._indexes.pop(scope, None)
+            self._index_keys.pop(scope, None)
+        # Wie bei _put/delete erst nach der Änderung: ein Snapshot darf sie nicht verpassen
+        if self.journal is not None:
+            self.journal.drop(self, parent_scope)
+
+    # --- Sekundär-Indizes, Filter und Cursor-Pagination ---
+
+    def _index(self, scope: Tuple[int, ...], item_id: int, item):
+        for field, index in self._indexes.get(scope, {}).items():
+            value = getattr(item, field, None)
+            ids = index.get(value)
+            if ids is None:
+                ids = index[value] = set()
+                keys = self._index_keys[scope].get(field)
+                if keys is not None and isinstance(value, str):
+                    insort(keys, value)
+            ids.add(item_id)
+
+    def _unindex(self, scope: Tuple[int, ...], item_id: int, item):
+        for field, index in self._indexes.get(scope, {}).items():
+            value = getattr(item, field, None)
+            ids = index.get(value)
+            if ids is None:
+                continue
+            ids.discard(item_id)
+            if not ids:
+                del index[value]
+                keys = self._index_keys[scope].get(field)
+                if keys is not None and isinstance(value, str):
+                    del keys[bisect_left(keys, value)]
+
+    def field_index(self, scope: Tuple[int, ...], field: str) -> Dict[object, set]:
+        """Hash-Index Wert -> IDs für ein Feld; beim ersten Zugriff einmalig aufgebaut."""
+        indexes = self._indexes.setdefault(scope, {})
+        index = indexes.get(field)
+        if index is None:
+            index = {}
+            for item_id, stored in self.scopes.get(scope, {}).items():
+                index.setdefault(getattr(self._unpack(stored), field, None), set()).add(item_id)
+            indexes[field] = index
+            self._index_keys.setdefault(scope, {})
+        return index
+
+    def _prefix_ids(self, scope: Tuple[int, ...], field: str, prefix: str) -> set:
+        """IDs aller Datensätze, deren String-Feld mit `prefix` beginnt (sortierte Werteliste + bisect)."""
+        index = self.field_index(scope, field)
+        keys = self._index_keys[scope].get(field)
+        if keys is None:
+            keys = self._index_keys[scope][field] = sorted(v for v in index if isinstance(v, str))
+        result = set()
+        for position in range(bisect_left(keys, prefix), len(keys)):
+            if not keys[position].startswith(prefix):
+                break
+            result |= index[keys[position]]
+        return result
+
+    def query(self, scope: Tuple[int, ...], limit: Optional[int] = None, after: Optional[int] = None,
+              filters: Optional[Dict[str, object]] = None,
+              prefixes: Optional[Dict[str, str]] = None) -> Tuple[List[int], Optional[int]]:
+        """
+        IDs einer Seite in aufsteigender Reihenfolge (nach `after`, höchstens `limit`)
+        und die letzte ID der Seite, falls weitere Treffer folgen.
+        """
+        if scope == ():
+            self._load_all_seeds()
+        candidates = None
+        for field, value in (filters or {}).items():
+            ids = self.field_index(scope, field).get(value, set())
+            candidates = set(ids) if candidates is None else candidates & ids
+        for field, prefix in (prefixes or {}).items():
+            ids = self._prefix_ids(scope, field, prefix)
+            candidates = ids if candidates is None else candidates & ids
+
+        if candidates is None:
+            ordered = self._ids.get(scope)
+            if ordered is None:
+                ordered = self._ids[scope] = sorted(self.scopes.get(scope, {}))
+        else:
+            ordered = sorted(candidates)
+
+        start = bisect_right(ordered, after) if after is not None else 0
+        end = len(ordered) if limit is None else min(start + limit, len(ordered))
+        page = ordered[start:end]
+        return page, (page[-1] if page and end < len(ordered) else None)
+
+    def page_json(self, scope: Tuple[int, ...], limit: Optional[int] = None, after: Optional[int] = None,
+                  filters: Optional[Dict[str, object]] = None,
+                  prefixes: Optional[Dict[str, str]] = None) -> Tuple[bytes, Optional[int]]:
+        """Serialisierte Seite plus Cursor-ID für die nächste Seite (None = letzte Seite)."""
+        if limit is None and after is None and not filters and not prefixes:
+            return self.list_json(scope), None
+        page, last_id = self.query(scope, limit, after, filters, prefixes)
+        return b"[" + b",".join(self.item_json(scope, i) for i in page) + b"]", last_id
+
+    def stream_json(self, scope: Tuple[int, ...], limit: Optional[int] = None, after: Optional[int] = None,
+                    filters: Optional[Dict[str, object]] = None,
+                    prefixes: Optional[Dict[str, str]] = None) -> Tuple[Iterator[bytes], Optional[int]]:
+        """
+        Wie page_json, aber als NDJSON-Blöcke zu je STREAM_CHUNK Datensätzen: pro Anfrage liegt nur die
+        ID-Liste der Treffer im Speicher, nie die ganze Antwort. Zwischendurch gelöschte Datensätze fehlen.
+        """
+        page, last_id = self.query(scope, limit, after, filters, prefixes)
+        return self._stream_chunks(scope, page), last_id
+
+    def _stream_chunks(self, scope: Tuple[int, ...], ids: List[int]) -> Iterator[bytes]:
+        for start in range(0, len(ids), STREAM_CHUNK):
+            lines = (self.item_json(scope, i) for i in ids[start:start + STREAM_CHUNK])
+            yield b"".join(line + b"\n" for line in lines if line is not None)
+
+    def __len__(self) -> int:
+        pending = 0 if self._seed_complete else self.seed_file.count(self.name) - len(self._seed_consumed)
+        return sum(len(bucket) for bucket in self.scopes.values()) + pending
+
+
+class CompactStore(ResourceStore):
+    """
+    Speicher-sparende Variante: ein Datensatz liegt als Tupel seiner Feldwerte vor
+    (Strings interniert, verschachtelte Models ebenfalls als Tupel) statt als Pydantic-Instanz.
+    Models entstehen erst an der API-Grenze per model_construct – die Werte wurden beim
+    Schreiben bereits validiert. Wie im ResourceStore werden die serialisierten Datensätze
+    gecacht, GETs kosten also nur beim ersten Lesen ein model_construct; die Ersparnis gilt
+    damit vor allem für Datensätze, die geschrieben, aber selten gelesen werden.
+    """
+
+    def __init__(self, name: str, model):
+        super().__init__(name, model)
+        self._layout = self._model_layout(model)
+
+    @classmethod
+    def _model_layout(cls, model):
+        """(Model, ((Feldname, Layout verschachteltes Model oder None), ...))"""
+        fields = []
+        for name, info in model.model_fields.items():
+            nested = None
+            for candidate in (info.annotation, *getattr(info.annotation, '__args__', ())):
+                if isinstance(candidate, type) and hasattr(candidate, 'model_fields'):
+                    nested = cls._model_layout(candidate)
+            fields.append((name, nested))
+        return model, tuple(fields)
+
+    @classmethod
+    def _pack_with(cls, item, layout) -> tuple:
+        values = []
+        for name, nested in layout[1]:
+            value = getattr(item, name)
+            if nested is not None and value is not None:
+                value = cls._pack_with(value, nested)
+            elif type(value) is str:
+                value = sys.intern(value)
+            values.append(value)
+        return tuple(values)
+
+    @classmethod
+    def _unpack_with(cls, stored: tuple, layout):
+        model, fields = layout
+        return model.model_construct(**{
+            name: cls._unpack_with(value, nested) if nested is not None and value is not None else value
+            for (name, nested), value in zip(fields, stored)
+        })
+
+    def _pack(self, item):
+        return self._pack_with(item, self._layout)
+
+    def _unpack(self, stored):
+        return self._unpack_with(stored, self._layout)
+
+
+class SqliteStore:
+    """
+    Store in einer gemeinsamen SQLite-Datenbank (WAL-Modus), damit mehrere Worker-Prozesse
+    dieselben Daten sehen. IDs werden in einer Schreib-Transaktion (BEGIN IMMEDIATE) aus einer
+    Sequenz-Tabelle vergeben und sind damit über alle Prozesse eindeutig. Datensätze liegen
+    als serialisiertes JSON vor; GET liefert diese Bytes direkt aus. Gleiche Schnittstelle wie
+    ResourceStore, soweit die Endpunkte sie nutzen. Versionen (ETags) stehen mit in der
+    Datenbank und gelten damit für alle Worker.
+    """
+
+    journal = None
+    # Eine Verbindung pro Prozess und Datei, von allen Stores geteilt: so umfasst eine Transaktion
+    # auch das kaskadierende Löschen in anderen Stores
+    _connections: Dict[Tuple[int, str], sqlite3.Connection] = {}
+
+    def __init__(self, name: str, model, path: str):
+        self.name = name
+        self.model = model
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = None
+        self._indexed: set = set()
+        self._epoch: Optional[str] = None
+        self.last_etag: Optional[str] = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # Pro Prozess neu öffnen (Verbindungen dürfen nicht über fork/spawn geteilt werden)
+        if self._conn is None or self._pid != os.getpid():
+            key = (os.getpid(), self.path)
+            conn = SqliteStore._connections.get(key)
+            if conn is None:
+                conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, timeout=30)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.executescript("""
+                    CREATE TABLE IF NOT EXISTS records (store TEXT, scope TEXT, id INTEGER, version INTEGER, data TEXT,
+                                                        PRIMARY KEY (store, scope, id)) WITHOUT ROWID;
+                    CREATE TABLE IF NOT EXISTS sequences (store TEXT PRIMARY KEY, next_id INTEGER, version INTEGER,
+                                                          epoch TEXT);
+                """)
+                SqliteStore._connections[key] = conn
+            conn.execute("INSERT OR IGNORE INTO sequences VALUES (?, 1, 0, ?)",
+                         (self.name, format(time.time_ns(), 'x')))
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    @contextmanager
+    def transaction(self):
+        """
+        Schreib-Transaktion; BEGIN IMMEDIATE sperrt sofort, damit Lesen und Schreiben der Sequenz atomar sind.
+        Verschachtelt (z.B. create() innerhalb eines Batches) läuft alles in der äußeren Transaktion.
+        """
+        conn = self.conn
+        if conn.in_transaction:
+            yield conn
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _bump(self, conn: sqlite3.Connection) -> int:
+        conn.execute("UPDATE sequences SET version = version + 1 WHERE store = ?", (self.name,))
+        version = self.version_of(conn)
+        # Innerhalb der Transaktion bestimmt: gehört sicher zum geschriebenen Stand
+        self.last_etag = self._format_etag(version)
+        return version
+
+    def version_of(self, conn: sqlite3.Connection) -> int:
+        return conn.execute("SELECT version FROM sequences WHERE store = ?", (self.name,)).fetchone()[0]
+
+    @property
+    def version(self) -> int:
+        return self.version_of(self.conn)
+
+    @property
+    def epoch(self) -> str:
+        if self._epoch is None:
+            self._epoch = self.conn.execute("SELECT epoch FROM sequences WHERE store = ?", (self.name,)).fetchone()[0]
+        return self._epoch
+
+    @staticmethod
+    def _scope(scope: Tuple[int, ...]) -> str:
+        return ",".join(map(str, scope))
+
+    def _dump(self, item) -> str:
+        return item.model_dump_json(by_alias=True)
+
+    @property
+    def next_id(self) -> int:
+        return self.conn.execute("SELECT next_id FROM sequences WHERE store = ?", (self.name,)).fetchone()[0]
+
+    def import_seed(self, seed_file: SeedFile):
+        """Startdaten einmalig (validiert) übernehmen – nur in eine neue, leere Datenbank."""
+        if self.conn.execute("SELECT 1 FROM records WHERE store = ? LIMIT 1", (self.name,)).fetchone():
+            return
+        rows = []
+        for item_id, data in seed_file.items(self.name):
+            try:
+                rows.append((self.name, "", item_id, 0, self._dump(self.model(**data))))
+            except Exception as e:
+                print(f"WARNUNG: Testdaten {self.name} ID {item_id} konnte nicht geladen werden ({e})")
+        with self.transaction() as conn:
+            conn.executemany("INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?, ?)", rows)
+            conn.execute("UPDATE sequences SET next_id = MAX(next_id, ?) WHERE store = ?",
+                         (seed_file.max_id(self.name) + 1, self.name))
+
+    def get(self, scope: Tuple[int, ...], item_id: int) -> Optional[object]:
+        body = self.item_json(scope, item_id)
+        return None if body is None else self.model.model_validate_json(body)
+
+    def item_json(self, scope: Tuple[int, ...], item_id: int) -> Optional[bytes]:
+        row = self.conn.execute("SELECT data FROM records WHERE store = ? AND scope = ? AND id = ?",
+                                (self.name, self._scope(scope), item_id)).fetchone()
+        return None if row is None else row[0].encode('utf-8')
+
+    def list(self, scope: Tuple[int, ...] = ()) -> List[object]:
+        return [self.model.model_validate_json(row[0]) for row in self.conn.execute(
+            "SELECT data FROM records WHERE store = ? AND scope = ? ORDER BY id", (self.name, self._scope(scope)))]
+
+    def list_json(self, scope: Tuple[int, ...] = ()) -> bytes:
+        return self.page_json(scope)[0]
+
+    def create(self, scope: Tuple[int, ...], item) -> object:
+        with self.transaction() as conn:
+            item.id = conn.execute("SELECT next_id FROM sequences WHERE store = ?", (self.name,)).fetchone()[0]
+            conn.execute("UPDATE sequences SET next_id = ? WHERE store = ?", (item.id + 1, self.name))
+            conn.execute("INSERT INTO records VALUES (?, ?, ?, ?, ?)",
+                         (self.name, self._scope(scope), item.id, self._bump(conn), self._dump(item)))
+        return item
+
+    def seed(self, scope: Tuple[int, ...], item_id: int, item):
+        self.replace(scope, item_id, item)
+        self.conn.execute("UPDATE sequences SET next_id = MAX(next_id, ?) WHERE store = ?", (item_id + 1, self.name))
+
+    def _record_version(self, conn: sqlite3.Connection, scope: Tuple[int, ...], item_id: int) -> Optional[int]:
+        row = conn.execute("SELECT version FROM records WHERE store = ? AND scope = ? AND id = ?",
+                           (self.name, self._scope(scope), item_id)).fetchone()
+        return None if row is None else row[0]
+
+    def _format_etag(self, version: Optional[int]) -> Optional[str]:
+        return None if version is None else f'"{self.epoch}-{version}"'
+
+    def etag(self, scope: Tuple[int, ...], item_id: int) -> Optional[str]:
+        return self._format_etag(self._record_version(self.conn, scope, item_id))
+
+    def collection_etag(self, key: str) -> str:
+        return f'"{self.epoch}-{self.version}-{zlib.crc32(key.encode()):x}"'
+
+    def replace(self, scope: Tuple[int, ...], item_id: int, item, if_match: Optional[str] = None) -> object:
+        with self.transaction() as conn:
+            # Prüfung und Schreiben in derselben Transaktion: kein Lost Update zwischen Workern
+            if if_match is not None:
+                current = self._format_etag(self._record_version(conn, scope, item_id))
+                if not etag_matches(if_match, current):
+                    raise PreconditionFailed(current)
+            item.id = item_id
+            conn.execute("INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?, ?)",
+                         (self.name, self._scope(scope), item_id, self._bump(conn), self._dump(item)))
+        return item
+
+    def delete(self, scope: Tuple[int, ...], item_id: int) -> bool:
+        with self.transaction() as conn:
+            cursor = conn.execute("DELETE FROM records WHERE store = ? AND scope = ? AND id = ?",
+                                  (self.name, self._scope(scope), item_id))
+            if cursor.rowcount > 0:
+                self._bump(conn)
+        return cursor.rowcount > 0
+
+    def drop_children(self, parent_scope: Tuple[int, ...]):
+        prefix = self._scope(parent_scope)
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM records WHERE store = ? AND (scope = ? OR scope LIKE ?)",
+                         (self.name, prefix, prefix + ",%"))
+            self._bump(conn)
+
+    def invalidate_all(self):
+        pass
+
+    def _json_path(self, field: str) -> str:
+        info = self.model.model_fields.get(field)
+        return '$."' + ((info.alias if info is not None else None) or field) + '"'
+
+    def _ensure_index(self, field: str):
+        """Ausdrucks-Index auf das JSON-Feld, beim ersten Filter angelegt (von allen Workern genutzt)."""
+        if field in self._indexed:
+            return
+        index_name = f"idx_{self.name}_{field}"
+        self.conn.execute(f"CREATE INDEX IF NOT EXISTS \"{index_name}\" ON records "
+                          f"(store, scope, json_extract(data, '{self._json_path(field)}'))")
+        self._indexed.add(field)
+
+    def _where(self, scope: Tuple[int, ...], filters: Optional[Dict[str, object]],
+               prefixes: Optional[Dict[str, str]]) -> Tuple[List[str], list]:
+        sql = ["store = ? AND scope = ?"]
+        params: list = [self.name, self._scope(scope)]
+        for field, value in (filters or {}).items():
+            self._ensure_index(field)
+            sql.append(f"AND json_extract(data, '{self._json_path(field)}') = ?")
+            params.append(value)
+        for field, prefix in (prefixes or {}).items():
+            self._ensure_index(field)
+            sql.append(f"AND json_extract(data, '{self._json_path(field)}') >= ? "
+                       f"AND json_extract(data, '{self._json_path(field)}') < ?")
+            params += [prefix, prefix + "\U0010ffff"]
+        return sql, params
+
+    def page_json(self, scope: Tuple[int, ...], limit: Optional[int] = None, after: Optional[int] = None,
+                  filters: Optional[Dict[str, object]] = None,
+                  prefixes: Optional[Dict[str, str]] = None) -> Tuple[bytes, Optional[int]]:
+        sql, params = self._where(scope, filters, prefixes)
+        if after is not None:
+            sql.append("AND id > ?")
+            params.append(after)
+        sql.append("ORDER BY id")
+        if limit is not None:
+            sql.append("LIMIT ?")
+            params.append(limit + 1)
+
+        rows = self.conn.execute("SELECT id, data FROM records WHERE " + " ".join(sql), params).fetchall()
+        last_id = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            last_id = rows[-1][0]
+        return ("[" + ",".join(row[1] for row in rows) + "]").encode('utf-8'), last_id
+
+    def stream_json(self, scope: Tuple[int, ...], limit: Optional[int] = None, after: Optional[int] = None,
+                    filters: Optional[Dict[str, object]] = None,
+                    prefixes: Optional[Dict[str, str]] = None) -> Tuple[Iterator[bytes], Optional[int]]:
+        """NDJSON-Blöcke per Keyset-Abfragen (id > letzte ID, je STREAM_CHUNK Zeilen) – konstanter Speicher."""
+        where, params = self._where(scope, filters, prefixes)
+        upper, last_id = None, None
+        if limit is not None:
+            # Ende der Seite vorab bestimmen, damit X-Next-Cursor schon im Header stehen kann
+            sql = where + (["AND id > ?"] if after is not None else []) + ["ORDER BY id LIMIT 2 OFFSET ?"]
+            rows = self.conn.execute("SELECT id FROM records WHERE " + " ".join(sql),
+                                     params + ([after] if after is not None else []) + [limit - 1]).fetchall()
+            if rows:
+                upper = rows[0][0]
+                last_id = upper if len(rows) > 1 else None
+        return self._stream_chunks(where, params, after, upper, limit), last_id
+
+    def _stream_chunks(self, where: List[str], params: list, after: Optional[int], upper: Optional[int],
+                       remaining: Optional[int]) -> Iterator[bytes]:
+        while remaining is None or remaining > 0:
+            sql, args = list(where), list(params)
+            if after is not None:
+                sql.append("AND id > ?")
+                args.append(after)
+            if upper is not None:
+                sql.append("AND id <= ?")
+                args.append(upper)
+            chunk = STREAM_CHUNK if remaining is None else min(STREAM_CHUNK, remaining)
+            rows = self.conn.execute("SELECT id, data FROM records WHERE " + " ".join(sql) + " ORDER BY id LIMIT ?",
+                                     args + [chunk]).fetchall()
+            if not rows:
+                return
+            yield "".join(row[1] + "\n" for row in rows).encode('utf-8')
+            after = rows[-1][0]
+            if remaining is not None:
+                remaining -= len(rows)
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM records WHERE store = ?", (self.name,)).fetchone()[0]
+
+
+class Journal:
+    """
+    Optionale Persistenz: Append-only Write-Ahead-Log (wal.<seq>.log) plus Snapshots.
+    - fsync gebündelt alle `fsync_interval` Sekunden in einem Hintergrund-Thread (Group Commit);
+      ein Absturz verliert höchstens die Schreibzugriffe dieses Intervalls.
+    - Ab `snapshot_bytes` WAL-Größe beginnt der fsync-Thread ein neues Segment; ein Hintergrund-Thread
+      kopiert die Buckets und schreibt sie im SeedFile-Format als Snapshot. Der Event-Loop
+      merkt sich nur, dass ein Snapshot fällig ist.
+      CURRENT zeigt atomar auf den neuesten Snapshot; ältere Segmente werden danach gelöscht.
+    - Beim Start wird der Snapshot memory-mapped angehängt (lazy wie die Startdaten) und
+      nur das WAL seit dem Snapshot nachgespielt.
+    """
+
+    def __init__(self, directory: str, stores: Dict[str, ResourceStore],
+                 fsync_interval: float = 0.05, snapshot_bytes: int = 64 * 1024 * 1024):
+        self.directory = directory
+        self.stores = stores
+        self.fsync_interval = fsync_interval
+        self.snapshot_bytes = snapshot_bytes
+        self.seq = 0
+        self._file = None
+        self._wal_bytes = 0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        self._snapshot_thread: Optional[threading.Thread] = None
+        self._snapshot_due = False
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _segments(self) -> List[int]:
+        return sorted(int(n.split('.')[1]) for n in os.listdir(self.directory) if n.startswith("wal.") and n.endswith(".log"))
+
+    # --- Wiederherstellung ---
+
+    def recover(self, seed_file: Optional[SeedFile] = None):
+        """Snapshot (sonst die Startdaten) anhängen und das WAL seit dem Snapshot nachspielen."""
+        start = time.perf_counter()
+        snapshot_seq = None
+        try:
+            with open(self._path("CURRENT"), 'r', encoding='utf-8') as f:
+                snapshot_seq = int(f.read().strip())
+        except FileNotFoundError:
+            pass
+
+        if snapshot_seq is not None:
+            snapshot = SeedFile(self._path(f"snapshot.{snapshot_seq}.jsonl"), self._path(f"snapshot.{snapshot_seq}.idx"))
+            for key in snapshot.stores:
+                name, _, scope_text = key.partition('|')
+                store = self.stores.get(name)
+                if store is None:
+                    continue
+                if not scope_text:
+                    store.attach_seed(snapshot)
+                    continue
+                # Unter-Ressourcen: klein, werden direkt geladen
+                scope = tuple(int(part) for part in scope_text.split(','))
+                for item_id, data in snapshot.items(key):
+                    store.seed(scope, item_id, store.model(**data))
+            for name, next_id in snapshot.meta.get("next_ids", {}).items():
+                if name in self.stores:
+                    self.stores[name].next_id = max(self.stores[name].next_id, next_id)
+        elif seed_file is not None:
+            for name in seed_file.stores:
+                if name in self.stores:
+                    self.stores[name].attach_seed(seed_file)
+
+        replayed = 0
+        for seq in self._segments():
+            if snapshot_seq is not None and seq < snapshot_seq:
+                continue
+            replayed += self._replay(self._path(f"wal.{seq}.log"))
+            self.seq = max(self.seq, seq)
+        self.seq = max(self.seq, snapshot_seq or 0) + 1
+        print(f"💾 Persistenz: Snapshot {snapshot_seq if snapshot_seq is not None else '-'}, "
+              f"{replayed} WAL-Einträge in {time.perf_counter() - start:.2f}s wiederhergestellt ({self.directory})")
+
+    def _replay(self, path: str) -> int:
+        count = 0
+        with open(path, 'rb') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # unvollständige letzte Zeile nach einem Absturz
+                store = self.stores.get(entry["s"])
+                if store is None:
+                    continue
+                scope = tuple(entry["c"])
+                if entry["o"] == "put":
+                    store.seed(scope, entry["i"], store.model(**entry["d"]))
+                elif entry["o"] == "del":
+                    store.delete(scope, entry["i"])
+                elif entry["o"] == "drop":
+                    store.drop_children(scope)
+                store.next_id = max(store.next_id, entry["n"])
+                count += 1
+        return count
+
+    # --- Schreiben ---
+
+    def start(self):
+        """WAL-Segment öffnen, Stores anbinden und den fsync-Thread starten (nach recover())."""
+        self._file = open(self._path(f"wal.{self.seq}.log"), 'ab')
+        for store in self.stores.values():
+            store.journal = self
+        self._flusher = threading.Thread(target=self._flush_loop, name="wal-fsync", daemon=True)
+        self._flusher.start()
+
+    def _append(self, entry: dict):
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":")).encode('utf-8') + b"\n"
+        with self._lock:
+            self._file.write(line)
+            self._wal_bytes += len(line)
+        if self._wal_bytes >= self.snapshot_bytes:
+            self._snapshot_due = True  # erledigt der fsync-Thread, nicht der Request
+
+    def put(self, store: ResourceStore, scope: Tuple[int, ...], item_id: int, item):
+        self._append({"s": store.name, "o": "put", "c": scope, "i": item_id, "n": store.next_id,
+                      "d": item.model_dump(by_alias=True)})
+
+    def delete(self, store: ResourceStore, scope: Tuple[int, ...], item_id: int):
+        self._append({"s": store.name, "o": "del", "c": scope, "i": item_id, "n": store.next_id})
+
+    def drop(self, store: ResourceStore, scope: Tuple[int, ...]):
+        self._append({"s": store.name, "o": "drop", "c": scope, "n": store.next_id})
+
+    def _flush_loop(self):
+        while not self._stopped.wait(self.fsync_interval):
+            self.sync()
+            if self._snapshot_due and not self.snapshot_running():
+                self.snapshot()
+
+    def sync(self):
+        with self._lock:
+            self._file.flush()
+            fd = self._file.fileno()
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass  # Segment wurde inzwischen rotiert (und dabei selbst gesynct)
+
+    # --- Snapshots ---
+
+    def snapshot_running(self) -> bool:
+        return self._snapshot_thread is not None and self._snapshot_thread.is_alive()
+
+    def snapshot(self, background: bool = True):
+        """Neues WAL-Segment beginnen und den aktuellen Zustand als Snapshot schreiben."""
+        self._snapshot_due = False
+        with self._lock:
+            old = self._file
+            old.flush()
+            self.seq += 1
+            self._file = open(self._path(f"wal.{self.seq}.log"), 'ab')
+            self._wal_bytes = 0
+        os.fsync(old.fileno())
+        old.close()
+
+        if background:
+            self._snapshot_thread = threading.Thread(target=self._capture_and_write, args=(self.seq,),
+                                                     name="wal-snapshot", daemon=True)
+            self._snapshot_thread.start()
+        else:
+            self._capture_and_write(self.seq)
+
+    def _capture(self) -> list:
+        """
+        Flache Kopie der Buckets (Datensätze werden nie verändert, nur ersetzt), parallel zu
+        Schreibzugriffen auf dem Event-Loop. Die Kopie muss kein exakter Zeitpunkt sein: jede
+        Änderung seit dem Segmentwechsel steht im neuen WAL, und put/del/drop sind beim
+        Nachspielen idempotent. list()/dict()/set() kopieren jeweils atomar unter dem GIL;
+        die verbrauchten Startdaten-IDs werden vor den Buckets kopiert (siehe _take_seed).
+        """
+        state = []
+        for store in list(self.stores.values()):
+            seed = store.seed_file if not store._seed_complete else None
+            consumed = set(store._seed_consumed)
+            scopes = {scope: dict(bucket) for scope, bucket in list(store.scopes.items())}
+            state.append((store, scopes, seed, consumed, store.next_id))
+        return state
+
+    def _capture_and_write(self, seq: int):
+        self._write_snapshot(seq, self._capture())
+
+    @staticmethod
+    def _snapshot_records(store: ResourceStore, bucket: dict, seed: Optional[SeedFile], consumed: set):
+        """(id, daten) eines Scopes in ID-Reihenfolge; noch nicht gelesene Startdaten roh aus der Seed-Datei."""
+        own = ((i, store._unpack(bucket[i]).model_dump_json(by_alias=True).encode('utf-8')) for i in sorted(bucket))
+        if seed is None:
+            return own
+        pending = ((i, d) for i, d in seed.items(store.name, raw=True) if i not in consumed and i not in bucket)
+        return heapq.merge(pending, own, key=lambda pair: pair[0])
+
+    def _write_snapshot(self, seq: int, state: list):
+        start = time.perf_counter()
+        records = {}
+        for store, scopes, seed, consumed, _ in state:
+            records[store.name] = self._snapshot_records(store, scopes.get((), {}), seed, consumed)
+            for scope, bucket in scopes.items():
+                if scope and bucket:
+                    records[f"{store.name}|{','.join(map(str, scope))}"] = self._snapshot_records(store, bucket, None, set())
+
+        data_path, index_path = self._path(f"snapshot.{seq}.jsonl"), self._path(f"snapshot.{seq}.idx")
+        meta = {"wal_seq": seq, "next_ids": {store.name: next_id for store, _, _, _, next_id in state}}
+        write_seed_file(data_path, index_path, records, meta=meta)
+        for path in (data_path, index_path):
+            with open(path, 'rb') as f:
+                os.fsync(f.fileno())
+
+        tmp = self._path("CURRENT.tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(str(seq))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._path("CURRENT"))
+
+        # Ältere Snapshots und WAL-Segmente sind jetzt überflüssig
+        for name in os.listdir(self.directory):
+            parts = name.split('.')
+            if parts[0] in ("wal", "snapshot") and len(parts) > 2 and parts[1].isdigit() and int(parts[1]) < seq:
+                try:
+                    os.remove(self._path(name))
+                except OSError:
+                    pass  # z.B. unter Windows noch gemappt; wird beim nächsten Snapshot entfernt
+        print(f"💾 Snapshot {seq} geschrieben in {time.perf_counter() - start:.2f}s")
+
+    def close(self, snapshot: bool = True):
+        """fsync-Thread stoppen; optional abschließender Snapshot für einen schnellen Neustart."""
+        self._stopped.set()
+        if self._file is None:
+            return
+        if self._flusher is not None:
+            self._flusher.join()
+        if self._snapshot_thread is not None:
+            self._snapshot_thread.join()
+        if snapshot:
+            self.snapshot(background=False)
+        with self._lock:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+
+
+def encode_cursor(last_id: int) -> str:
+    """Opaker Cursor für die nächste Seite."""
+    return base64.urlsafe_b64encode(f"after:{last_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    if not cursor:
+        return None
+    try:
+        kind, _, value = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode().partition(":")
+        if kind == "after":
+            return int(value)
+    except (ValueError, UnicodeDecodeError):
+        pass
+    raise ValueError("Invalid cursor")
+
+
+class PreconditionFailed(Exception):
+    """If-Match passt nicht zum aktuellen ETag (HTTP 412); `etag` ist der aktuelle Wert oder None."""
+
+    def __init__(self, etag: Optional[str]):
+        super().__init__("Precondition failed: ETag does not match")
+        self.etag = etag
+
+
+def etag_matches(header: Optional[str], etag: Optional[str]) -> bool:
+    """
+    Vergleich für If-None-Match und If-Match; '*' passt auf jeden vorhandenen Datensatz.
+    Das W/-Präfix wird ignoriert: schwach sind unsere ETags nur, weil die CompressionMiddleware
+    die Antwort komprimiert hat – der Datensatz-Stand dahinter ist derselbe.
+    """
+    if not header or etag is None:
+        return False
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == "*" or tag == etag:
+            return True
+    return False
+
+
+def wants_ndjson(accept: Optional[str]) -> bool:
+    """Accept: application/x-ndjson -> Collection als gestreamtes NDJSON statt JSON-Array."""
+    return bool(accept) and NDJSON in accept
+
+
+async def _iterate(chunks: Iterator[bytes]) -> AsyncIterator[bytes]:
+    # Auf dem Event-Loop statt im Threadpool iterieren: der Store wird nie aus zwei Threads gelesen
+    for chunk in chunks:
+        yield chunk
+
+
+def list_page(store: ResourceStore, scope: Tuple[int, ...], limit: Optional[int], cursor: Optional[str],
+              filters: Dict[str, object], prefixes: Dict[str, Optional[str]],
+              if_none_match: Optional[str] = None, ndjson: bool = False):
+    """
+    Gemeinsame Logik der List-Endpunkte: (Body, Header). Nicht gesetzte Filter (None) werden ignoriert;
+    X-Next-Cursor zeigt auf die nächste Seite. Passt If-None-Match zum ETag der Abfrage, ist der
+    Body None (-> 304) und die Seite wird gar nicht erst gebaut. Mit `ndjson` ist der Body ein
+    asynchroner Iterator über NDJSON-Blöcke (für StreamingResponse). Wirft ValueError bei ungültigem Cursor.
+    """
+    filters = {field: value for field, value in filters.items() if value is not None}
+    prefixes = {field: value for field, value in prefixes.items() if value is not None}
+    after = decode_cursor(cursor)
+    # Version vor dem Lesen bestimmen: ein paralleler Schreibzugriff macht den ETag höchstens zu alt
+    query = (scope, limit, after, sorted(filters.items()), sorted(prefixes.items()), ndjson)
+    headers = {"ETag": store.collection_etag(repr(query))}
+    if etag_matches(if_none_match, headers["ETag"]):
+        return None, headers
+    if ndjson:
+        chunks, last_id = store.stream_json(scope, limit, after, filters, prefixes)
+        body = _iterate(chunks)
+    else:
+        body, last_id = store.page_json(scope, limit, after, filters, prefixes)
+    if last_id is not None:
+        headers["X-Next-Cursor"] = encode_cursor(last_id)
+    return body, headers
+
+
+def _batch_response(results: list, errors: list) -> Tuple[int, bytes]:
+    if errors:
+        status = 404 if all(error["status"] == 404 for error in errors) else 400
+        return status, json.dumps({"detail": "Batch rejected, nothing was applied.", "errors": errors}).encode('utf-8')
+    return 200, json.dumps({"results": results}).encode('utf-8')
+
+
+def batch_upsert(store: ResourceStore, scope: Tuple[int, ...], items: list,
+                 allow_update: bool = True) -> Tuple[int, bytes]:
+    """
+    POST .../resource:batch – Datensätze ohne ID werden angelegt, mit ID ersetzt. Alles oder nichts:
+    erst werden alle Einträge geprüft, dann in einer Transaktion geschrieben. Ergebnis pro Eintrag
+    (index, status, id, etag) bzw. die Fehler pro Eintrag; (HTTP-Status, JSON-Body).
+    """
+    with store.transaction():
+        errors, seen = [], set()
+        for index, item in enumerate(items):
+            if item.id is None:
+                continue
+            if not allow_update:
+                errors.append({"index": index, "status": 400, "detail": "ID must not be provided on creation."})
+            elif item.id in seen:
+                errors.append({"index": index, "status": 400, "detail": "Duplicate ID in batch."})
+            elif store.etag(scope, item.id) is None:
+                errors.append({"index": index, "status": 404, "detail": "Not found."})
+            seen.add(item.id)
+        if errors:
+            return _batch_response([], errors)
+
+        results = []
+        for index, item in enumerate(items):
+            if item.id is None:
+                store.create(scope, item)
+                status = 201
+            else:
+                store.replace(scope, item.id, item)
+                status = 200
+            results.append({"index": index, "status": status, "id": item.id, "etag": store.last_etag})
+    return _batch_response(results, [])
+
+
+def batch_delete(store: ResourceStore, scope: Tuple[int, ...], ids: List[int],
+                 children: Iterable[ResourceStore] = ()) -> Tuple[int, bytes]:
+    """DELETE .../resource:batch – löscht alle IDs (inkl. Unter-Ressourcen) oder keine; wie batch_upsert."""
+    children = list(children)
+    with store.transaction():
+        errors, seen = [], set()
+        for index, item_id in enumerate(ids):
+            if item_id in seen:
+                errors.append({"index": index, "status": 400, "detail": "Duplicate ID in batch."})
+            elif store.etag(scope, item_id) is None:
+                errors.append({"index": index, "status": 404, "detail": "Not found."})
+            seen.add(item_id)
+        if errors:
+            return _batch_response([], errors)
+
+        for item_id in ids:
+            store.delete(scope, item_id)
+            for child in children:
+                child.drop_children(scope + (item_id,))
+    return _batch_response([{"index": index, "status": 204, "id": item_id} for index, item_id in enumerate(ids)], [])
+
+
+class CompressionMiddleware:
+    """
+    ASGI-Middleware: komprimiert Antworten ab `minimum_size` Bytes mit brotli (falls installiert und
+    vom Client akzeptiert) oder gzip. Gestreamte Antworten werden Block für Block komprimiert und
+    sofort weitergereicht, es entsteht also auch hier keine Kopie der ganzen Antwort.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, level: int = 6):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = level
+
+    @staticmethod
+    def _negotiate(accept_encoding: str) -> Optional[str]:
+        offered = {part.split(";")[0].strip() for part in accept_encoding.lower().split(",")
+                   if not part.replace(" ", "").endswith(";q=0")}
+        if brotli is not None and "br" in offered:
+            return "br"
+        if "gzip" in offered:
+            return "gzip"
+        return None
+
+    def _compressor(self, encoding: str):
+        """(komprimieren, Block abschließen, Stream beenden) für das gewählte Verfahren."""
+        if encoding == "br":
+            compressor = brotli.Compressor(quality=min(self.level, 11))
+            return compressor.process, compressor.flush, compressor.finish
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+        return compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = dict(scope.get("headers") or [])
+        encoding = self._negotiate(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start = None
+        codec = None
+
+        async def send_compressed(message):
+            nonlocal start, codec
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body":
+                return await send(message)
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            if start is not None:
+                # Erster Body-Block: hier fällt die Entscheidung (Größe bzw. Streaming)
+                response_start, start = start, None
+                response_headers = [(k, v) for k, v in response_start["headers"]]
+                names = {k.lower() for k, _ in response_headers}
+                if (b"content-encoding" in names or response_start["status"] in (204, 304)
+                        or (not more and len(body) < self.minimum_size)):
+                    await send(response_start)
+                    return await send(message)
+                codec = self._compressor(encoding)
+                response_headers = [(k, b"W/" + v if k.lower() == b"etag" and not v.startswith(b"W/") else v)
+                                    for k, v in response_headers if k.lower() != b"content-length"]
+                response_headers += [(b"content-encoding", encoding.encode()), (b"vary", b"Accept-Encoding")]
+                if not more:
+                    body = codec[0](body) + codec[2]()
+                    response_headers.append((b"content-length", str(len(body)).encode()))
+                    await send({**response_start, "headers": response_headers})
+                    return await send({"type": "http.response.body", "body": body})
+                await send({**response_start, "headers": response_headers})
+            elif codec is None:
+                return await send(message)
+
+            compress, flush, finish = codec
+            chunk = compress(body) + (flush() if more else finish())
+            await send({"type": "http.response.body", "body": chunk, "more_body": more})
+
+        await self.app(scope, receive, send_compressed)
+
+
+class RouteProfile:
+    """
+    Verhalten einer Operation: Latenz-Verteilung, Fehlerrate pro Statuscode und Throttling (429).
+    latency:  {"fixed_ms": 50} | {"mean_ms": 120, "stddev_ms": 40} | {"p50": 20, "p99": 400, "max_ms": 2000}
+    errors:   {"500": 0.01, "503": 0.02}        (Anteil der Anfragen)
+    throttle: {"probability": 0.05, "retry_after": 2}
+    """
+
+    def __init__(self, config: dict):
+        unknown = set(config) - {"latency", "errors", "throttle"}
+        if unknown:
+            raise ValueError(f"Unbekannte Profil-Einträge: {', '.join(sorted(unknown))}")
+        self.sample_ms = self._latency_sampler(config.get("latency") or {})
+        self.errors = []
+        for status, rate in (config.get("errors") or {}).items():
+            if not 400 <= int(status) <= 599:
+                raise ValueError(f"Fehler-Status {status} ist kein 4xx/5xx")
+            self.errors.append((int(status), float(rate)))
+        throttle = config.get("throttle") or {}
+        self.throttle = float(throttle.get("probability", 0))
+        self.retry_after = str(throttle.get("retry_after", 1)).encode()
+        rates = [self.throttle] + [rate for _, rate in self.errors]
+        if any(rate < 0 for rate in rates) or sum(rates) > 1:
+            raise ValueError("Fehler- und Throttling-Raten müssen zwischen 0 und 1 liegen (Summe höchstens 1)")
+
+    @staticmethod
+    def _latency_sampler(latency: dict):
+        if not latency:
+            return None
+        if "fixed_ms" in latency:
+            fixed = float(latency["fixed_ms"])
+            return lambda rng: fixed
+        if "mean_ms" in latency:
+            mean, stddev = float(latency["mean_ms"]), float(latency.get("stddev_ms", 0))
+            return lambda rng: max(0.0, rng.gauss(mean, stddev))
+        percentiles = sorted((float(key[1:]) / 100, float(value)) for key, value in latency.items()
+                             if re.fullmatch(r"p\d+(\.\d+)?", key))
+        if not percentiles or len(percentiles) + len({"min_ms", "max_ms"} & set(latency)) != len(latency):
+            raise ValueError(f"Unbekannte Latenz-Angabe: {latency}")
+        # Stückweise lineare Verteilungsfunktion durch die Perzentile (lange Ausläufer bis max_ms)
+        points = [(0.0, float(latency.get("min_ms", 0)))] + percentiles
+        points.append((1.0, float(latency.get("max_ms", percentiles[-1][1]))))
+        quantiles = [q for q, _ in points]
+
+        def sample(rng):
+            u = rng.random()
+            i = min(max(bisect_right(quantiles, u), 1), len(points) - 1)
+            (q0, v0), (q1, v1) = points[i - 1], points[i]
+            return v0 if q1 == q0 else v0 + (v1 - v0) * (u - q0) / (q1 - q0)
+        return sample
+
+    def decide(self, rng: random.Random) -> Tuple[float, Optional[int], list]:
+        """(Verzögerung in Sekunden, Fehler-Status oder None, zusätzliche Header) für eine Anfrage."""
+        delay = self.sample_ms(rng) / 1000 if self.sample_ms is not None else 0.0
+        u = rng.random()
+        if u < self.throttle:
+            return delay, 429, [(b"retry-after", self.retry_after)]
+        u -= self.throttle
+        for status, rate in self.errors:
+            if u < rate:
+                return delay, status, []
+            u -= rate
+        return delay, None, []
+
+
+class RouteTable:
+    """
+    Einstellungen pro Operation, Schlüssel "GET /projects/{projectId}"; "*" gilt für alle übrigen Routen.
+    Mit `routes` (alle Operationen der App) wird "*" auf jede nicht eigens konfigurierte Route
+    übertragen, match() liefert dann auch dort den konkreten Schlüssel; "*" selbst bleibt nur für
+    unbekannte Pfade. Pfad-Parameter passen auf genau ein Segment; Routen mit weniger Parametern
+    haben Vorrang. Unterklassen wandeln die Konfiguration in `_compile` um (und prüfen sie dabei).
+    """
+
+    label = "Eintrag"
+
+    def __init__(self, entries: Dict[str, dict], routes: Iterable[str] = ()):
+        self.default = None
+        self.exact: Dict[Tuple[str, str], Tuple[str, object]] = {}
+        self.routes: Dict[str, List[Tuple[int, "re.Pattern", str, object]]] = {}
+        compiled = {}
+        for key, config in entries.items():
+            try:
+                compiled[key] = self._compile(config)
+            except (TypeError, ValueError, AttributeError) as e:
+                raise ValueError(f"{self.label} '{key}': {e}") from None
+        if "*" in compiled:
+            self.default = ("*", compiled.pop("*"))
+            for key in routes:
+                compiled.setdefault(key, self.default[1])
+        for key, value in compiled.items():
+            method, _, path = key.partition(" ")
+            parts = re.split(r"\{[^}]+\}", path)
+            if len(parts) == 1:
+                self.exact[(method.upper(), path)] = (key, value)
+                continue
+            pattern = re.compile("^" + "[^/]+".join(re.escape(part) for part in parts) + "$")
+            self.routes.setdefault(method.upper(), []).append((len(parts), pattern, key, value))
+        for routes in self.routes.values():
+            routes.sort(key=lambda route: route[0])
+
+    def _compile(self, config: dict):
+        return config
+
+    def __len__(self) -> int:
+        return len(self.exact) + sum(len(routes) for routes in self.routes.values()) + (self.default is not None)
+
+    def match(self, method: str, path: str) -> Optional[Tuple[str, object]]:
+        """(Schlüssel, Wert) der passenden Route, sonst der Standard "*" oder None."""
+        hit = self.exact.get((method, path))
+        if hit is not None:
+            return hit
+        for _, pattern, key, value in self.routes.get(method, ()):
+            if pattern.match(path):
+                return key, value
+        return self.default
+
+
+class FaultProfiles(RouteTable):
+    """Latenz-/Fehlerprofile (RouteProfile) pro Operation."""
+
+    label = "Profil"
+
+    def _compile(self, config: dict) -> RouteProfile:
+        return RouteProfile(config)
+
+
+def load_profiles(path: Optional[str], required: bool = False) -> Dict[str, dict]:
+    """Sidecar-Datei mit Profilen (gleiches Format wie FaultProfiles); fehlt sie, gibt es keine (außer `required`)."""
+    if not path or not (required or os.path.exists(path)):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def merge_profiles(*sources: Dict[str, dict]) -> Dict[str, dict]:
+    """Spätere Quellen überschreiben frühere pro Route und Eintrag (latency/errors/throttle)."""
+    merged: Dict[str, dict] = {}
+    for source in sources:
+        for route, config in source.items():
+            merged[route] = {**merged.get(route, {}), **config}
+    return merged
+
+
+class FaultInjectionMiddleware:
+    """
+    ASGI-Middleware für simulierte Latenz und Fehler. Gewartet wird mit asyncio.sleep, der Server
+    bedient währenddessen weiter andere Anfragen. Injizierte Fehler erreichen die App gar nicht.
+    """
+
+    def __init__(self, app, faults: FaultProfiles, seed: Optional[int] = None):
+        self.app = app
+        self.faults = faults
+        self.rng = random.Random(seed)
+
+    async def __call__(self, scope, receive, send):
+        matched = self.faults.match(scope["method"], scope["path"]) if scope["type"] == "http" else None
+        if matched is None:
+            return await self.app(scope, receive, send)
+        remember_route(scope, matched[0])
+        delay, status, headers = matched[1].decide(self.rng)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if status is None:
+            return await self.app(scope, receive, send)
+        await send_error(receive, send, status, f"Injected fault ({status})", headers)
+
+
+def remember_route(scope: dict, key: str):
+    """
+    Pfad-Template der Route im ASGI-Scope merken: Antworten, die eine Middleware selbst erzeugt
+    (429, simulierte Fehler), erreichen den Router nie; MetricsMiddleware ordnet sie so trotzdem zu.
+    """
+    if key != "*":
+        scope["mock.route"] = key.partition(" ")[2]
+
+
+async def send_error(receive, send, status: int, detail: str, headers: list = ()):
+    """JSON-Fehlerantwort direkt auf ASGI-Ebene (ohne die App aufzurufen)."""
+    # Request-Body trotzdem lesen, sonst schließt der Server die Keep-Alive-Verbindung
+    message = await receive()
+    while message["type"] == "http.request" and message.get("more_body", False):
+        message = await receive()
+    body = json.dumps({"detail": detail}).encode()
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", b"application/json"),
+                            (b"content-length", str(len(body)).encode()), *headers]})
+    await send({"type": "http.response.body", "body": body})
+
+
+class RateLimits(RouteTable):
+    """
+    Token-Bucket-Grenzen pro Operation: {"requests": 100, "per_seconds": 60, "burst": 20}.
+    `requests` pro `per_seconds` ist die Nachfüllrate, `burst` die Bucket-Größe (Standard: requests).
+    """
+
+    label = "Rate-Limit"
+
+    def _compile(self, config: dict) -> Tuple[float, float]:
+        unknown = set(config) - {"requests", "per_seconds", "burst"}
+        if unknown:
+            raise ValueError(f"Unbekannte Einträge: {', '.join(sorted(unknown))}")
+        requests, per_seconds = float(config["requests"]), float(config.get("per_seconds", 1))
+        burst = float(config.get("burst", requests))
+        if requests <= 0 or per_seconds <= 0 or burst < 1:
+            raise ValueError("requests und per_seconds müssen positiv sein, burst mindestens 1")
+        return requests / per_seconds, burst
+
+
+class RateLimitMiddleware:
+    """
+    Token Bucket pro (API-Key, Route) mit O(1) Arbeit pro Anfrage: der Bucket wird beim Zugriff
+    anhand der verstrichenen Zeit aufgefüllt, ohne Timer oder Anfrage-Historie. Alles läuft auf dem
+    Event-Loop ohne await zwischen Lesen und Schreiben, deshalb ohne Lock. Jede Antwort trägt
+    RateLimit-Limit/-Remaining/-Reset; abgelehnte Anfragen bekommen 429 mit Retry-After.
+    Wieder volle Buckets werden entfernt (gleichwertig zu einem fehlenden), damit wechselnde
+    API-Keys den Speicher nicht unbegrenzt wachsen lassen.
+    """
+
+    MIN_SWEEP = 1024
+
+    def __init__(self, app, limits: RateLimits):
+        self.app = app
+        self.limits = limits
+        # (API-Key, Route) -> [Tokens, letzter Zugriff, Zeitpunkt an dem der Bucket wieder voll ist]
+        self.buckets: Dict[Tuple[bytes, str], List[float]] = {}
+        self._sweep_at = self.MIN_SWEEP
+
+    def take(self, api_key: bytes, route: str, rate: float, burst: float) -> Tuple[bool, float]:
+        """Ein Token entnehmen: (erlaubt, verbleibende Tokens)."""
+        now = time.monotonic()
+        bucket = self.buckets.get((api_key, route))
+        if bucket is None:
+            if len(self.buckets) >= self._sweep_at:
+                self._evict(now)
+            bucket = self.buckets[(api_key, route)] = [burst, now, now]
+        tokens = min(burst, bucket[0] + (now - bucket[1]) * rate)
+        allowed = tokens >= 1
+        bucket[0] = tokens - 1 if allowed else tokens
+        bucket[1] = now
+        bucket[2] = now + (burst - bucket[0]) / rate
+        return allowed, bucket[0]
+
+    def _evict(self, now: float):
+        """Volle Buckets entfernen; amortisiert O(1), weil erst nach einer Verdopplung wieder geprüft wird."""
+        self.buckets = {key: bucket for key, bucket in self.buckets.items() if bucket[2] > now}
+        self._sweep_at = max(self.MIN_SWEEP, 2 * len(self.buckets))
+
+    async def __call__(self, scope, receive, send):
+        matched = self.limits.match(scope["method"], scope["path"]) if scope["type"] == "http" else None
+        if matched is None:
+            return await self.app(scope, receive, send)
+        route, (rate, burst) = matched
+        remember_route(scope, route)
+        api_key = next((value for name, value in scope["headers"] if name == b"x-api-key"), b"")
+        allowed, remaining = self.take(api_key, route, rate, burst)
+        headers = [(b"ratelimit-limit", b"%d" % burst), (b"ratelimit-remaining", b"%d" % remaining),
+                   (b"ratelimit-reset", b"%d" % math.ceil((burst - remaining) / rate))]
+        if not allowed:
+            retry_after = b"%d" % math.ceil((1 - remaining) / rate)
+            return await send_error(receive, send, 429, "Rate limit exceeded", headers + [(b"retry-after", retry_after)])
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), *headers]}
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+class Metrics:
+    """
+    Zähler für /metrics im Prometheus-Textformat: Anfragen pro Route und Statuscode,
+    Latenz-Histogramme pro Route, laufende Anfragen und Datensätze pro Store.
+    Pro Anfrage nur Dict-Zugriffe und eine Bisektion; summiert wird erst beim Abruf.
+    """
+
+    def __init__(self, stores: Dict[str, object], buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.stores = stores
+        self.buckets = buckets
+        self.in_flight = 0
+        self.requests: Dict[Tuple[str, str, int], int] = {}
+        # (Methode, Route) -> [Anzahl pro Bucket (letzter = +Inf), Summe der Sekunden]
+        self.latencies: Dict[Tuple[str, str], list] = {}
+
+    def observe(self, method: str, route: str, status: int, seconds: float):
+        key = (method, route, status)
+        self.requests[key] = self.requests.get(key, 0) + 1
+        histogram = self.latencies.get((method, route))
+        if histogram is None:
+            histogram = self.latencies[(method, route)] = [[0] * (len(self.buckets) + 1), 0.0]
+        histogram[0][bisect_left(self.buckets, seconds)] += 1
+        histogram[1] += seconds
+
+    def render(self) -> bytes:
+        def labels(**values) -> str:
+            # json.dumps maskiert \\, " und Zeilenumbrüche wie im Prometheus-Textformat
+            return ",".join(f"{name}={json.dumps(str(value), ensure_ascii=False)}" for name, value in values.items())
+
+        lines = ["# HELP mock_http_requests_total Anfragen pro Route und Statuscode.",
+                 "# TYPE mock_http_requests_total counter"]
+        for (method, route, status), count in sorted(self.requests.items()):
+            lines.append(f"mock_http_requests_total{{{labels(method=method, route=route, status=status)}}} {count}")
+
+        lines += ["# HELP mock_http_request_duration_seconds Bearbeitungszeit pro Route (inkl. simulierter Latenz).",
+                  "# TYPE mock_http_request_duration_seconds histogram"]
+        for (method, route), (counts, total) in sorted(self.latencies.items()):
+            route_labels = labels(method=method, route=route)
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                lines.append(f'mock_http_request_duration_seconds_bucket{{{route_labels},le="{bound}"}} {cumulative}')
+            lines.append(f"mock_http_request_duration_seconds_sum{{{route_labels}}} {total}")
+            lines.append(f"mock_http_request_duration_seconds_count{{{route_labels}}} {cumulative}")
+
+        lines += ["# HELP mock_http_requests_in_flight Gerade bearbeitete Anfragen.",
+                  "# TYPE mock_http_requests_in_flight gauge",
+                  f"mock_http_requests_in_flight {self.in_flight}",
+                  "# HELP mock_store_records Datensätze pro Store.",
+                  "# TYPE mock_store_records gauge"]
+        for name, store in self.stores.items():
+            lines.append(f"mock_store_records{{{labels(store=name)}}} {len(store)}")
+        return ("\n".join(lines) + "\n").encode()
+
+
+class MetricsMiddleware:
+    """
+    Misst jede Anfrage (als äußerste Middleware inkl. Rate-Limit, simulierter Latenz und Fehlern)
+    und beantwortet GET `path` selbst. Route ist das Pfad-Template (z.B. "/projects/{projectId}"):
+    von Rate-Limit/Fehlerprofil gemerkt (remember_route), sonst das des Routers; unbekannte Pfade
+    landen gemeinsam unter "".
+    """
+
+    def __init__(self, app, metrics: Metrics, path: str = "/metrics"):
+        self.app = app
+        self.metrics = metrics
+        self.path = path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        if scope["path"] == self.path and scope["method"] == "GET":
+            body = self.metrics.render()
+            await send({"type": "http.response.start", "status": 200,
+                        "headers": [(b"content-type", b"text/plain; version=0.0.4; charset=utf-8"),
+                                    (b"content-length", str(len(body)).encode())]})
+            return await send({"type": "http.response.body", "body": body})
+
+        metrics = self.metrics
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        metrics.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            metrics.in_flight -= 1
+            route = scope.get("mock.route")
+            if route is None:
+                route = getattr(scope.get("route"), "path", "")
+            metrics.observe(scope["method"], route, status, time.perf_counter() - start)
+
+
+# --- END RUNTIME ---
+
+# --- Konfiguration (Kommandozeile; Standardwerte aus Umgebungsvariablen MOCK_*) ---
+def parse_config():
+    parser = argparse.ArgumentParser(description="Generierter Mock Server")
+    parser.add_argument("--compact-store", action="store_true", default=os.environ.get("MOCK_COMPACT_STORE") == "1",
+                        help="Datensätze als Tupel statt als Pydantic-Instanzen speichern: etwa halber RAM pro Datensatz und schnellere Schreibzugriffe, "
+                             "dafür ist das erste Lesen eines Datensatzes langsamer (Model wird erst dann erzeugt; danach aus dem JSON-Cache).")
+    parser.add_argument("--data-dir", default=os.environ.get("MOCK_DATA_DIR"),
+                        help="Persistenz aktivieren: Write-Ahead-Log und Snapshots in diesem Ordner.")
+    parser.add_argument("--fsync-interval", type=float, default=float(os.environ.get("MOCK_FSYNC_INTERVAL", "0.05")),
+                        help="Sekunden zwischen zwei gebündelten fsyncs des WAL.")
+    parser.add_argument("--snapshot-mb", type=float, default=float(os.environ.get("MOCK_SNAPSHOT_MB", "64")),
+                        help="WAL-Größe in MB, ab der ein Snapshot geschrieben wird.")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("MOCK_WORKERS", "1")),
+                        help="Anzahl Worker-Prozesse (>1: gemeinsamer Zustand in SQLite).")
+    parser.add_argument("--db", default=os.environ.get("MOCK_DB"),
+                        help="SQLite-Datei für den gemeinsamen Zustand (Standard bei --workers > 1: temporäre Datei).")
+    parser.add_argument("--compress-min-bytes", type=int, default=int(os.environ.get("MOCK_COMPRESS_MIN_BYTES", "1024")),
+                        help="Antworten ab dieser Größe gzip/brotli-komprimieren (negativ: aus).")
+    parser.add_argument("--profiles", default=os.environ.get("MOCK_PROFILES"),
+                        help="Sidecar-Datei mit Latenz-/Fehlerprofilen (Standard: mock_profiles.json neben dem Server, falls vorhanden).")
+    parser.add_argument("--fault-seed", type=int, default=int(os.environ["MOCK_FAULT_SEED"]) if os.environ.get("MOCK_FAULT_SEED") else None,
+                        help="Zufalls-Seed für Latenz und Fehler (reproduzierbare Läufe).")
+    parser.add_argument("--no-rate-limit", action="store_true", default=os.environ.get("MOCK_NO_RATE_LIMIT") == "1",
+                        help="x-mock-rate-limit der Spec ignorieren.")
+    parser.add_argument("--no-metrics", action="store_true", default=os.environ.get("MOCK_NO_METRICS") == "1",
+                        help="Kein /metrics-Endpunkt (Prometheus) und keine Messung pro Anfrage.")
+    parser.add_argument("--seed-file", default=os.environ.get("MOCK_SEED_FILE"),
+                        help="Startdaten aus dieser Seed-Datei (z.B. von data_generator.py) statt aus der Seed-Datei des Builds; der Index liegt daneben mit Endung .idx.")
+    return parser.parse_args(sys.argv[1:] if __name__ == "__main__" else [])
+
+# Option -> Umgebungsvariable; die Worker-Prozesse (--workers) sehen keine Kommandozeile
+# und lesen ihre Konfiguration nur aus diesen Variablen
+CONFIG_ENV = {
+    "compact_store": "MOCK_COMPACT_STORE", "data_dir": "MOCK_DATA_DIR", "fsync_interval": "MOCK_FSYNC_INTERVAL",
+    "snapshot_mb": "MOCK_SNAPSHOT_MB", "workers": "MOCK_WORKERS", "db": "MOCK_DB",
+    "compress_min_bytes": "MOCK_COMPRESS_MIN_BYTES", "profiles": "MOCK_PROFILES", "fault_seed": "MOCK_FAULT_SEED",
+    "no_rate_limit": "MOCK_NO_RATE_LIMIT", "no_metrics": "MOCK_NO_METRICS", "seed_file": "MOCK_SEED_FILE",
+}
+
+def export_config(config):
+    for option, variable in CONFIG_ENV.items():
+        value = getattr(config, option)
+        if value is None or value is False:
+            os.environ.pop(variable, None)
+        else:
+            os.environ[variable] = "1" if value is True else str(value)
+
+CONFIG = parse_config()
+
+# Mehrere Worker: ohne --db eine temporäre Datenbank anlegen; die Worker-Prozesse importieren
+# dieses Modul neu und finden den Pfad über MOCK_DB
+FRESH_DB = False
+if __name__ == "__main__" and CONFIG.workers > 1 and not CONFIG.db:
+    import atexit
+    import shutil
+    import tempfile
+    DB_DIR = tempfile.mkdtemp(prefix="mock_server_")
+    CONFIG.db = os.path.join(DB_DIR, "state.db")
+    atexit.register(shutil.rmtree, DB_DIR, True)
+if __name__ == "__main__" and CONFIG.db:
+    FRESH_DB = not os.path.exists(CONFIG.db)
+    export_config(CONFIG)
+
+# --- 1. Pydantic Models ---
 class Project(BaseModel):
     id: int | None = None # ID ist optional beim Erstellen
     key: str
     name: str
 
-# --- 2. In-Memory Datenbank (Mit generierten Testdaten) ---
-IN_MEMORY_DB: Dict[int, Project] = {}
-NEXT_ID = 5
 
-# Daten aus Testdaten laden und validieren (mit Pydantic)
-INITIAL_DATA = {1: {'id': 1, 'key': 'PRO-1', 'name': 'Project 1', 'fields': {'summary': 'Summary of issue 1', 'description': 'Description of issue 1', 'status': 'Open', 'assignee': 'John Doe', 'issuetype': 'Bug', 'project': 'PRO-1'}}, 2: {'id': 2, 'key': 'PRO-2', 'name': 'Project 2', 'fields': {'summary': 'Summary of issue 2', 'description': 'Description of issue 2', 'status': 'Open', 'assignee': 'Jane Doe', 'issuetype': 'Feature', 'project': 'PRO-2'}}, 4: {'id': 4, 'key': 'PRO-4', 'name': 'Project 4', 'fields': {'summary': 'Summary of issue 4', 'description': 'Description of issue 4', 'status': 'Open', 'assignee': 'Jane Doe', 'issuetype': 'Feature', 'project': 'PRO-4'}}}
+class IssueFields(BaseModel):
+    summary: str
+    description: str
+    status: str
+    assignee: str
+    issuetype: str
+    project: str
+
+
+class Issue(BaseModel):
+    id: int | None = None # ID ist optional beim Erstellen
+    key: str
+    fields: IssueFields
+
+
+class Transition(BaseModel):
+    id: int | None = None # ID ist optional beim Erstellen
+    name: str
+    to: str
+
+
+class Comment(BaseModel):
+    id: int | None = None # ID ist optional beim Erstellen
+    body: str
+    author: str
+    created: str
 
-for id_key, item_data in INITIAL_DATA.items():
-    try:
-        IN_MEMORY_DB[id_key] = Project(**item_data)
-    except Exception as e:
-        print(f"WARNUNG: Testdaten ID {id_key} konnte nicht geladen werden ({e})")
+
+# --- 2. In-Memory Datenbank (ein Store mit eigener ID-Sequenz pro Ressource) ---
+STORE_CLASS = CompactStore if CONFIG.compact_store else ResourceStore
+if CONFIG.db:
+    STORE_CLASS = lambda name, model: SqliteStore(name, model, CONFIG.db)
+    if CONFIG.compact_store or CONFIG.data_dir:
+        print("WARNUNG: Mit SQLite-Zustand (--db/--workers) werden --compact-store und --data-dir ignoriert.")
+STORES: Dict[str, ResourceStore] = {
+    "projects": STORE_CLASS("projects", Project),
+    "issues": STORE_CLASS("issues", Issue),
+    "issues_transitions": STORE_CLASS("issues_transitions", Transition),
+    "issues_comments": STORE_CLASS("issues_comments", Comment),
+}
+
+# Startdaten: memory-mapped aus der Seed-Datei, validiert (mit Pydantic) erst beim ersten Zugriff
+SEED_DIR = os.path.dirname(os.path.abspath(__file__))
+SEED_FILE = os.path.abspath(CONFIG.seed_file) if CONFIG.seed_file else os.path.join(SEED_DIR, "mock_server_seed.jsonl")
+try:
+    SEED = SeedFile(SEED_FILE, os.path.splitext(SEED_FILE)[0] + ".idx")
+except FileNotFoundError:
+    if CONFIG.seed_file:
+        print(f"FEHLER: Seed-Datei '{CONFIG.seed_file}' oder ihr Index (.idx) nicht gefunden.")
+        sys.exit(1)
+    SEED = None
+    print("WARNUNG: Seed-Datei nicht gefunden – Start ohne Testdaten.")
+
+# Persistenz (optional): ein vorhandener Snapshot ersetzt die Startdaten, danach wird das WAL nachgespielt
+JOURNAL = None
+if CONFIG.db:
+    # Nur der Hauptprozess übernimmt die Startdaten, und nur in eine neue Datenbank
+    if FRESH_DB and SEED is not None:
+        for store_name in SEED.stores:
+            STORES[store_name].import_seed(SEED)
+elif CONFIG.data_dir:
+    JOURNAL = Journal(CONFIG.data_dir, STORES, CONFIG.fsync_interval, int(CONFIG.snapshot_mb * 1024 * 1024))
+    JOURNAL.recover(SEED)
+elif SEED is not None:
+    for store_name in SEED.stores:
+        STORES[store_name].attach_seed(SEED)
 
 
 # --- 3. Security Dependency (Adressiert die GAP-Analyse) ---
@@ -40,64 +1763,275 @@ def verify_api_key(x_api_key: str = Header(None)):
     return True
 
 # --- 4. FastAPI App ---
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if JOURNAL is not None:
+        JOURNAL.start()
+    yield
+    if JOURNAL is not None:
+        JOURNAL.close()
+
 app = FastAPI(
+    lifespan=lifespan,
     title="Issue Tracking API",
     description="Mock Server basierend auf generierter OpenAPI Spec (inkl. Security Mock).",
     version="1.0.0"
 )
+if CONFIG.compress_min_bytes >= 0:
+    app.add_middleware(CompressionMiddleware, minimum_size=CONFIG.compress_min_bytes)
+
+# Alle Operationen: "*"-Profile und -Rate-Limits gelten für jede davon einzeln
+ROUTE_KEYS = ['GET /projects', 'POST /projects', 'POST /projects:batch', 'GET /projects/{projectId}', 'PUT /projects/{projectId}', 'DELETE /projects/{projectId}', 'DELETE /projects:batch', 'GET /issues', 'POST /issues', 'POST /issues:batch', 'GET /issues/{issueId}', 'PUT /issues/{issueId}', 'DELETE /issues/{issueId}', 'DELETE /issues:batch', 'POST /issues/{issueId}/transitions', 'POST /issues/{issueId}/transitions:batch', 'GET /issues/{issueId}/comments', 'POST /issues/{issueId}/comments', 'POST /issues/{issueId}/comments:batch']
+
+# Latenz- und Fehlerprofile: x-mock-* aus der Spec, pro Route überschrieben durch die Sidecar-Datei
+SPEC_PROFILES = {}
+try:
+    FAULTS = FaultProfiles(merge_profiles(SPEC_PROFILES, load_profiles(
+        CONFIG.profiles or os.path.join(SEED_DIR, "mock_profiles.json"), required=bool(CONFIG.profiles))), ROUTE_KEYS)
+except (OSError, ValueError) as error:
+    print(f"FEHLER: Latenz-/Fehlerprofile nicht nutzbar: {error}")
+    sys.exit(1)
+if FAULTS:
+    app.add_middleware(FaultInjectionMiddleware, faults=FAULTS, seed=CONFIG.fault_seed)
+
+# Rate-Limits (x-mock-rate-limit): Token Bucket pro API-Key und Route, je Worker-Prozess;
+# außerhalb der Fehlerprofile, abgelehnte Anfragen sehen also keine simulierte Latenz
+RATE_LIMITS = RateLimits({}, ROUTE_KEYS)
+if RATE_LIMITS and not CONFIG.no_rate_limit:
+    app.add_middleware(RateLimitMiddleware, limits=RATE_LIMITS)
+
+# Prometheus-Metriken unter /metrics; ganz außen, misst also auch Rate-Limit und simulierte Latenz.
+# Bei --workers > 1 zählt jeder Worker für sich
+if not CONFIG.no_metrics:
+    app.add_middleware(MetricsMiddleware, metrics=Metrics(STORES))
+
+# --- 5. Endpunkte (alle Pfade der Spec) ---
 
-# --- 5. CRUD Endpunkte (/projects) ---
+# --- CRUD Endpunkte (/projects) ---
 
-# POST / (CREATE) - Gesichert
+# POST /projects (CREATE) - Gesichert
 @app.post("/projects", status_code=201, response_model=Project, dependencies=[Depends(verify_api_key)])
-async def create_project(item: Project):
-    global NEXT_ID
-    
+async def create_project(item: Project, response: Response):
     if item.id is not None:
         raise HTTPException(status_code=400, detail="ID must not be provided on creation.")
-        
-    item.id = NEXT_ID
-    NEXT_ID += 1
-    
-    IN_MEMORY_DB[item.id] = item
+
+    item = STORES["projects"].create((), item)
+    response.headers["ETag"] = STORES["projects"].last_etag
     return item
 
-# GET / (READ ALL) - Öffentlich
+# POST /projects:batch (BULK CREATE/UPDATE, alles oder nichts) - Gesichert
+@app.post("/projects:batch", dependencies=[Depends(verify_api_key)])
+async def batch_upsert_projects(items: List[Project]):
+    status_code, body = batch_upsert(STORES["projects"], (), items, allow_update=True)
+    return Response(content=body, status_code=status_code, media_type="application/json")
+
+# GET /projects (READ ALL, Cursor-Pagination + Filter, ETag, NDJSON-Streaming) - Öffentlich
 @app.get("/projects", response_model=List[Project])
-async def get_all_projects():
-    return list(IN_MEMORY_DB.values())
+async def get_all_projects(limit: Optional[int] = Query(None, ge=1), cursor: Optional[str] = None, key: Optional[str] = None, key__prefix: Optional[str] = None, name: Optional[str] = None, name__prefix: Optional[str] = None,
+        if_none_match: Optional[str] = Header(None), accept: Optional[str] = Header(None)):
+    ndjson = wants_ndjson(accept)
+    try:
+        page_body, page_headers = list_page(STORES["projects"], (), limit, cursor, {"key": key, "name": name}, {"key": key__prefix, "name": name__prefix},
+                                            if_none_match, ndjson)
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    if page_body is None:
+        return Response(status_code=304, headers=page_headers)
+    if ndjson:
+        return StreamingResponse(page_body, media_type=NDJSON, headers=page_headers)
+    return Response(content=page_body, media_type="application/json", headers=page_headers)
 
-# GET /<built-in function id> (READ ONE) - Öffentlich
-@app.get("/projects/{id}", response_model=Project)
-async def get_one_project(id: int):
-    if id not in IN_MEMORY_DB:
+# GET /projects/{projectId} (READ ONE, ETag) - Öffentlich
+@app.get("/projects/{projectId}", response_model=Project)
+async def get_one_project(projectId: int, if_none_match: Optional[str] = Header(None)):
+    etag = STORES["projects"].etag((), projectId)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    body = STORES["projects"].item_json((), projectId)
+    if body is None or etag is None:
         raise HTTPException(status_code=404, detail="Project not found")
-    return IN_MEMORY_DB[id]
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
 
-# PUT /<built-in function id> (UPDATE) - Gesichert
-@app.put("/projects/{id}", response_model=Project, dependencies=[Depends(verify_api_key)])
-async def update_project(id: int, item: Project):
-    if id not in IN_MEMORY_DB:
+# PUT /projects/{projectId} (UPDATE, optimistisch mit If-Match) - Gesichert
+@app.put("/projects/{projectId}", response_model=Project, dependencies=[Depends(verify_api_key)])
+async def update_project(projectId: int, item: Project, response: Response,
+        if_match: Optional[str] = Header(None)):
+    if STORES["projects"].get((), projectId) is None:
         raise HTTPException(status_code=404, detail="Project not found")
-        
-    if item.id is not None and item.id != id:
+
+    if item.id is not None and item.id != projectId:
         raise HTTPException(status_code=400, detail="ID in body must match ID in path")
-        
-    item.id = id 
-    IN_MEMORY_DB[id] = item
+
+    try:
+        item = STORES["projects"].replace((), projectId, item, if_match)
+    except PreconditionFailed as error:
+        raise HTTPException(status_code=412, detail=str(error), headers={"ETag": error.etag} if error.etag else None)
+    response.headers["ETag"] = STORES["projects"].last_etag
     return item
 
-# DELETE /<built-in function id> (DELETE) - Gesichert
-@app.delete("/projects/{id}", status_code=204, dependencies=[Depends(verify_api_key)])
-async def delete_project(id: int):
-    if id not in IN_MEMORY_DB:
+# DELETE /projects/{projectId} (DELETE) - Gesichert
+@app.delete("/projects/{projectId}", status_code=204, dependencies=[Depends(verify_api_key)])
+async def delete_project(projectId: int):
+    if not STORES["projects"].delete((), projectId):
         raise HTTPException(status_code=404, detail="Project not found")
-    
-    del IN_MEMORY_DB[id]
     return
 
+# DELETE /projects:batch (BULK DELETE, alles oder nichts) - Gesichert
+@app.delete("/projects:batch", dependencies=[Depends(verify_api_key)])
+async def batch_delete_projects(ids: List[int] = Body(...)):
+    status_code, body = batch_delete(STORES["projects"], (), ids, [])
+    return Response(content=body, status_code=status_code, media_type="application/json")
+
+
+# --- CRUD Endpunkte (/issues) ---
+
+# POST /issues (CREATE) - Gesichert
+@app.post("/issues", status_code=201, response_model=Issue, dependencies=[Depends(verify_api_key)])
+async def create_issue(item: Issue, response: Response):
+    if item.id is not None:
+        raise HTTPException(status_code=400, detail="ID must not be provided on creation.")
+
+    item = STORES["issues"].create((), item)
+    response.headers["ETag"] = STORES["issues"].last_etag
+    return item
+
+# POST /issues:batch (BULK CREATE/UPDATE, alles oder nichts) - Gesichert
+@app.post("/issues:batch", dependencies=[Depends(verify_api_key)])
+async def batch_upsert_issues(items: List[Issue]):
+    status_code, body = batch_upsert(STORES["issues"], (), items, allow_update=True)
+    return Response(content=body, status_code=status_code, media_type="application/json")
+
+# GET /issues (READ ALL, Cursor-Pagination + Filter, ETag, NDJSON-Streaming) - Öffentlich
+@app.get("/issues", response_model=List[Issue])
+async def get_all_issues(limit: Optional[int] = Query(None, ge=1), cursor: Optional[str] = None, key: Optional[str] = None, key__prefix: Optional[str] = None,
+        if_none_match: Optional[str] = Header(None), accept: Optional[str] = Header(None)):
+    ndjson = wants_ndjson(accept)
+    try:
+        page_body, page_headers = list_page(STORES["issues"], (), limit, cursor, {"key": key}, {"key": key__prefix},
+                                            if_none_match, ndjson)
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    if page_body is None:
+        return Response(status_code=304, headers=page_headers)
+    if ndjson:
+        return StreamingResponse(page_body, media_type=NDJSON, headers=page_headers)
+    return Response(content=page_body, media_type="application/json", headers=page_headers)
+
+# GET /issues/{issueId} (READ ONE, ETag) - Öffentlich
+@app.get("/issues/{issueId}", response_model=Issue)
+async def get_one_issue(issueId: int, if_none_match: Optional[str] = Header(None)):
+    etag = STORES["issues"].etag((), issueId)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    body = STORES["issues"].item_json((), issueId)
+    if body is None or etag is None:
+        raise HTTPException(status_code=404, detail="Issue not found")
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+# PUT /issues/{issueId} (UPDATE, optimistisch mit If-Match) - Gesichert
+@app.put("/issues/{issueId}", response_model=Issue, dependencies=[Depends(verify_api_key)])
+async def update_issue(issueId: int, item: Issue, response: Response,
+        if_match: Optional[str] = Header(None)):
+    if STORES["issues"].get((), issueId) is None:
+        raise HTTPException(status_code=404, detail="Issue not found")
+
+    if item.id is not None and item.id != issueId:
+        raise HTTPException(status_code=400, detail="ID in body must match ID in path")
+
+    try:
+        item = STORES["issues"].replace((), issueId, item, if_match)
+    except PreconditionFailed as error:
+        raise HTTPException(status_code=412, detail=str(error), headers={"ETag": error.etag} if error.etag else None)
+    response.headers["ETag"] = STORES["issues"].last_etag
+    return item
+
+# DELETE /issues/{issueId} (DELETE) - Gesichert
+@app.delete("/issues/{issueId}", status_code=204, dependencies=[Depends(verify_api_key)])
+async def delete_issue(issueId: int):
+    if not STORES["issues"].delete((), issueId):
+        raise HTTPException(status_code=404, detail="Issue not found")
+    STORES["issues_transitions"].drop_children((issueId,))
+    STORES["issues_comments"].drop_children((issueId,))
+    return
+
+# DELETE /issues:batch (BULK DELETE, alles oder nichts) - Gesichert
+@app.delete("/issues:batch", dependencies=[Depends(verify_api_key)])
+async def batch_delete_issues(ids: List[int] = Body(...)):
+    status_code, body = batch_delete(STORES["issues"], (), ids, [STORES["issues_transitions"], STORES["issues_comments"]])
+    return Response(content=body, status_code=status_code, media_type="application/json")
+
+
+# --- CRUD Endpunkte (/issues/{issueId}/transitions) ---
+
+# POST /issues/{issueId}/transitions (CREATE) - Gesichert
+@app.post("/issues/{issueId}/transitions", status_code=200, response_model=Transition, dependencies=[Depends(verify_api_key)])
+async def create_issue_transition(issueId: int, item: Transition, response: Response):
+    if STORES["issues"].get((), issueId) is None:
+        raise HTTPException(status_code=404, detail="Issue not found")
+    if item.id is not None:
+        raise HTTPException(status_code=400, detail="ID must not be provided on creation.")
+
+    item = STORES["issues_transitions"].create((issueId,), item)
+    response.headers["ETag"] = STORES["issues_transitions"].last_etag
+    return item
+
+# POST /issues/{issueId}/transitions:batch (BULK CREATE, alles oder nichts) - Gesichert
+@app.post("/issues/{issueId}/transitions:batch", dependencies=[Depends(verify_api_key)])
+async def batch_upsert_issues_transitions(issueId: int, items: List[Transition]):
+    if STORES["issues"].get((), issueId) is None:
+        raise HTTPException(status_code=404, detail="Issue not found")
+    status_code, body = batch_upsert(STORES["issues_transitions"], (issueId,), items, allow_update=False)
+    return Response(content=body, status_code=status_code, media_type="application/json")
+
+
+# --- CRUD Endpunkte (/issues/{issueId}/comments) ---
+
+# POST /issues/{issueId}/comments (CREATE) - Gesichert
+@app.post("/issues/{issueId}/comments", status_code=201, response_model=Comment, dependencies=[Depends(verify_api_key)])
+async def create_issue_comment(issueId: int, item: Comment, response: Response):
+    if STORES["issues"].get((), issueId) is None:
+        raise HTTPException(status_code=404, detail="Issue not found")
+    if item.id is not None:
+        raise HTTPException(status_code=400, detail="ID must not be provided on creation.")
+
+    item = STORES["issues_comments"].create((issueId,), item)
+    response.headers["ETag"] = STORES["issues_comments"].last_etag
+    return item
+
+# POST /issues/{issueId}/comments:batch (BULK CREATE, alles oder nichts) - Gesichert
+@app.post("/issues/{issueId}/comments:batch", dependencies=[Depends(verify_api_key)])
+async def batch_upsert_issues_comments(issueId: int, items: List[Comment]):
+    if STORES["issues"].get((), issueId) is None:
+        raise HTTPException(status_code=404, detail="Issue not found")
+    status_code, body = batch_upsert(STORES["issues_comments"], (issueId,), items, allow_update=False)
+    return Response(content=body, status_code=status_code, media_type="application/json")
+
+# GET /issues/{issueId}/comments (READ ALL, Cursor-Pagination + Filter, ETag, NDJSON-Streaming) - Öffentlich
+@app.get("/issues/{issueId}/comments", response_model=List[Comment])
+async def get_all_issues_comments(issueId: int, limit: Optional[int] = Query(None, ge=1), cursor: Optional[str] = None, body: Optional[str] = None, body__prefix: Optional[str] = None, author: Optional[str] = None, author__prefix: Optional[str] = None, created: Optional[str] = None, created__prefix: Optional[str] = None,
+        if_none_match: Optional[str] = Header(None), accept: Optional[str] = Header(None)):
+    if STORES["issues"].get((), issueId) is None:
+        raise HTTPException(status_code=404, detail="Issue not found")
+    ndjson = wants_ndjson(accept)
+    try:
+        page_body, page_headers = list_page(STORES["issues_comments"], (issueId,), limit, cursor, {"body": body, "author": author, "created": created}, {"body": body__prefix, "author": author__prefix, "created": created__prefix},
+                                            if_none_match, ndjson)
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    if page_body is None:
+        return Response(status_code=304, headers=page_headers)
+    if ndjson:
+        return StreamingResponse(page_body, media_type=NDJSON, headers=page_headers)
+    return Response(content=page_body, media_type="application/json", headers=page_headers)
+
+
 # --- Server Start ---
 if __name__ == "__main__":
     print(f"🚀 Mock Server gestartet auf http://127.0.0.1:8000")
     print(f"🔗 Dokumentation (Swagger UI) verfügbar unter http://127.0.0.1:8000/docs")
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    if CONFIG.workers > 1:
+        print(f"⚙️  {CONFIG.workers} Worker, gemeinsamer Zustand in {CONFIG.db}")
+        uvicorn.run(f"{os.path.splitext(os.path.basename(__file__))[0]}:app", host="0.0.0.0", port=8000,
+                    workers=CONFIG.workers, app_dir=SEED_DIR)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -1,32 +1,380 @@
 # mock_server_builder.py
 
+import os
+import re
 import json
-from fastapi import FastAPI, HTTPException, Depends, Header
-from pydantic import BaseModel
-import uvicorn
-from typing import List, Dict, Any, Optional
+import keyword
 import sys
 from termcolor import colored
-import io
-import sys
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
-sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+import spec_utils
+import build_manifest
+import mock_runtime
+sys.stdout.reconfigure(encoding='utf-8')
+sys.stderr.reconfigure(encoding='utf-8')
+
+PY_TYPES = {'integer': 'int', 'number': 'float', 'boolean': 'bool', 'string': 'str'}
+
+
+def _identifier(name: str) -> str:
+    """Macht aus einem Spec-Namen einen gültigen Python-Bezeichner."""
+    ident = re.sub(r'\W', '_', name)
+    if not ident or ident[0].isdigit() or keyword.iskeyword(ident):
+        ident = f"{ident}_"
+    return ident
+
 
-def create_mock_server(spec_filename: str = "openapi_definition.json", data_filename: str = "testdata.json"):
+def _singular(name: str) -> str:
+    return name[:-1] if name.endswith('s') else name
+
+
+def _success_status(operation: dict, default: int) -> int:
+    codes = sorted(int(code) for code in operation.get('responses', {}) if str(code).isdigit() and str(code).startswith('2'))
+    return codes[0] if codes else default
+
+
+def _response_schema_ref(operation: dict) -> str | None:
+    for code, response in operation.get('responses', {}).items():
+        if not str(code).startswith('2'):
+            continue
+        schema = (response.get('content') or {}).get('application/json', {}).get('schema') or {}
+        if schema.get('type') == 'array':
+            schema = schema.get('items') or {}
+        if '$ref' in schema:
+            return schema['$ref']
+    return None
+
+
+def collect_resources(spec: dict) -> list[dict]:
+    """
+    Gruppiert alle Pfade der Spec zu Ressourcen (Collection-Pfad + optionaler Item-Pfad).
+    Verschachtelte Pfade wie /issues/{issueId}/comments werden zu Unter-Ressourcen
+    mit eigenem Store, deren Daten pro Eltern-ID abgelegt werden.
+    """
+    resources = {}
+    for path, path_item in spec.get('paths', {}).items():
+        segments = path.strip('/').split('/')
+        if segments[-1].startswith('{'):
+            collection_path = '/' + '/'.join(segments[:-1])
+            kind = 'item'
+        else:
+            collection_path = path
+            kind = 'collection'
+
+        resource = resources.setdefault(collection_path, {
+            'collection_path': collection_path,
+            'item_path': None,
+            'item_param': 'id',
+            'collection_ops': {},
+            'item_ops': {},
+        })
+        if kind == 'item':
+            resource['item_path'] = path
+            resource['item_param'] = _identifier(segments[-1][1:-1])
+
+        for method in spec_utils.HTTP_METHODS:
+            if method in path_item:
+                resource[f'{kind}_ops'][method] = path_item[method]
+
+    result = []
+    for collection_path, resource in resources.items():
+        # Schema aus Request-Body (POST/PUT) oder Response (GET) ableiten
+        ref = None
+        for ops, method in ((resource['collection_ops'], 'post'), (resource['item_ops'], 'put'),
+                            (resource['item_ops'], 'get'), (resource['collection_ops'], 'get')):
+            if method in ops:
+                ref = spec_utils.request_schema_ref(ops[method]) or _response_schema_ref(ops[method])
+            if ref:
+                break
+        if ref is None:
+            print(colored(f"⚠️ Pfad '{collection_path}' hat kein referenziertes Schema – übersprungen.", 'yellow'))
+            continue
+
+        segments = collection_path.strip('/').split('/')
+        names = [s for s in segments if not s.startswith('{')]
+        resource['name'] = _identifier('_'.join(names))
+        resource['singular'] = _identifier('_'.join([_singular(n) for n in names]))
+        resource['schema_name'] = spec_utils.ref_name(ref)
+        resource['parent_params'] = [_identifier(s[1:-1]) for s in segments if s.startswith('{')]
+
+        # Eltern-Ressource: Collection-Pfad vor dem letzten Pfad-Parameter
+        resource['parent'] = None
+        param_positions = [i for i, s in enumerate(segments) if s.startswith('{')]
+        if param_positions:
+            resource['parent'] = '/' + '/'.join(segments[:param_positions[-1]])
+        result.append(resource)
+
+    by_path = {r['collection_path']: r for r in result}
+    for r in result:
+        parent = by_path.get(r['parent']) if r['parent'] else None
+        r['parent_name'] = parent['name'] if parent else None
+        r['parent_schema'] = parent['schema_name'] if parent else None
+        r['children'] = [c['name'] for c in result if c['parent'] == r['collection_path']]
+    return result
+
+
+def route_keys(resources: list[dict]) -> list[str]:
+    """Alle Operationen des Servers als "METHODE /pfad" (inkl. Batch-Endpunkte), z.B. für mock_runtime.RouteTable."""
+    keys = []
+    for resource in resources:
+        cpath, ipath = resource['collection_path'], resource['item_path']
+        keys += [f"{method.upper()} {cpath}" for method in resource['collection_ops']]
+        if 'post' in resource['collection_ops']:
+            keys.append(f"POST {cpath}:batch")
+        if ipath:
+            keys += [f"{method.upper()} {ipath}" for method in resource['item_ops']]
+            if 'delete' in resource['item_ops']:
+                keys.append(f"DELETE {cpath}:batch")
+    return keys
+
+
+def _python_type(spec: dict, prop_def: dict, hint: str, models: dict) -> str:
+    """Python-Typ für eine Property; verschachtelte Objekte werden zu eigenen Modellen."""
+    if '$ref' in prop_def:
+        name = spec_utils.ref_name(prop_def['$ref'])
+        _model_code(spec, name, spec_utils.resolve_ref(spec, prop_def), models)
+        return name
+
+    prop_type = prop_def.get('type')
+    if prop_type == 'array':
+        return f"List[{_python_type(spec, prop_def.get('items') or {}, hint + 'Item', models)}]"
+    if prop_type == 'object':
+        if prop_def.get('properties'):
+            _model_code(spec, hint, prop_def, models)
+            return hint
+        return "Dict[str, Any]"
+    return PY_TYPES.get(prop_type, 'str')
+
+
+def _model_code(spec: dict, model_name: str, schema: dict, models: dict, with_id: bool = False):
+    """Erzeugt den Pydantic-Code für ein Schema (Abhängigkeiten zuerst) und legt ihn in `models` ab."""
+    if model_name in models:
+        return
+    models[model_name] = None  # Platzhalter gegen Rekursion
+
+    properties = dict(schema.get('properties', {}))
+    if with_id and 'id' not in properties:
+        properties = {'id': {'type': 'integer'}, **properties}
+    required = schema.get('required', [])
+
+    model_fields = []
+    for prop_name, prop_def in properties.items():
+        field_name = _identifier(prop_name)
+        py_type = _python_type(spec, prop_def, f"{model_name}{field_name[:1].upper()}{field_name[1:]}", models)
+        alias = f'alias="{prop_name}"' if field_name != prop_name else ""
+
+        # Erstelle die Pydantic-Felder
+        if prop_name == 'id':
+            model_fields.append(f"    {field_name}: int | None = None # ID ist optional beim Erstellen")
+        elif prop_name not in required:
+            model_fields.append(f"    {field_name}: {py_type} | None = " + (f"Field(None, {alias})" if alias else "None"))
+        else:
+            model_fields.append(f"    {field_name}: {py_type}" + (f" = Field(..., {alias})" if alias else ""))
+
+    body = "\n".join(model_fields) or "    pass"
+    config = "    model_config = ConfigDict(populate_by_name=True)\n" if 'alias=' in body else ""
+    models.pop(model_name)
+    models[model_name] = f"class {model_name}(BaseModel):\n{config}{body}\n"
+
+
+def filter_fields(spec: dict, schema_name: str, reserved: list[str]) -> list[tuple[str, str, str]]:
+    """
+    Filterbare Felder eines Schemas als (Python-Name, Spec-Name, Python-Typ):
+    skalare Top-Level-Properties außer id und Namen, die mit Pfad-/Query-Parametern kollidieren.
+    """
+    schema = spec.get('components', {}).get('schemas', {}).get(schema_name, {})
+    fields = []
+    for prop_name, prop_def in schema.get('properties', {}).items():
+        field_name = _identifier(prop_name)
+        if prop_name == 'id' or field_name in reserved or prop_def.get('type') not in PY_TYPES:
+            continue
+        fields.append((field_name, prop_name, PY_TYPES[prop_def['type']]))
+    return fields
+
+
+def _query_param(name: str, alias: str, py_type: str) -> str:
+    if name == alias:
+        return f"{name}: Optional[{py_type}] = None"
+    return f'{name}: Optional[{py_type}] = Query(None, alias="{alias}")'
+
+
+def _route_path(path: str) -> str:
+    """Pfad-Parameter in gültige Python-Bezeichner umschreiben (FastAPI verlangt Namensgleichheit)."""
+    return re.sub(r'\{([^}]+)\}', lambda m: '{' + _identifier(m.group(1)) + '}', path)
+
+
+def _scope(params: list[str]) -> str:
+    """Python-Ausdruck für den Store-Scope, z.B. '()' oder '(issueId,)'."""
+    return "(" + "".join(f"{p}, " for p in params).rstrip(" ") + ")"
+
+
+def _resource_routes_code(spec: dict, resource: dict) -> str:
+    """CRUD-Endpunkte einer Ressource – nur die Methoden, die in der Spec stehen."""
+    name = resource['name']
+    singular = resource['singular']
+    schema_name = resource['schema_name']
+    cpath = _route_path(resource['collection_path'])
+    ipath = _route_path(resource['item_path']) if resource['item_path'] else None
+    item_param = resource['item_param']
+    parent_params = resource['parent_params']
+
+    scope = _scope(parent_params)
+    parent_args = "".join(f"{p}: int, " for p in parent_params)
+    store = f'STORES["{name}"]'
+
+    parent_check = ""
+    if resource['parent_name']:
+        parent_scope = _scope(parent_params[:-1])
+        parent_check = f"""    if STORES["{resource['parent_name']}"].get({parent_scope}, {parent_params[-1]}) is None:
+        raise HTTPException(status_code=404, detail="{resource['parent_schema']} not found")
+"""
+
+    # Kaskadierendes Löschen der Unter-Ressourcen des gelöschten Objekts
+    item_scope_children = "".join(
+        f'    STORES["{child}"].drop_children({_scope(parent_params + [item_param])})\n'
+        for child in resource['children']
+    )
+
+    code = [f"# --- CRUD Endpunkte ({cpath}) ---\n"]
+    cops, iops = resource['collection_ops'], resource['item_ops']
+
+    if 'post' in cops:
+        code.append(f"""
+# POST {cpath} (CREATE) - Gesichert
+@app.post("{cpath}", status_code={_success_status(cops['post'], 201)}, response_model={schema_name}, dependencies=[Depends(verify_api_key)])
+async def create_{singular}({parent_args}item: {schema_name}, response: Response):
+{parent_check}    if item.id is not None:
+        raise HTTPException(status_code=400, detail="ID must not be provided on creation.")
+
+    item = {store}.create({scope}, item)
+    response.headers["ETag"] = {store}.last_etag
+    return item
+""")
+        allow_update = bool(ipath and 'put' in iops)
+        code.append(f"""
+# POST {cpath}:batch (BULK CREATE{'/UPDATE' if allow_update else ''}, alles oder nichts) - Gesichert
+@app.post("{cpath}:batch", dependencies=[Depends(verify_api_key)])
+async def batch_upsert_{name}({parent_args}items: List[{schema_name}]):
+{parent_check}    status_code, body = batch_upsert({store}, {scope}, items, allow_update={allow_update})
+    return Response(content=body, status_code=status_code, media_type="application/json")
+""")
+
+    if 'get' in cops:
+        # Gleichheits- und Präfix-Filter (?key=PRO-1, ?key__prefix=PRO) über Sekundär-Indizes
+        fields = filter_fields(spec, schema_name, parent_params + ['limit', 'cursor', 'if_none_match', 'accept',
+                                                                   'ndjson', 'page_body', 'page_headers', 'error'])
+        filter_args = "".join(
+            f", {_query_param(f, p, t)}" + (f", {_query_param(f + '__prefix', p + '__prefix', 'str')}" if t == 'str' else "")
+            for f, p, t in fields
+        )
+        filters = ", ".join(f'"{f}": {f}' for f, _, _ in fields)
+        prefixes = ", ".join(f'"{f}": {f}__prefix' for f, _, t in fields if t == 'str')
+        code.append(f"""
+# GET {cpath} (READ ALL, Cursor-Pagination + Filter, ETag, NDJSON-Streaming) - Öffentlich
+@app.get("{cpath}", response_model=List[{schema_name}])
+async def get_all_{name}({parent_args}limit: Optional[int] = Query(None, ge=1), cursor: Optional[str] = None{filter_args},
+        if_none_match: Optional[str] = Header(None), accept: Optional[str] = Header(None)):
+{parent_check}    ndjson = wants_ndjson(accept)
+    try:
+        page_body, page_headers = list_page({store}, {scope}, limit, cursor, {{{filters}}}, {{{prefixes}}},
+                                            if_none_match, ndjson)
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    if page_body is None:
+        return Response(status_code=304, headers=page_headers)
+    if ndjson:
+        return StreamingResponse(page_body, media_type=NDJSON, headers=page_headers)
+    return Response(content=page_body, media_type="application/json", headers=page_headers)
+""")
+
+    if ipath and 'get' in iops:
+        code.append(f"""
+# GET {ipath} (READ ONE, ETag) - Öffentlich
+@app.get("{ipath}", response_model={schema_name})
+async def get_one_{singular}({parent_args}{item_param}: int, if_none_match: Optional[str] = Header(None)):
+    etag = {store}.etag({scope}, {item_param})
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={{"ETag": etag}})
+    body = {store}.item_json({scope}, {item_param})
+    if body is None or etag is None:
+        raise HTTPException(status_code=404, detail="{schema_name} not found")
+    return Response(content=body, media_type="application/json", headers={{"ETag": etag}})
+""")
+
+    if ipath and 'put' in iops:
+        code.append(f"""
+# PUT {ipath} (UPDATE, optimistisch mit If-Match) - Gesichert
+@app.put("{ipath}", response_model={schema_name}, dependencies=[Depends(verify_api_key)])
+async def update_{singular}({parent_args}{item_param}: int, item: {schema_name}, response: Response,
+        if_match: Optional[str] = Header(None)):
+    if {store}.get({scope}, {item_param}) is None:
+        raise HTTPException(status_code=404, detail="{schema_name} not found")
+
+    if item.id is not None and item.id != {item_param}:
+        raise HTTPException(status_code=400, detail="ID in body must match ID in path")
+
+    try:
+        item = {store}.replace({scope}, {item_param}, item, if_match)
+    except PreconditionFailed as error:
+        raise HTTPException(status_code=412, detail=str(error), headers={{"ETag": error.etag}} if error.etag else None)
+    response.headers["ETag"] = {store}.last_etag
+    return item
+""")
+
+    if ipath and 'delete' in iops:
+        code.append(f"""
+# DELETE {ipath} (DELETE) - Gesichert
+@app.delete("{ipath}", status_code=204, dependencies=[Depends(verify_api_key)])
+async def delete_{singular}({parent_args}{item_param}: int):
+    if not {store}.delete({scope}, {item_param}):
+        raise HTTPException(status_code=404, detail="{schema_name} not found")
+{item_scope_children}    return
+""")
+        children = ", ".join(f'STORES["{child}"]' for child in resource['children'])
+        code.append(f"""
+# DELETE {cpath}:batch (BULK DELETE, alles oder nichts) - Gesichert
+@app.delete("{cpath}:batch", dependencies=[Depends(verify_api_key)])
+async def batch_delete_{name}({parent_args}ids: List[int] = Body(...)):
+{parent_check}    status_code, body = batch_delete({store}, {scope}, ids, [{children}])
+    return Response(content=body, status_code=status_code, media_type="application/json")
+""")
+
+    return "".join(code)
+
+
+def seed_filenames(server_filename: str) -> tuple[str, str]:
+    """Seed-Datei und Offset-Index liegen neben dem generierten Server."""
+    return seed_index_pair(f"{os.path.splitext(server_filename)[0]}_seed.jsonl")
+
+
+def seed_index_pair(data_filename: str) -> tuple[str, str]:
+    """Zu einer Seed-Datei gehört der Offset-Index mit gleichem Namen und Endung .idx."""
+    return data_filename, f"{os.path.splitext(data_filename)[0]}.idx"
+
+
+def create_mock_server(spec_filename: str = "openapi_definition.json", data_filename: str = "testdata.json",
+                       server_filename: str = "mock_server.py", force: bool = False):
     """
     Liess die OpenAPI Spezifikation und die Testdaten ein, um ein
     lauffähiges FastAPI Mock-Server Skript zu generieren.
+    Ohne `force` wird nichts getan, wenn sich Eingaben und Generator seit dem letzten Build nicht geändert haben.
     """
     print("\n--- 4. MOCK SERVER BUILDER GESTARTET ---")
-    
+
+    inputs = [spec_filename, data_filename]
+    outputs = [server_filename, *seed_filenames(server_filename)]
+    generators = [__file__, spec_utils.__file__, mock_runtime.__file__]
+    if not force and build_manifest.is_up_to_date("mock_server", inputs, outputs, generators):
+        print(colored(f"⏭️  '{server_filename}' ist aktuell (Eingaben unverändert) – übersprungen. Mit --force neu generieren.", 'cyan'))
+        return
+
     try:
         # 1. Daten einlesen
         with open(spec_filename, 'r', encoding='utf-8') as f:
             spec = json.load(f)
-        
+
         with open(data_filename, 'r', encoding='utf-8') as f:
             test_data_raw = json.load(f)
-            
+
     except FileNotFoundError as e:
         print(colored(f"❌ FEHLER: Datei nicht gefunden: {e}. Führen Sie zuerst main.py aus.", 'red'))
         sys.exit(1)
@@ -34,58 +382,57 @@ def create_mock_server(spec_filename: str = "openapi_definition.json", data_file
         print(colored(f"❌ FEHLER: Konnte JSON aus '{spec_filename}' oder '{data_filename}' nicht dekodieren.", 'red'))
         sys.exit(1)
 
-    # 2. Ressourcenpfad und Schema-Name bestimmen
+    # 2. Alle Ressourcen (inkl. Unter-Ressourcen) und ihre Schemas bestimmen
     try:
-        resource_path_plural = next(iter(spec['paths'])).split('/{')[0] 
-        resource_name_plural = resource_path_plural.split('/')[-1]
-        
-        if resource_name_plural.endswith('s'):
-            resource_name_singular = resource_name_plural[:-1]
-        else:
-            resource_name_singular = resource_name_plural
-            
-        post_ref = spec['paths'][resource_path_plural]['post']['requestBody']['content']['application/json']['schema']['$ref']
-        schema_name = post_ref.split('/')[-1] 
+        resources = collect_resources(spec)
+        if not resources:
+            raise ValueError("Keine Pfade mit referenziertem Schema gefunden.")
     except Exception as e:
         print(colored(f"❌ FEHLER beim Parsen der OpenAPI Spec: {e}", 'red'))
         sys.exit(1)
 
-    # 3. Das Pydantic-Model bestimmen
-    schema_definition = spec['components']['schemas'][schema_name]
-    model_fields = []
-    
-    for prop_name, prop_def in schema_definition['properties'].items():
-        py_type = 'str' 
-        
-        if prop_def['type'] == 'integer':
-            py_type = 'int'
-        elif prop_def['type'] == 'number':
-            py_type = 'float'
-        elif prop_def['type'] == 'boolean':
-            py_type = 'bool'
-            
-        is_required = prop_name in schema_definition.get('required', [])
-        
-        # Erstelle die Pydantic-Felder
-        if not is_required and prop_name != 'id':
-             model_fields.append(f"    {prop_name}: {py_type} | None = None")
-        elif prop_name == 'id':
-             model_fields.append(f"    {prop_name}: int | None = None # ID ist optional beim Erstellen")
-        else:
-            model_fields.append(f"    {prop_name}: {py_type}")
+    # Latenz-/Fehlerprofile (x-mock-*) schon beim Build prüfen; der Server übernimmt sie als Startwert
+    profiles = spec_utils.mock_profiles(spec)
+    try:
+        mock_runtime.FaultProfiles(profiles)
+    except ValueError as e:
+        print(colored(f"❌ FEHLER: Ungültiges x-mock-Profil in der Spec: {e}", 'red'))
+        sys.exit(1)
+    rate_limits = spec_utils.rate_limits(spec)
+    try:
+        mock_runtime.RateLimits(rate_limits)
+    except ValueError as e:
+        print(colored(f"❌ FEHLER: Ungültiges x-mock-rate-limit in der Spec: {e}", 'red'))
+        sys.exit(1)
+
+    # 3. Die Pydantic-Models bestimmen (verschachtelte Objekte und $refs als eigene Models)
+    models = {}
+    for resource in resources:
+        schema_name = resource['schema_name']
+        _model_code(spec, schema_name, spec['components']['schemas'][schema_name], models, with_id=True)
+    pydantic_model_code = "\n\n".join(models.values())
 
-    pydantic_model_code = "\n".join(model_fields)
-    
-    # 4. Mock-Datenbank vorbereiten
+    # 4. Startdaten in eine eigene Seed-Datei schreiben (nur Top-Level-Ressourcen;
+    #    Unter-Ressourcen brauchen eine Eltern-ID). Der Server liest sie memory-mapped und lazy.
     mock_data = {}
-    valid_test_items = [item for item in test_data_raw if isinstance(item, dict) and item.get('id') is not None and isinstance(item.get('id'), int)]
-    
-    next_id = 1
-    if valid_test_items:
-        next_id = max(item.get('id', 0) for item in valid_test_items) + 1
-        mock_data = {item['id']: item for item in valid_test_items}
-    
-    
+    first_schema = spec_utils.first_post_schema(spec)
+    for resource in resources:
+        if resource['parent_name']:
+            continue
+        # Alte Listenform der Testdaten gehört nur zur ersten Ressource
+        if not isinstance(test_data_raw, dict) and resource['schema_name'] != first_schema:
+            continue
+        items = spec_utils.testdata_for_schema(test_data_raw, resource['schema_name'])
+        valid_test_items = [item for item in items if isinstance(item, dict) and item.get('id') is not None and isinstance(item.get('id'), int)]
+        if valid_test_items:
+            mock_data[resource['name']] = sorted({item['id']: item for item in valid_test_items}.items())
+
+    seed_data_filename, seed_index_filename = seed_filenames(server_filename)
+    mock_runtime.write_seed_file(seed_data_filename, seed_index_filename, mock_data)
+
+    stores_code = "\n".join(f'    "{r["name"]}": STORE_CLASS("{r["name"]}", {r["schema_name"]}),' for r in resources)
+    routes_code = "\n\n".join(_resource_routes_code(spec, r) for r in resources)
+
     # 5. FastAPI Mock Server Code generieren
     mock_server_code = f"""
 # mock_server.py
@@ -93,29 +440,120 @@ def create_mock_server(spec_filename: str = "openapi_definition.json", data_file
 # DIESER CODE WURDE AUTOMATISCH VON mock_server_builder.py GENERIERT
 # BASIEREND AUF openapi_definition.json
 #
-from fastapi import FastAPI, HTTPException, Depends, Header
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Response, Body
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ConfigDict, Field
 import uvicorn
 from typing import List, Dict, Any, Optional
+from contextlib import asynccontextmanager
+import argparse
 import sys
 import os
 
-# --- 1. Pydantic Model (Schema: {schema_name}) ---
-class {schema_name}(BaseModel):
+# --- 0. Runtime (aus mock_runtime.py) ---
+{mock_runtime.runtime_source()}
+
+# --- Konfiguration (Kommandozeile; Standardwerte aus Umgebungsvariablen MOCK_*) ---
+def parse_config():
+    parser = argparse.ArgumentParser(description="Generierter Mock Server")
+    parser.add_argument("--compact-store", action="store_true", default=os.environ.get("MOCK_COMPACT_STORE") == "1",
+                        help="Datensätze als Tupel statt als Pydantic-Instanzen speichern: etwa halber RAM pro Datensatz und schnellere Schreibzugriffe, "
+                             "dafür ist das erste Lesen eines Datensatzes langsamer (Model wird erst dann erzeugt; danach aus dem JSON-Cache).")
+    parser.add_argument("--data-dir", default=os.environ.get("MOCK_DATA_DIR"),
+                        help="Persistenz aktivieren: Write-Ahead-Log und Snapshots in diesem Ordner.")
+    parser.add_argument("--fsync-interval", type=float, default=float(os.environ.get("MOCK_FSYNC_INTERVAL", "0.05")),
+                        help="Sekunden zwischen zwei gebündelten fsyncs des WAL.")
+    parser.add_argument("--snapshot-mb", type=float, default=float(os.environ.get("MOCK_SNAPSHOT_MB", "64")),
+                        help="WAL-Größe in MB, ab der ein Snapshot geschrieben wird.")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("MOCK_WORKERS", "1")),
+                        help="Anzahl Worker-Prozesse (>1: gemeinsamer Zustand in SQLite).")
+    parser.add_argument("--db", default=os.environ.get("MOCK_DB"),
+                        help="SQLite-Datei für den gemeinsamen Zustand (Standard bei --workers > 1: temporäre Datei).")
+    parser.add_argument("--compress-min-bytes", type=int, default=int(os.environ.get("MOCK_COMPRESS_MIN_BYTES", "1024")),
+                        help="Antworten ab dieser Größe gzip/brotli-komprimieren (negativ: aus).")
+    parser.add_argument("--profiles", default=os.environ.get("MOCK_PROFILES"),
+                        help="Sidecar-Datei mit Latenz-/Fehlerprofilen (Standard: mock_profiles.json neben dem Server, falls vorhanden).")
+    parser.add_argument("--fault-seed", type=int, default=int(os.environ["MOCK_FAULT_SEED"]) if os.environ.get("MOCK_FAULT_SEED") else None,
+                        help="Zufalls-Seed für Latenz und Fehler (reproduzierbare Läufe).")
+    parser.add_argument("--no-rate-limit", action="store_true", default=os.environ.get("MOCK_NO_RATE_LIMIT") == "1",
+                        help="x-mock-rate-limit der Spec ignorieren.")
+    parser.add_argument("--no-metrics", action="store_true", default=os.environ.get("MOCK_NO_METRICS") == "1",
+                        help="Kein /metrics-Endpunkt (Prometheus) und keine Messung pro Anfrage.")
+    parser.add_argument("--seed-file", default=os.environ.get("MOCK_SEED_FILE"),
+                        help="Startdaten aus dieser Seed-Datei (z.B. von data_generator.py) statt aus der Seed-Datei des Builds; der Index liegt daneben mit Endung .idx.")
+    return parser.parse_args(sys.argv[1:] if __name__ == "__main__" else [])
+
+# Option -> Umgebungsvariable; die Worker-Prozesse (--workers) sehen keine Kommandozeile
+# und lesen ihre Konfiguration nur aus diesen Variablen
+CONFIG_ENV = {{
+    "compact_store": "MOCK_COMPACT_STORE", "data_dir": "MOCK_DATA_DIR", "fsync_interval": "MOCK_FSYNC_INTERVAL",
+    "snapshot_mb": "MOCK_SNAPSHOT_MB", "workers": "MOCK_WORKERS", "db": "MOCK_DB",
+    "compress_min_bytes": "MOCK_COMPRESS_MIN_BYTES", "profiles": "MOCK_PROFILES", "fault_seed": "MOCK_FAULT_SEED",
+    "no_rate_limit": "MOCK_NO_RATE_LIMIT", "no_metrics": "MOCK_NO_METRICS", "seed_file": "MOCK_SEED_FILE",
+}}
+
+def export_config(config):
+    for option, variable in CONFIG_ENV.items():
+        value = getattr(config, option)
+        if value is None or value is False:
+            os.environ.pop(variable, None)
+        else:
+            os.environ[variable] = "1" if value is True else str(value)
+
+CONFIG = parse_config()
+
+# Mehrere Worker: ohne --db eine temporäre Datenbank anlegen; die Worker-Prozesse importieren
+# dieses Modul neu und finden den Pfad über MOCK_DB
+FRESH_DB = False
+if __name__ == "__main__" and CONFIG.workers > 1 and not CONFIG.db:
+    import atexit
+    import shutil
+    import tempfile
+    DB_DIR = tempfile.mkdtemp(prefix="mock_server_")
+    CONFIG.db = os.path.join(DB_DIR, "state.db")
+    atexit.register(shutil.rmtree, DB_DIR, True)
+if __name__ == "__main__" and CONFIG.db:
+    FRESH_DB = not os.path.exists(CONFIG.db)
+    export_config(CONFIG)
+
+# --- 1. Pydantic Models ---
 {pydantic_model_code}
 
-# --- 2. In-Memory Datenbank (Mit generierten Testdaten) ---
-IN_MEMORY_DB: Dict[int, {schema_name}] = {{}}
-NEXT_ID = {next_id}
+# --- 2. In-Memory Datenbank (ein Store mit eigener ID-Sequenz pro Ressource) ---
+STORE_CLASS = CompactStore if CONFIG.compact_store else ResourceStore
+if CONFIG.db:
+    STORE_CLASS = lambda name, model: SqliteStore(name, model, CONFIG.db)
+    if CONFIG.compact_store or CONFIG.data_dir:
+        print("WARNUNG: Mit SQLite-Zustand (--db/--workers) werden --compact-store und --data-dir ignoriert.")
+STORES: Dict[str, ResourceStore] = {{
+{stores_code}
+}}
 
-# Daten aus Testdaten laden und validieren (mit Pydantic)
-INITIAL_DATA = {mock_data}
+# Startdaten: memory-mapped aus der Seed-Datei, validiert (mit Pydantic) erst beim ersten Zugriff
+SEED_DIR = os.path.dirname(os.path.abspath(__file__))
+SEED_FILE = os.path.abspath(CONFIG.seed_file) if CONFIG.seed_file else os.path.join(SEED_DIR, "{os.path.basename(seed_data_filename)}")
+try:
+    SEED = SeedFile(SEED_FILE, os.path.splitext(SEED_FILE)[0] + ".idx")
+except FileNotFoundError:
+    if CONFIG.seed_file:
+        print(f"FEHLER: Seed-Datei '{{CONFIG.seed_file}}' oder ihr Index (.idx) nicht gefunden.")
+        sys.exit(1)
+    SEED = None
+    print("WARNUNG: Seed-Datei nicht gefunden – Start ohne Testdaten.")
 
-for id_key, item_data in INITIAL_DATA.items():
-    try:
-        IN_MEMORY_DB[id_key] = {schema_name}(**item_data)
-    except Exception as e:
-        print(f"WARNUNG: Testdaten ID {{id_key}} konnte nicht geladen werden ({{e}})")
+# Persistenz (optional): ein vorhandener Snapshot ersetzt die Startdaten, danach wird das WAL nachgespielt
+JOURNAL = None
+if CONFIG.db:
+    # Nur der Hauptprozess übernimmt die Startdaten, und nur in eine neue Datenbank
+    if FRESH_DB and SEED is not None:
+        for store_name in SEED.stores:
+            STORES[store_name].import_seed(SEED)
+elif CONFIG.data_dir:
+    JOURNAL = Journal(CONFIG.data_dir, STORES, CONFIG.fsync_interval, int(CONFIG.snapshot_mb * 1024 * 1024))
+    JOURNAL.recover(SEED)
+elif SEED is not None:
+    for store_name in SEED.stores:
+        STORES[store_name].attach_seed(SEED)
 
 
 # --- 3. Security Dependency (Adressiert die GAP-Analyse) ---
@@ -127,77 +565,73 @@ def verify_api_key(x_api_key: str = Header(None)):
     return True
 
 # --- 4. FastAPI App ---
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if JOURNAL is not None:
+        JOURNAL.start()
+    yield
+    if JOURNAL is not None:
+        JOURNAL.close()
+
 app = FastAPI(
-    title="{spec['info']['title']}",
+    lifespan=lifespan,
+    title={json.dumps(spec['info']['title'], ensure_ascii=False)},
     description="Mock Server basierend auf generierter OpenAPI Spec (inkl. Security Mock).",
-    version="{spec['info']['version']}"
+    version={json.dumps(str(spec['info']['version']))}
 )
+if CONFIG.compress_min_bytes >= 0:
+    app.add_middleware(CompressionMiddleware, minimum_size=CONFIG.compress_min_bytes)
 
-# --- 5. CRUD Endpunkte ({resource_path_plural}) ---
+# Alle Operationen: "*"-Profile und -Rate-Limits gelten für jede davon einzeln
+ROUTE_KEYS = {route_keys(resources)!r}
 
-# POST / (CREATE) - Gesichert
-@app.post("{resource_path_plural}", status_code=201, response_model={schema_name}, dependencies=[Depends(verify_api_key)])
-async def create_{resource_name_singular}(item: {schema_name}):
-    global NEXT_ID
-    
-    if item.id is not None:
-        raise HTTPException(status_code=400, detail="ID must not be provided on creation.")
-        
-    item.id = NEXT_ID
-    NEXT_ID += 1
-    
-    IN_MEMORY_DB[item.id] = item
-    return item
+# Latenz- und Fehlerprofile: x-mock-* aus der Spec, pro Route überschrieben durch die Sidecar-Datei
+SPEC_PROFILES = {profiles!r}
+try:
+    FAULTS = FaultProfiles(merge_profiles(SPEC_PROFILES, load_profiles(
+        CONFIG.profiles or os.path.join(SEED_DIR, "mock_profiles.json"), required=bool(CONFIG.profiles))), ROUTE_KEYS)
+except (OSError, ValueError) as error:
+    print(f"FEHLER: Latenz-/Fehlerprofile nicht nutzbar: {{error}}")
+    sys.exit(1)
+if FAULTS:
+    app.add_middleware(FaultInjectionMiddleware, faults=FAULTS, seed=CONFIG.fault_seed)
 
-# GET / (READ ALL) - Öffentlich
-@app.get("{resource_path_plural}", response_model=List[{schema_name}])
-async def get_all_{resource_name_plural}():
-    return list(IN_MEMORY_DB.values())
+# Rate-Limits (x-mock-rate-limit): Token Bucket pro API-Key und Route, je Worker-Prozess;
+# außerhalb der Fehlerprofile, abgelehnte Anfragen sehen also keine simulierte Latenz
+RATE_LIMITS = RateLimits({rate_limits!r}, ROUTE_KEYS)
+if RATE_LIMITS and not CONFIG.no_rate_limit:
+    app.add_middleware(RateLimitMiddleware, limits=RATE_LIMITS)
 
-# GET /{id} (READ ONE) - Öffentlich
-@app.get("{resource_path_plural}/{{id}}", response_model={schema_name})
-async def get_one_{resource_name_singular}(id: int):
-    if id not in IN_MEMORY_DB:
-        raise HTTPException(status_code=404, detail="{schema_name} not found")
-    return IN_MEMORY_DB[id]
+# Prometheus-Metriken unter /metrics; ganz außen, misst also auch Rate-Limit und simulierte Latenz.
+# Bei --workers > 1 zählt jeder Worker für sich
+if not CONFIG.no_metrics:
+    app.add_middleware(MetricsMiddleware, metrics=Metrics(STORES))
 
-# PUT /{id} (UPDATE) - Gesichert
-@app.put("{resource_path_plural}/{{id}}", response_model={schema_name}, dependencies=[Depends(verify_api_key)])
-async def update_{resource_name_singular}(id: int, item: {schema_name}):
-    if id not in IN_MEMORY_DB:
-        raise HTTPException(status_code=404, detail="{schema_name} not found")
-        
-    if item.id is not None and item.id != id:
-        raise HTTPException(status_code=400, detail="ID in body must match ID in path")
-        
-    item.id = id 
-    IN_MEMORY_DB[id] = item
-    return item
+# --- 5. Endpunkte (alle Pfade der Spec) ---
 
-# DELETE /{id} (DELETE) - Gesichert
-@app.delete("{resource_path_plural}/{{id}}", status_code=204, dependencies=[Depends(verify_api_key)])
-async def delete_{resource_name_singular}(id: int):
-    if id not in IN_MEMORY_DB:
-        raise HTTPException(status_code=404, detail="{schema_name} not found")
-    
-    del IN_MEMORY_DB[id]
-    return
+{routes_code}
 
 # --- Server Start ---
 if __name__ == "__main__":
     print(f"🚀 Mock Server gestartet auf http://127.0.0.1:8000")
     print(f"🔗 Dokumentation (Swagger UI) verfügbar unter http://127.0.0.1:8000/docs")
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    if CONFIG.workers > 1:
+        print(f"⚙️  {{CONFIG.workers}} Worker, gemeinsamer Zustand in {{CONFIG.db}}")
+        uvicorn.run(f"{{os.path.splitext(os.path.basename(__file__))[0]}}:app", host="0.0.0.0", port=8000,
+                    workers=CONFIG.workers, app_dir=SEED_DIR)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8000)
 """
 
     # 6. Datei schreiben
-    server_filename = "mock_server.py"
     with open(server_filename, 'w', encoding='utf-8') as f:
         f.write(mock_server_code)
-        
-    print(colored(f"✅ Mock Server erfolgreich in '{server_filename}' generiert.", 'green'))
+    build_manifest.record("mock_server", inputs, outputs, generators)
+
+    print(colored(f"✅ Mock Server mit {len(resources)} Ressourcen erfolgreich in '{server_filename}' generiert "
+                  f"(Startdaten: '{seed_data_filename}').", 'green'))
     print(colored("\nNächster Schritt: Führen Sie 'python generate_tests.py' aus.", 'cyan'))
 
 
 if __name__ == "__main__":
-    create_mock_server()
\ No newline at end of file
+    create_mock_server(force="--force" in sys.argv)
@@ -0,0 +1,113 @@
+# pipeline.py
+# Asynchroner DAG-Scheduler für die Generierungs-Stufen von main.py.
+#
+# Jede Stufe deklariert, von welchen anderen Stufen sie abhängt. Der Scheduler
+# startet eine Stufe, sobald alle Abhängigkeiten fertig sind; unabhängige Stufen
+# laufen parallel (synchrone Funktionen in Worker-Threads via asyncio.to_thread).
+# Am Ende wird ein Zeitbericht inkl. kritischem Pfad ausgegeben.
+
+import time
+import asyncio
+from dataclasses import dataclass, field
+from typing import Callable
+from termcolor import colored
+
+
+@dataclass
+class Stage:
+    name: str
+    func: Callable[[], object]
+    deps: list = field(default_factory=list)
+
+
+@dataclass
+class StageTiming:
+    name: str
+    start: float
+    end: float
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+def _check_graph(stages: list[Stage]):
+    names = {s.name for s in stages}
+    for s in stages:
+        for dep in s.deps:
+            if dep not in names:
+                raise ValueError(f"Stufe '{s.name}' hängt von unbekannter Stufe '{dep}' ab.")
+
+    # Zyklen erkennen (Kahn-Algorithmus)
+    remaining = {s.name: set(s.deps) for s in stages}
+    while remaining:
+        ready = [name for name, deps in remaining.items() if not deps]
+        if not ready:
+            raise ValueError(f"Zyklische Abhängigkeit zwischen: {', '.join(sorted(remaining))}")
+        for name in ready:
+            del remaining[name]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+
+
+async def run_pipeline(stages: list[Stage]) -> dict[str, StageTiming]:
+    """
+    Führt alle Stufen gemäß ihrer Abhängigkeiten aus und liefert die Zeiten pro Stufe.
+    Schlägt eine Stufe fehl, wird der Fehler nach dem Abbruch der übrigen Stufen weitergereicht.
+    """
+    _check_graph(stages)
+
+    origin = time.perf_counter()
+    timings = {}
+    tasks = {}
+
+    async def run_stage(stage: Stage):
+        if stage.deps:
+            await asyncio.gather(*(tasks[dep] for dep in stage.deps))
+        start = time.perf_counter() - origin
+        await asyncio.to_thread(stage.func)
+        timings[stage.name] = StageTiming(stage.name, start, time.perf_counter() - origin)
+
+    for stage in stages:
+        tasks[stage.name] = asyncio.ensure_future(run_stage(stage))
+
+    try:
+        await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        raise
+
+    return timings
+
+
+def critical_path(stages: list[Stage], timings: dict[str, StageTiming]) -> list[str]:
+    """Längste Kette (nach Laufzeit) durch den Abhängigkeitsgraphen."""
+    by_name = {s.name: s for s in stages}
+    memo = {}
+
+    def longest(name):
+        if name not in memo:
+            best = (0.0, [])
+            for dep in by_name[name].deps:
+                candidate = longest(dep)
+                if candidate[0] > best[0]:
+                    best = candidate
+            memo[name] = (best[0] + timings[name].duration, best[1] + [name])
+        return memo[name]
+
+    return max((longest(s.name) for s in stages), key=lambda c: c[0])[1]
+
+
+def print_report(stages: list[Stage], timings: dict[str, StageTiming]):
+    path = critical_path(stages, timings)
+    total = max(t.end for t in timings.values())
+
+    print("\n--- PIPELINE ZEITBERICHT ---")
+    print(f"  {'Stufe':<16} {'Start':>8} {'Ende':>8} {'Dauer':>8}")
+    for stage in sorted(stages, key=lambda s: timings[s.name].start):
+        t = timings[stage.name]
+        line = f"  {t.name:<16} {t.start:>7.2f}s {t.end:>7.2f}s {t.duration:>7.2f}s"
+        print(colored(line, 'yellow') if t.name in path else line)
+    print(f"  Gesamtlaufzeit: {total:.2f}s")
+    print(colored(f"  Kritischer Pfad: {' → '.join(path)}", 'yellow'))
@@ -0,0 +1,90 @@
+# prompt_builder.py
+# Baut kompakte Prompts: statt der kompletten Spezifikation wird nur der
+# Teilgraph eingebettet, den ein Prompt wirklich braucht ($refs aufgelöst,
+# JSON ohne Einrückung). Vor dem Senden wird die Prompt-Größe geschätzt und
+# gegen ein Limit geprüft; die tatsächlichen Token-Zahlen und Latenzen
+# protokolliert llm_client.LLMClient pro Aufruf.
+
+import sys
+import json
+from termcolor import colored
+import spec_utils
+
+# Grobe Faustregel für Llama-Tokenizer: ~4 Zeichen pro Token
+CHARS_PER_TOKEN = 4
+MAX_PROMPT_TOKENS = 16000
+
+
+def compact_json(obj) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def inline_refs(spec: dict, schema, _stack: tuple = ()):
+    """
+    Ersetzt alle lokalen $refs rekursiv durch das referenzierte Schema.
+    Zyklische Referenzen bleiben als $ref stehen. 'description' wird weggelassen.
+    """
+    if isinstance(schema, list):
+        return [inline_refs(spec, item, _stack) for item in schema]
+    if not isinstance(schema, dict):
+        return schema
+
+    ref = schema.get('$ref')
+    if ref is not None:
+        if ref in _stack:
+            return {"$ref": ref}
+        return inline_refs(spec, spec_utils.resolve_ref(spec, schema), _stack + (ref,))
+
+    result = {}
+    for key, value in schema.items():
+        if key == 'description' and isinstance(value, str):
+            continue
+        if key == 'properties' and isinstance(value, dict):
+            # Property-Namen bleiben erhalten, auch wenn ein Feld 'description' heißt
+            result[key] = {name: inline_refs(spec, prop, _stack) for name, prop in value.items()}
+        else:
+            result[key] = inline_refs(spec, value, _stack)
+    return result
+
+
+def operation_context(spec: dict, path: str, method: str = "post") -> str:
+    """Kompakter Kontext einer einzelnen Operation: Pfad, Parameter und aufgelöstes Request-Schema."""
+    operation = spec.get('paths', {}).get(path, {}).get(method, {})
+    context = {"path": path, "method": method.upper()}
+
+    parameters = operation.get('parameters')
+    if parameters:
+        context["parameters"] = inline_refs(spec, parameters)
+
+    ref = spec_utils.request_schema_ref(operation)
+    if ref is not None:
+        context["requestSchema"] = inline_refs(spec, {"$ref": ref})
+
+    return compact_json(context)
+
+
+def spec_context(spec_content: str) -> str:
+    """Ganze Spezifikation, aber kompakt serialisiert (Fallback ohne einzelne Operation)."""
+    return compact_json(json.loads(spec_content))
+
+
+def format_prompt(template: dict, label: str, max_prompt_tokens: int | None = None, **fields) -> tuple[str, str]:
+    """
+    Füllt ein Prompt-Template aus prompts.py und prüft die geschätzte Größe.
+    Liefert (system_prompt, user_prompt); bricht ab, wenn das Limit überschritten wird.
+    """
+    max_prompt_tokens = max_prompt_tokens or MAX_PROMPT_TOKENS
+    system_prompt = template["system"]
+    user_prompt = template["user"].format(**fields)
+    estimated = estimate_tokens(system_prompt) + estimate_tokens(user_prompt)
+
+    print(f"    📏 {label}: ~{estimated} Prompt-Tokens (geschätzt)")
+    if estimated > max_prompt_tokens:
+        print(colored(f"❌ FEHLER: Prompt '{label}' überschreitet das Limit von {max_prompt_tokens} Tokens (~{estimated}).", 'red'))
+        sys.exit(1)
+
+    return system_prompt, user_prompt
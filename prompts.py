@@ -54,3 +54,25 @@ Output ONLY the valid JSON array. No markdown.
 """
 
 }
+
+# Das hier ist für die Testdaten pro Schema (eine Anfrage je POST-Operation)
+TEST_DATA_GENERATION_PER_SCHEMA = {
+    "system": "You are a QA Engineer. Output only raw JSON.",
+    "user": """
+Based on the following API operation, generate a JSON array containing 5 test objects for the creation endpoint POST {path} (request schema: {schema_name}).
+
+Scenarios to generate:
+1. Positive: All possible fields filled with valid data.
+2. Positive: Only required fields filled with valid data.
+3. Negative: A required field is missing (choose one automatically).
+4. Negative: Logical error (e.g. numeric value out of realistic range or past date where future is needed).
+5. Negative: Invalid data type (e.g. string instead of integer).
+
+Every object must only use fields of the schema {schema_name}.
+
+Context (The operation, all $refs resolved, compact JSON):
+{operation_context}
+
+Output ONLY the valid JSON array. No markdown.
+"""
+}
@@ -0,0 +1,130 @@
+# spec_stream.py
+# Inkrementeller Parser für die gestreamte SPEC_GENERATION-Antwort.
+#
+# Erwartetes Format (siehe prompts.SPEC_GENERATION):
+#   <<<JSON_START>>>
+#   { ... OpenAPI JSON ... }
+#   <<<SPLIT_MARKER>>>
+#   GAP-Analyse
+#
+# Der Parser verfolgt Klammertiefe und String-Zustand Zeichen für Zeichen. Sobald
+# das JSON-Dokument geschlossen ist, wird `on_spec` aufgerufen – noch während die
+# GAP-Analyse weiter gestreamt wird. Das Dokument beginnt an der ersten '{' nach
+# JSON_START; fehlt der Marker ganz, sucht finish() die erste '{' der Antwort.
+# Jedes Textstück wird nur einmal gescannt und als Teil einer Liste abgelegt.
+
+import json
+
+JSON_START = "<<<JSON_START>>>"
+SPLIT_MARKER = "<<<SPLIT_MARKER>>>"
+
+
+class SpecStreamParser:
+
+    def __init__(self, on_spec=None):
+        self.on_spec = on_spec
+        self.spec_raw = None
+        self.spec = None
+        self.error = None
+        self._chunks = []
+
+        # Scanner-Zustand für das JSON-Dokument
+        self._tail = ""          # Textende vor JSON_START (Marker über eine Chunk-Grenze hinweg)
+        self._started = False    # JSON_START gesehen (oder Fallback in finish())
+        self._json = None        # Teile des JSON-Dokuments ab seiner ersten '{'
+        self._after = []         # Text nach dem JSON-Dokument (SPLIT_MARKER und GAP-Analyse)
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    @property
+    def buffer(self) -> str:
+        """Die bisher empfangene Antwort."""
+        return "".join(self._chunks)
+
+    def feed(self, chunk: str):
+        """Nimmt das nächste Textstück der Antwort entgegen."""
+        self._chunks.append(chunk)
+        if self.spec_raw is not None or self.error is not None:
+            self._after.append(chunk)
+            return
+        if not self._started:
+            # Alles vor JSON_START (Einleitungstext) wird übersprungen
+            text = self._tail + chunk
+            marker = text.find(JSON_START)
+            if marker == -1:
+                self._tail = text[-(len(JSON_START) - 1):]
+                return
+            self._started = True
+            chunk = text[marker + len(JSON_START):]
+        self._scan(chunk)
+
+    def _scan(self, text: str):
+        pos = 0
+        if self._json is None:
+            # Alles vor der ersten '{' (```json-Zaun) wird übersprungen
+            pos = text.find("{")
+            if pos == -1:
+                return
+            self._json = []
+        start = pos
+
+        while pos < len(text):
+            ch = text[pos]
+            pos += 1
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._json.append(text[start:pos])
+                    self._after.append(text[pos:])
+                    self._complete("".join(self._json))
+                    return
+
+        self._json.append(text[start:])
+
+    def _complete(self, raw: str):
+        # Fehler erst in finish() melden, damit der Stream selbst nicht abbricht
+        try:
+            self.spec = json.loads(raw)
+        except json.JSONDecodeError as e:
+            self.error = e
+            return
+        self.spec_raw = raw
+        if self.on_spec is not None:
+            self.on_spec(self.spec, raw)
+
+    def finish(self) -> tuple[str, str]:
+        """
+        Schließt den Stream ab und liefert (spec_raw, gap_analysis).
+        Wirft ValueError, wenn das JSON ungültig/unvollständig ist oder der SPLIT_MARKER fehlt.
+        """
+        if not self._started:
+            # Kein JSON_START in der Antwort: das Dokument beginnt an der ersten '{'
+            self._started = True
+            self._scan(self.buffer)
+        if self.error is not None:
+            raise self.error
+        if self.spec_raw is None:
+            raise ValueError("Das OpenAPI-JSON wurde nicht vollständig übertragen.")
+
+        rest = "".join(self._after)
+        marker = rest.find(SPLIT_MARKER)
+        if marker == -1:
+            raise ValueError(f"'{SPLIT_MARKER}' fehlt in der Antwort.")
+
+        gap_analysis = rest[marker + len(SPLIT_MARKER):].strip()
+        return self.spec_raw, gap_analysis
@@ -0,0 +1,103 @@
+# spec_utils.py
+# Gemeinsame Hilfsfunktionen zum Lesen der OpenAPI-Spezifikation und der Testdaten.
+
+HTTP_METHODS = ("get", "post", "put", "patch", "delete")
+MOCK_EXTENSIONS = ("x-mock-latency", "x-mock-errors", "x-mock-throttle")
+RATE_LIMIT_EXTENSION = "x-mock-rate-limit"
+
+
+def ref_name(ref: str) -> str:
+    """'#/components/schemas/Project' -> 'Project'"""
+    return ref.split('/')[-1]
+
+
+def resolve_ref(spec: dict, schema: dict) -> dict:
+    """Löst einen lokalen $ref ('#/components/schemas/...') auf; andere Schemas bleiben unverändert."""
+    seen = set()
+    while isinstance(schema, dict) and '$ref' in schema:
+        ref = schema['$ref']
+        if ref in seen or not ref.startswith('#/'):
+            break
+        seen.add(ref)
+        node = spec
+        for part in ref[2:].split('/'):
+            node = node.get(part, {}) if isinstance(node, dict) else {}
+        schema = node
+    return schema
+
+
+def request_schema_ref(operation: dict) -> str | None:
+    """Liefert den $ref des JSON-Request-Bodys einer Operation (oder None)."""
+    try:
+        return operation['requestBody']['content']['application/json']['schema'].get('$ref')
+    except (KeyError, TypeError, AttributeError):
+        return None
+
+
+def post_operations(spec: dict) -> list[tuple[str, str]]:
+    """
+    Alle POST-Operationen mit referenziertem Request-Schema als (Pfad, Schema-Name).
+    Jedes Schema wird nur einmal aufgeführt (erster Pfad gewinnt).
+    """
+    operations = []
+    seen = set()
+    for path, path_item in spec.get('paths', {}).items():
+        ref = request_schema_ref(path_item.get('post') or {})
+        if ref is None:
+            continue
+        schema_name = ref_name(ref)
+        if schema_name in seen:
+            continue
+        seen.add(schema_name)
+        operations.append((path, schema_name))
+    return operations
+
+
+def _per_operation(spec: dict, extract) -> dict:
+    """`extract(knoten)` für die Spec ("*") und jede Operation ("GET /pfad"); leere Ergebnisse entfallen."""
+    entries = {"*": extract(spec)} if extract(spec) else {}
+    for path, path_item in spec.get('paths', {}).items():
+        for method in HTTP_METHODS:
+            operation = path_item.get(method)
+            if isinstance(operation, dict) and extract(operation):
+                entries[f"{method.upper()} {path}"] = extract(operation)
+    return entries
+
+
+def mock_profiles(spec: dict) -> dict:
+    """
+    Latenz-/Fehlerprofile aus den x-mock-* Erweiterungen: pro Operation als "GET /pfad",
+    auf oberster Ebene der Spec als Standard "*" für alle Routen.
+    """
+    return _per_operation(spec, lambda node: {key[len("x-mock-"):]: node[key] for key in MOCK_EXTENSIONS if key in node})
+
+
+def rate_limits(spec: dict) -> dict:
+    """
+    Rate-Limits aus x-mock-rate-limit ({"requests": 100, "per_seconds": 60, "burst": 20}),
+    pro Operation als "GET /pfad", auf oberster Ebene der Spec als Standard "*".
+    """
+    return _per_operation(spec, lambda node: node.get(RATE_LIMIT_EXTENSION))
+
+
+def first_post_schema(spec: dict) -> str | None:
+    """Schema-Name der ersten POST-Operation (die Ressource, die der Mock-Server abbildet)."""
+    operations = post_operations(spec)
+    return operations[0][1] if operations else None
+
+
+def testdata_for_schema(test_data, schema_name: str) -> list:
+    """
+    testdata.json ist entweder eine Liste (alte Form, ein Schema) oder ein Dict
+    {Schema-Name: [Testfälle]}. Liefert die Testfälle für das gewünschte Schema.
+    """
+    if isinstance(test_data, dict):
+        return test_data.get(schema_name, [])
+    return test_data
+
+
+def testdata_groups(test_data) -> dict[str, list]:
+    """Testdaten als {Schema-Name: [Testfälle]}; die alte Listenform landet unter '*'."""
+    if isinstance(test_data, dict):
+        return test_data
+    return {"*": test_data}
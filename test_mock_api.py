@@ -8,6 +8,7 @@ import pytest
 
 # --- Configuration ---
 BASE_URL = "http://127.0.0.1:8000/projects"
+METRICS_URL = "http://127.0.0.1:8000/metrics"
 AUTH_HEADERS = {"X-API-KEY": "MOCK_TOKEN_123"}
 
 # Test data from the generated 'testdata.json'
@@ -1,19 +1,14 @@
 # testdata_validator.py
 
+import re
 import json
 import sys
-import os
-import requests
+import llm_client
+import spec_utils
+import prompt_builder
 from termcolor import colored 
-import io
-import sys
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
-sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
-
-# --- Konfiguration ---
-IONOS_TOKEN = os.getenv("IONOS_API_TOKEN")
-API_URL = "https://openai.inference.de-txl.ionos.com/v1/chat/completions"
-MODEL = "meta-llama/Llama-3.3-70B-Instruct"
+sys.stdout.reconfigure(encoding='utf-8')
+sys.stderr.reconfigure(encoding='utf-8')
 
 TEST_VALIDATION_PROMPT = {
     "system": "Du bist ein erfahrener QA-Analyst. Deine Aufgabe ist es, die Vollständigkeit einer Reihe von Testfällen basierend auf den Anforderungen zu prüfen. Antworte immer kurz und präzise.",
@@ -35,62 +30,124 @@ Antworte NUR mit einer nummerierten Liste:
 """
 }
 
-def query_llm(system_prompt: str, user_prompt: str) -> str:
-    """Hilfsfunktion: Sendet Anfragen an die KI."""
-    try:
-        response = requests.post(
-            API_URL,
-            headers={"Authorization": f"Bearer {IONOS_TOKEN}"},
-            json={
-                "model": MODEL,
-                "messages": [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                "max_tokens": 4096,
-                "temperature": 0.0
-            },
-            timeout=180
-        )
-        response.raise_for_status()
-        return response.json()['choices'][0]['message']['content']
-    except Exception as e:
-        print(colored(f"❌ API Request Failed (Test Validator): {e}", 'red'))
-        sys.exit(1)
-
-
-def validate_test_data(data_filename: str = "testdata.json"):
-    """Prüft die Testdaten mithilfe des LLM."""
-    print("\n--- 3. TESTFALL-VALIDATOR GESTARTET ---")
+# Nur Szenario 4 (logischer Fehler) lässt sich nicht mechanisch gegen das Schema prüfen
+TEST_LOGIC_PROMPT = {
+    "system": "Du bist ein erfahrener QA-Analyst. Antworte immer kurz und präzise.",
+    "user": """
+Die folgenden Testfälle für die POST-Operation des Schemas '{schema_name}' sind formal schema-konform.
+Einer davon sollte einen LOGISCHEN Fehler enthalten (z.B. Zahlenwert außerhalb eines realistischen Bereichs, Datum in der Vergangenheit, wo die Zukunft nötig ist).
 
-    if not IONOS_TOKEN:
-        print(colored("❌ FEHLER: IONOS_API_TOKEN fehlt. Kann Validierung nicht durchführen.", 'red'))
-        return
+{test_cases}
 
-    try:
-        with open(data_filename, 'r', encoding='utf-8') as f:
-            test_data_raw = json.load(f)
-    except FileNotFoundError:
-        print(colored(f"❌ FEHLER: Datei '{data_filename}' nicht gefunden. Führen Sie zuerst main.py aus.", 'red'))
-        return
-    except json.JSONDecodeError:
-        print(colored(f"❌ FEHLER: Konnte JSON aus '{data_filename}' nicht dekodieren.", 'red'))
+Antworte NUR mit der Nummer des Testfalls, der einen logischen Fehler enthält, oder NUR mit 'KEINER'.
+"""
+}
+
+SCENARIOS = {
+    1: "Positive: Alle möglichen Felder gefüllt",
+    2: "Positive: Nur erforderliche Felder gefüllt",
+    3: "Negative: Ein erforderliches Feld fehlt",
+    4: "Negative: Logischer Fehler",
+    5: "Negative: Ungültiger Datentyp",
+}
+
+_TYPE_CHECKS = {
+    "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "string": lambda v: isinstance(v, str),
+    "boolean": lambda v: isinstance(v, bool),
+    "array": lambda v: isinstance(v, list),
+    "object": lambda v: isinstance(v, dict),
+}
+
+
+def find_schema_violations(value, schema: dict, spec: dict, path: str = "") -> tuple[list[str], list[str]]:
+    """
+    Prüft einen Wert rekursiv gegen ein (Teil-)Schema der Spezifikation.
+    Liefert (fehlende Pflichtfelder, Felder mit falschem Typ) als Pfade.
+    """
+    schema = spec_utils.resolve_ref(spec, schema)
+    missing, wrong_type = [], []
+
+    expected = schema.get('type')
+    if value is None:
+        if not schema.get('nullable'):
+            wrong_type.append(path or "<root>")
+        return missing, wrong_type
+    if expected in _TYPE_CHECKS and not _TYPE_CHECKS[expected](value):
+        wrong_type.append(path or "<root>")
+        return missing, wrong_type
+
+    if isinstance(value, dict):
+        properties = schema.get('properties', {})
+        for field in schema.get('required', []):
+            if field not in value:
+                missing.append(f"{path}.{field}" if path else field)
+        for field, field_value in value.items():
+            if field in properties:
+                m, w = find_schema_violations(field_value, properties[field], spec, f"{path}.{field}" if path else field)
+                missing += m
+                wrong_type += w
+    elif isinstance(value, list) and 'items' in schema:
+        for i, item in enumerate(value):
+            m, w = find_schema_violations(item, schema['items'], spec, f"{path}[{i}]")
+            missing += m
+            wrong_type += w
+
+    return missing, wrong_type
+
+
+def classify_test_case(test_case, schema: dict, spec: dict) -> set[int]:
+    """Ordnet einen Testfall lokal den Szenarien 1, 2, 3 und 5 zu (Szenario 4 braucht das LLM)."""
+    if not isinstance(test_case, dict):
+        return {5}
+
+    missing, wrong_type = find_schema_violations(test_case, schema, spec)
+    if wrong_type:
+        return {5}
+    if missing:
+        return {3}
+
+    schema = spec_utils.resolve_ref(spec, schema)
+    properties = set(schema.get('properties', {}))
+    required = set(schema.get('required', []))
+    present = properties & set(test_case)
+
+    scenarios = set()
+    if present == properties:
+        scenarios.add(1)
+    if present == required:
+        scenarios.add(2)
+    return scenarios
+
+
+def _llm_available(client: llm_client.LLMClient) -> bool:
+    if client.token or (client.cache and client.cache.replay):
+        return True
+    print(colored("❌ FEHLER: IONOS_API_TOKEN fehlt. Kann Validierung nicht durchführen.", 'red'))
+    return False
+
+
+def _validate_group_with_llm(schema_name: str, test_cases: list, client: llm_client.LLMClient):
+    """Vollständige Prüfung aller 5 Szenarien durch das LLM (Fallback ohne auflösbares Schema)."""
+    if not _llm_available(client):
         return
 
-    test_data_content = json.dumps(test_data_raw, indent=2)
+    label = "" if schema_name == "*" else f" ({schema_name})"
+    call_label = "TEST_VALIDATION" if schema_name == "*" else f"TEST_VALIDATION:{schema_name}"
 
-    print("🔎 Sende Testfälle zur Validierung an LLM...")
-    
-    formatted_prompt = TEST_VALIDATION_PROMPT["user"].format(test_data_content=test_data_content)
+    print(f"🔎 Sende Testfälle{label} zur Validierung an LLM...")
     
-    validation_result = query_llm(
-        TEST_VALIDATION_PROMPT["system"],
-        formatted_prompt
+    system_prompt, user_prompt = prompt_builder.format_prompt(
+        TEST_VALIDATION_PROMPT, call_label,
+        test_data_content=prompt_builder.compact_json(test_cases)
     )
     
+    validation_result = client.query(system_prompt, user_prompt, label=call_label)
+    
     validation_result = validation_result.strip()
 
-    print("\n--- ERGEBNIS DER TESTFALL-VALIDIERUNG ---")
+    print(f"\n--- ERGEBNIS DER TESTFALL-VALIDIERUNG{label} ---")
     
     if "ALLE FÜNF SZENARIEN SIND ERFÜLLT" in validation_result.upper():
         print(colored("✅ Die KI bestätigt: Alle 5 geforderten Test-Szenarien sind vorhanden.", 'green'))
@@ -98,6 +155,92 @@ def validate_test_data(data_filename: str = "testdata.json"):
         print(colored("⚠️ WARNUNG: Die KI hat Mängel in den generierten Testfällen festgestellt:", 'yellow'))
         print(validation_result)
 
+
+def _find_logic_error_case(schema_name: str, test_cases: list, candidates: list[int], client: llm_client.LLMClient) -> int | None:
+    """Fragt das LLM, welcher der schema-konformen Testfälle einen logischen Fehler enthält."""
+    listing = "\n".join(f"{i + 1}: {prompt_builder.compact_json(test_cases[i])}" for i in candidates)
+    call_label = f"TEST_LOGIC_CHECK:{schema_name}"
+
+    print(f"🔎 Frage LLM nach dem logischen Fehler ({len(candidates)} schema-konforme Testfälle)...")
+    system_prompt, user_prompt = prompt_builder.format_prompt(
+        TEST_LOGIC_PROMPT, call_label, schema_name=schema_name, test_cases=listing
+    )
+    answer = client.query(system_prompt, user_prompt, label=call_label)
+
+    match = re.search(r"\d+", answer)
+    if match and int(match.group()) - 1 in candidates:
+        return int(match.group()) - 1
+    return None
+
+
+def _validate_group_locally(schema_name: str, schema: dict, test_cases: list, spec: dict, client: llm_client.LLMClient):
+    """Szenarien 1, 2, 3 und 5 lokal gegen das Schema prüfen; nur Szenario 4 geht an das LLM."""
+    print(f"\n--- ERGEBNIS DER TESTFALL-VALIDIERUNG ({schema_name}) ---")
+
+    classified = [classify_test_case(case, schema, spec) for case in test_cases]
+
+    # Kandidaten für den logischen Fehler: alle formal gültigen Testfälle
+    candidates = [i for i, case in enumerate(test_cases)
+                  if isinstance(case, dict) and not (classified[i] & {3, 5})]
+    if candidates and _llm_available(client):
+        logic_case = _find_logic_error_case(schema_name, test_cases, candidates, client)
+        if logic_case is not None:
+            classified[logic_case] = {4}
+
+    for i, scenarios in enumerate(classified):
+        names = ", ".join(f"{n} ({SCENARIOS[n]})" for n in sorted(scenarios)) or "kein Szenario erkannt"
+        print(f"  Testfall {i + 1}: {names}")
+
+    covered = set().union(*classified) if classified else set()
+    missing_scenarios = [n for n in SCENARIOS if n not in covered]
+
+    if not missing_scenarios:
+        print(colored("✅ Alle 5 geforderten Test-Szenarien sind vorhanden.", 'green'))
+    else:
+        print(colored("⚠️ WARNUNG: Folgende Test-Szenarien fehlen:", 'yellow'))
+        for n in missing_scenarios:
+            print(f"  {n}. {SCENARIOS[n]}")
+
+
+def validate_test_data(data_filename: str = "testdata.json", client: llm_client.LLMClient | None = None,
+                       spec_filename: str = "openapi_definition.json"):
+    """
+    Prüft die Testdaten auf die 5 geforderten Szenarien.
+    Alles, was sich gegen das OpenAPI-Schema entscheiden lässt, wird lokal geprüft;
+    nur der logische Fehler (Szenario 4) wird beim LLM nachgefragt.
+    """
+    print("\n--- 3. TESTFALL-VALIDATOR GESTARTET ---")
+
+    client = client or llm_client.get_client()
+
+    try:
+        with open(data_filename, 'r', encoding='utf-8') as f:
+            test_data_raw = json.load(f)
+    except FileNotFoundError:
+        print(colored(f"❌ FEHLER: Datei '{data_filename}' nicht gefunden. Führen Sie zuerst main.py aus.", 'red'))
+        return
+    except json.JSONDecodeError:
+        print(colored(f"❌ FEHLER: Konnte JSON aus '{data_filename}' nicht dekodieren.", 'red'))
+        return
+
+    try:
+        with open(spec_filename, 'r', encoding='utf-8') as f:
+            spec = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        print(colored(f"⚠️ '{spec_filename}' nicht lesbar – Validierung erfolgt vollständig per LLM.", 'yellow'))
+        spec = {}
+
+    schemas = spec.get('components', {}).get('schemas', {})
+
+    # Bei schemaweise generierten Testdaten wird jede Gruppe einzeln geprüft
+    for schema_name, test_cases in spec_utils.testdata_groups(test_data_raw).items():
+        resolved_name = spec_utils.first_post_schema(spec) if schema_name == "*" else schema_name
+
+        if resolved_name in schemas and isinstance(test_cases, list):
+            _validate_group_locally(resolved_name, schemas[resolved_name], test_cases, spec, client)
+        else:
+            _validate_group_with_llm(schema_name, test_cases, client)
+
     print("------------------------------------------")
 
 
@@ -1,5 +1,6 @@
 # topic.py
 
+import re
 import sys
 import prompts # WICHTIG: Stellt sicher, dass Sie prompts importieren, um MATURITY_CHECK zu nutzen!
 
@@ -7,6 +8,157 @@ import prompts # WICHTIG: Stellt sicher, dass Sie prompts importieren, um MATURI
 SYSTEM_REFINE = "Du bist ein erfahrener Requirements Engineer. Deine Aufgabe ist es, den Input des Users in eine präzise, technische Beschreibung für eine REST-API umzuwandeln. Liste die Kern-Ressourcen und wichtige Felder auf. Antworte direkt mit dem Scope."
 SYSTEM_SENTIMENT = "Du bist eine Logik-Weiche. Analysiere den User-Input. Wenn der User zustimmt (ja, passt, ok, genau, gut, super), antworte nur mit 'YES'. Wenn der User Änderungen will oder 'nein' sagt, antworte nur mit 'NO'."
 
+# --- Lokale Intent-Erkennung (spart die LLM-Runde bei eindeutigen Antworten) ---
+# Unterhalb dieser Konfidenz wird das LLM gefragt
+LOCAL_CONFIDENCE_THRESHOLD = 0.8
+
+YES_WORDS = {
+    "ja", "jo", "jap", "jep", "jawohl", "ok", "okay", "oki", "passt", "genau", "gut", "super", "perfekt",
+    "prima", "top", "klar", "einverstanden", "richtig", "stimmt", "korrekt", "bestätigt", "sehr",
+    "yes", "y", "yep", "yeah", "sure", "fine", "good", "great", "correct", "ack", "lgtm", "👍",
+}
+NO_WORDS = {"nein", "nee", "nö", "no", "nope", "falsch"}
+# Verneinungen kehren das folgende Wort um ("nicht schlecht", "noch nicht", "kein Problem"):
+# lokal nicht sicher zu deuten, also entscheidet das LLM
+NEGATION_WORDS = {"nicht", "kein", "keine", "keinen", "keiner", "nie", "not", "never", "without"}
+CHANGE_WORDS = {
+    "aber", "ändern", "ändere", "änderung", "anpassen", "statt", "anstatt", "stattdessen", "zusätzlich",
+    "noch", "füge", "hinzu", "hinzufügen", "ergänze", "ergänzen", "entferne", "entfernen", "streiche",
+    "ohne", "fehlt", "fehlen", "mehr", "weniger", "umbenennen", "but", "change", "add", "remove", "instead",
+}
+# Füllwörter, die eine Zustimmung nicht verwässern ("ja, das passt so")
+FILLER_WORDS = {"das", "so", "ist", "es", "alles", "bitte", "danke", "vielen", "dank", "mir", "für", "mich", "that", "is", "it", "thanks"}
+
+# Plausibilitätsprüfung: lokal "YES" nur, wenn die Idee Datenobjekte (Entitäten) nennt.
+# Allgemeine Technik-Wörter sagen nichts über die Entitäten aus und zählen nicht.
+GENERIC_WORDS = {
+    "api", "apis", "rest", "crud", "system", "systeme", "datenbank", "liste", "ressource", "ressourcen", "app",
+    "anwendung", "backend", "service", "server", "tool", "software", "plattform", "programm", "projekt", "idee",
+    "sache", "sachen", "ding", "dinge", "daten", "verwaltung", "management", "klon", "clone", "beispiel", "test",
+}
+# Verben/Begriffe für Verwaltung und CRUD: zusammen mit einer Entität reicht das
+MANAGEMENT_WORDS = {
+    "verwaltung", "verwalten", "verwaltet", "management", "manage", "crud", "anlegen", "erstellen", "bearbeiten",
+    "löschen", "abrufen", "katalog", "tracking", "inventar", "register", "buchen", "bestellen", "planen",
+}
+# Wortstämme häufiger Datenobjekte (auch kleingeschrieben erkennbar). Ein Wort zählt nur als Ganzes:
+# Stamm plus Flexionsendung ("Bücher", "Kunden") oder plus Verwaltungs-/Technik-Wort ("Kundenverwaltung"),
+# nicht als beliebiger Präfix ("automatisch", "Kursiv")
+ENTITY_STEMS = (
+    "buch", "büch", "ausleih", "kunde", "produkt", "projekt", "issue", "ticket", "bestellung", "rechnung", "mitarbeit",
+    "benutzer", "nutzer", "user", "artikel", "termin", "patient", "fahrzeug", "auto", "zimmer", "raum", "räume", "hotel",
+    "film", "album", "alben", "song", "kurs", "student", "schüler", "lehrer", "aufgabe", "task", "kommentar", "comment",
+    "autor", "author", "buchung", "reservierung", "lager", "order", "customer", "product", "invoice", "event",
+    "veranstaltung", "mitglied", "member", "rezept", "zutat", "book", "loan", "employee", "vertrag", "verträg", "konto",
+    "konten", "zahlung", "bibliothek", "library", "libraries", "shop",
+)
+ENTITY_ENDINGS = {"", "s", "e", "n", "en", "er", "ern", "es", "in", "innen"}
+
+
+def _tokens(text: str) -> list[str]:
+    return re.findall(r"[\wäöüß👍]+", text.lower())
+
+
+def classify_confirmation(user_input: str) -> tuple[str | None, float]:
+    """
+    Entscheidet lokal, ob der User dem Scope zustimmt.
+    Liefert ('YES' | 'NO' | None, Konfidenz); None bedeutet: unklar, LLM fragen.
+    """
+    tokens = _tokens(user_input)
+    if not tokens:
+        return None, 0.0
+
+    yes = [t for t in tokens if t in YES_WORDS]
+    no = [t for t in tokens if t in NO_WORDS]
+    change = [t for t in tokens if t in CHANGE_WORDS]
+
+    if tokens[0] in NO_WORDS:
+        return "NO", 0.95
+    if any(t in NEGATION_WORDS for t in tokens):
+        return None, 0.0
+    if change:
+        # "Ja, aber füge noch X hinzu" ist ein Änderungswunsch
+        return "NO", 0.9 if len(tokens) > 2 else 0.8
+    if yes and not no and all(t in YES_WORDS or t in FILLER_WORDS for t in tokens):
+        return "YES", 0.95
+    if no and not yes:
+        return "NO", 0.85
+    if len(tokens) >= 6 and not yes:
+        # Längere Beschreibung ohne Zustimmung: vermutlich ein Änderungswunsch
+        return "NO", 0.7
+    return None, 0.0
+
+
+def _is_entity(token: str) -> bool:
+    """Stamm aus ENTITY_STEMS plus Flexionsendung, optional gefolgt von einem Verwaltungs-/Technik-Wort."""
+    for stem in ENTITY_STEMS:
+        if not token.startswith(stem):
+            continue
+        rest = token[len(stem):]
+        if rest in ENTITY_ENDINGS:
+            return True
+        if any(rest[:i] in ENTITY_ENDINGS and (rest[i:] in MANAGEMENT_WORDS or rest[i:] in GENERIC_WORDS)
+               for i in range(len(rest))):
+            return True
+    return False
+
+
+def _entities(description: str) -> tuple[set[str], set[str], bool]:
+    """
+    Vermutliche Datenobjekte als (bekannte, unbekannte, verneint): bekannte passen auf ENTITY_STEMS, unbekannte sind
+    großgeschriebene Wörter mitten im Satz (deutsche Substantive, z.B. "Jira Klon mit Projekten und Issues").
+    Allgemeine Technik-Wörter zählen nicht; `verneint` heißt, vor einem Datenobjekt steht eine Verneinung ("keine Kunden").
+    """
+    known, unknown = set(), set()
+    negated = False
+    sentence_start = True
+    previous = ""
+    for word in re.findall(r"[\wäöüÄÖÜß]+|[.!?:;]", description):
+        if word in ".!?:;":
+            sentence_start = True
+            previous = ""
+            continue
+        token = word.lower()
+        if len(token) > 2 and not token.isdigit() and token not in GENERIC_WORDS and token not in MANAGEMENT_WORDS:
+            found = None
+            if _is_entity(token):
+                found = known
+            elif word[0].isupper() and not word.isupper() and not sentence_start:
+                found = unknown
+            if found is not None:
+                found.add(token)
+                negated = negated or previous in NEGATION_WORDS
+        sentence_start = False
+        previous = token
+    return known, unknown, negated
+
+
+def local_maturity_check(description: str) -> tuple[str | None, float, str]:
+    """
+    Schnelle lokale Plausibilitätsprüfung. Liefert ('YES' | 'NO' | None, Konfidenz, Begründung);
+    None bedeutet: nicht eindeutig, MATURITY_CHECK beim LLM ausführen.
+    """
+    tokens = _tokens(description)
+    words = [t for t in tokens if len(t) > 2 and not t.isdigit()]
+
+    if not words:
+        return "NO", 0.95, "Die Eingabe enthält keine erkennbaren Begriffe. Beschreibe die zentralen Datenobjekte (z.B. 'Bücher', 'Ausleihen')."
+    known, unknown, negated = _entities(description)
+    if negated:
+        return None, 0.0, ""
+    if len(known) >= 2:
+        return "YES", 0.9, ""
+    if known and (unknown or any(t in MANAGEMENT_WORDS for t in tokens)):
+        return "YES", 0.8, ""
+    # Alles andere (auch nur großgeschriebene Wörter wie "Foo Bar Baz") entscheidet das LLM
+    return None, 0.0, ""
+
+
+def refine_topic(query_llm_func, description: str) -> str:
+    """Lässt die KI aus der Idee einen technischen Scope formulieren (ohne Rückfrage, z.B. für den Batch-Modus)."""
+    return query_llm_func(SYSTEM_REFINE, f"Input: {description}")
+
+
 def get_final_topic(query_llm_func):
     """
     Führt einen Dialog mit dem User, um das Thema zu schärfen und die Plausibilität zu prüfen.
@@ -26,13 +178,17 @@ def get_final_topic(query_llm_func):
         # A. Plausibilitätsprüfung
         print("\n🔎 Führe Plausibilitätsprüfung (Maturity Check) durch...")
         
-        check_prompt = prompts.MATURITY_CHECK["user"].format(topic=current_description)
-        check_result = query_llm_func(
-            prompts.MATURITY_CHECK["system"], 
-            check_prompt
-        )
-        
-        check_result = check_result.strip().upper()
+        local_result, confidence, local_reason = local_maturity_check(current_description)
+        if local_result is not None and confidence >= LOCAL_CONFIDENCE_THRESHOLD:
+            check_result = f"{local_result} {local_reason}".strip()
+        else:
+            check_prompt = prompts.MATURITY_CHECK["user"].format(topic=current_description)
+            check_result = query_llm_func(
+                prompts.MATURITY_CHECK["system"], 
+                check_prompt
+            )
+            
+            check_result = check_result.strip().upper()
 
         if check_result.startswith('YES'):
             # 1. Fall: Input ist klar genug, breche die Plausibilitäts-Schleife ab
@@ -61,7 +217,7 @@ def get_final_topic(query_llm_func):
         print("\n⏳ Ich analysiere und strukturiere deine Idee...")
         
         # A. Llama erstellt einen professionellen Vorschlag
-        refined_text = query_llm_func(SYSTEM_REFINE, f"Input: {current_description}")
+        refined_text = refine_topic(query_llm_func, current_description)
         
         print("\n" + "-"*40)
         print("📋 VORSCHLAG FÜR DEN SCOPE:")
@@ -72,8 +228,10 @@ def get_final_topic(query_llm_func):
         # B. User Feedback einholen
         user_feedback = input("\nPasst das so? (Antworte mit 'Ja' oder nenne Änderungswünsche):\n> ")
 
-        # C. Prüfen: Ist das ein JA oder ein NEIN?
-        sentiment = query_llm_func(SYSTEM_SENTIMENT, f"User Input: {user_feedback}")
+        # C. Prüfen: Ist das ein JA oder ein NEIN? (eindeutige Fälle lokal, sonst per LLM)
+        sentiment, confidence = classify_confirmation(user_feedback)
+        if sentiment is None or confidence < LOCAL_CONFIDENCE_THRESHOLD:
+            sentiment = query_llm_func(SYSTEM_SENTIMENT, f"User Input: {user_feedback}")
 
         if "YES" in sentiment.upper():
             print("\n✅ Perfekt! Scope ist bestätigt.")